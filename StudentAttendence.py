@@ -1,28 +1,23 @@
 import tkinter as tk
-from tkinter import messagebox, ttk
-import sqlite3
-from datetime import date
-
-
-def initialize_db():
-    conn = sqlite3.connect('attendance.db')
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS students (
-                        student_id INTEGER PRIMARY KEY,
-                        name TEXT NOT NULL,
-                        roll_number TEXT NOT NULL,
-                        class TEXT NOT NULL)''')
-    cursor.execute('''CREATE TABLE IF NOT EXISTS attendance (
-                        attendance_id INTEGER PRIMARY KEY,
-                        student_id INTEGER,
-                        date TEXT NOT NULL,
-                        status TEXT NOT NULL,
-                        FOREIGN KEY (student_id) REFERENCES students(student_id))''')
-    conn.commit()
-    conn.close()
-
-
-initialize_db()
+from tkinter import filedialog, messagebox, ttk
+
+from attendance_core import TaskExecutor, current_task, get_database, mark_many, migrate
+from attendance_core.analytics import VIEWS, run_view
+from attendance_core.export import export_file
+from attendance_core.importer import describe_errors, import_roster_file
+from attendance_core.matrix import load_matrix
+from attendance_core.paging import StaticRows
+from attendance_core.profiling import STARTUP
+from attendance_core.reports import REPORT_COLUMNS, report_pages
+from attendance_core.roster import RosterCache, RosterRows
+from attendance_core.search import search_students
+from attendance_core.sessions import AttendanceSession
+from attendance_core.students import add_student, delete_student
+from attendance_widgets import (DiagnosticsPanel, MatrixCanvas, ReportFilterBar, SearchBox, SessionBar,
+                                VirtualTreeview)
+
+# Type-ahead search shows at most this many matches
+SEARCH_LIMIT = 100
 
 
 class AttendanceApp:
@@ -31,6 +26,18 @@ class AttendanceApp:
         self.root.title("Student Attendance Management System")
         self.root.geometry("1000x800")
         self.root.configure(bg="#f0f0f0")
+        self.db = get_database()
+        # Students for the Manage Students list and the class lists, reloaded after any commit
+        self.roster = RosterCache(self.db)
+        # The class and day being marked on the attendance tab
+        self.session = None
+        self.tasks = TaskExecutor()
+        self.tasks.attach(self.root)
+        STARTUP.watch(self.root, "schema checked")
+
+        # Schema check on the writer thread while the window comes up; reads wait for it
+        self.tasks.prepare(migrate, self.db, on_done=lambda version: STARTUP.mark("schema checked"),
+                           on_error=self.show_error)
 
         # Configure root grid
         self.root.grid_rowconfigure(0, weight=1)
@@ -91,19 +98,48 @@ class AttendanceApp:
         self.student_tab = ttk.Frame(tab_control)
         self.attendance_tab = ttk.Frame(tab_control)
         self.report_tab = ttk.Frame(tab_control)
+        self.grid_tab = ttk.Frame(tab_control)
 
         # Configure tab grids
-        for tab in (self.student_tab, self.attendance_tab, self.report_tab):
+        for tab in (self.student_tab, self.attendance_tab, self.report_tab, self.grid_tab):
             tab.grid_rowconfigure(0, weight=1)
             tab.grid_columnconfigure(0, weight=1)
 
         tab_control.add(self.student_tab, text="Manage Students")
         tab_control.add(self.attendance_tab, text="Mark Attendance")
         tab_control.add(self.report_tab, text="Generate Report")
-
-        self.setup_student_tab()
-        self.setup_attendance_tab()
-        self.setup_report_tab()
+        tab_control.add(self.grid_tab, text="Monthly Grid")
+        self.tab_control = tab_control
+        self.month_grid = None
+
+        # Hidden profiling tab, built the first time Ctrl+Shift+D is pressed
+        self.diagnostics_tab = None
+        self.root.bind("<Control-Shift-D>", self.show_diagnostics)
+
+        # Each tab is built the first time it is selected
+        self.tab_setup = {
+            str(self.student_tab): self.setup_student_tab,
+            str(self.attendance_tab): self.setup_attendance_tab,
+            str(self.report_tab): self.setup_report_tab,
+            str(self.grid_tab): self.setup_grid_tab,
+        }
+        tab_control.bind("<<NotebookTabChanged>>", self.tab_opened)
+        self.tab_opened()
+
+    def tab_opened(self, event=None):
+        setup = self.tab_setup.pop(str(self.tab_control.select()), None)
+        if setup is not None:
+            setup()
+            STARTUP.mark(f"{self.tab_control.tab('current', 'text')} tab built")
+
+    def show_diagnostics(self, event=None):
+        if self.diagnostics_tab is None:
+            self.diagnostics_tab = DiagnosticsPanel(self.tab_control, stats=self.db.stats,
+                                                    results=self.db.results)
+            self.tab_control.add(self.diagnostics_tab, text="Diagnostics")
+        else:
+            self.diagnostics_tab.refresh()
+        self.tab_control.select(self.diagnostics_tab)
 
     def setup_student_tab(self):
         # Main container for student tab
@@ -134,21 +170,24 @@ class AttendanceApp:
         buttons = [
             ("Add Student", self.add_student),
             ("View Students", self.view_students),
-            ("Delete Student", self.delete_student)
+            ("Delete Student", self.delete_student),
+            ("Import Roster", self.import_students)
         ]
 
         for i, (text, command) in enumerate(buttons):
             ttk.Button(btn_frame, text=text, command=command).grid(row=0, column=i, padx=10)
 
+        # Progress of a running roster import
+        self.import_status = ttk.Label(container, text="")
+        self.import_status.grid(row=4, column=0)
+
+        # Type-ahead search, sent once typing pauses
+        self.student_search = SearchBox(container, self.search_roster, label="Search name or roll number:")
+        self.student_search.grid(row=2, column=0)
+
         # Treeview Frame
         tree_frame = ttk.Frame(container)
-        tree_frame.grid(row=2, column=0, pady=20)
-
-        # Treeview with scrollbar
-        self.student_tree = ttk.Treeview(tree_frame,
-                                         columns=("ID", "Name", "Roll Number", "Class"),
-                                         show="headings",
-                                         height=10)
+        tree_frame.grid(row=3, column=0, pady=20)
 
         # Configure column widths and headings
         columns = {
@@ -158,56 +197,49 @@ class AttendanceApp:
             "Class": 150
         }
 
-        for col, width in columns.items():
-            self.student_tree.column(col, width=width, anchor="center")
-            self.student_tree.heading(col, text=col, anchor="center")
-
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.student_tree.yview)
-        self.student_tree.configure(yscrollcommand=scrollbar.set)
-
+        # Virtualized Treeview with its own scrollbar
+        self.student_tree = VirtualTreeview(tree_frame, columns.keys(), columns.values(), height=10,
+                                            name="students")
         self.student_tree.grid(row=0, column=0)
-        scrollbar.grid(row=0, column=1, sticky="ns")
 
     def setup_attendance_tab(self):
         # Main container for attendance tab
         container = ttk.Frame(self.attendance_tab)
         container.grid(row=0, column=0, sticky="n", padx=20, pady=20)
 
+        # Class and date of the session to mark
+        self.session_bar = SessionBar(container, classes=self.known_classes)
+        self.session_bar.grid(row=0, column=0, pady=10)
+
         # Treeview Frame
         tree_frame = ttk.Frame(container)
-        tree_frame.grid(row=0, column=0, pady=20)
-
-        self.attendance_tree = ttk.Treeview(tree_frame,
-                                            columns=("ID", "Name", "Status"),
-                                            show="headings",
-                                            height=15)
+        tree_frame.grid(row=1, column=0, pady=20)
 
         # Configure columns
         columns = {
-            "ID": 100,
+            "ID": 80,
             "Name": 200,
-            "Status": 150
+            "Roll Number": 120,
+            "Status": 100,
+            "Marked": 80
         }
 
-        for col, width in columns.items():
-            self.attendance_tree.column(col, width=width, anchor="center")
-            self.attendance_tree.heading(col, text=col, anchor="center")
-
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.attendance_tree.yview)
-        self.attendance_tree.configure(yscrollcommand=scrollbar.set)
-
+        self.attendance_tree = VirtualTreeview(tree_frame, columns.keys(), columns.values(), height=15,
+                                               name="attendance")
         self.attendance_tree.grid(row=0, column=0)
-        scrollbar.grid(row=0, column=1, sticky="ns")
 
         # Button Frame
         btn_frame = ttk.Frame(container)
-        btn_frame.grid(row=1, column=0, pady=20)
+        btn_frame.grid(row=2, column=0, pady=20)
 
         # Buttons
         buttons = [
-            ("Load Students", self.load_students_for_attendance),
+            ("Load Session", self.load_students_for_attendance),
             ("Mark Present", self.mark_present),
-            ("Mark Absent", self.mark_absent)
+            ("Mark Absent", self.mark_absent),
+            ("All Remaining Present", self.mark_remaining_present),
+            ("All Remaining Absent", self.mark_remaining_absent),
+            ("Save Session", self.save_session)
         ]
 
         for i, (text, command) in enumerate(buttons):
@@ -218,14 +250,13 @@ class AttendanceApp:
         container = ttk.Frame(self.report_tab)
         container.grid(row=0, column=0, sticky="n", padx=20, pady=20)
 
+        # Filters applied in SQL when the report is generated
+        self.report_filters = ReportFilterBar(container)
+        self.report_filters.grid(row=0, column=0, pady=10)
+
         # Treeview Frame
         tree_frame = ttk.Frame(container)
-        tree_frame.grid(row=0, column=0, pady=20)
-
-        self.report_tree = ttk.Treeview(tree_frame,
-                                        columns=("Name", "Roll Number", "Date", "Status"),
-                                        show="headings",
-                                        height=15)
+        tree_frame.grid(row=1, column=0, pady=20)
 
         # Configure columns
         columns = {
@@ -235,126 +266,264 @@ class AttendanceApp:
             "Status": 100
         }
 
-        for col, width in columns.items():
-            self.report_tree.column(col, width=width, anchor="center")
-            self.report_tree.heading(col, text=col, anchor="center")
+        self.report_widths = list(columns.values())
+        self.report_tree = VirtualTreeview(tree_frame, columns.keys(), columns.values(), height=15,
+                                           name="report")
+        self.report_tree.grid(row=0, column=0)
 
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.report_tree.yview)
-        self.report_tree.configure(yscrollcommand=scrollbar.set)
+        # Generate and Export Buttons
+        btn_frame = ttk.Frame(container)
+        btn_frame.grid(row=2, column=0, pady=20)
+        ttk.Button(btn_frame, text="Generate Report", command=self.generate_report).grid(row=0, column=0, padx=5)
+        ttk.Button(btn_frame, text="Export Records", command=self.export_report).grid(row=0, column=1, padx=5)
 
-        self.report_tree.grid(row=0, column=0)
-        scrollbar.grid(row=0, column=1, sticky="ns")
+        # Busy indicator while a report query runs in the background
+        self.report_progress = ttk.Progressbar(container, mode="indeterminate", length=300)
+        self.report_progress.grid(row=3, column=0)
+
+        self.export_status = ttk.Label(container, text="")
+        self.export_status.grid(row=4, column=0, pady=5)
+
+    def setup_grid_tab(self):
+        # Main container for monthly grid tab
+        container = ttk.Frame(self.grid_tab)
+        container.grid(row=0, column=0, sticky="n", padx=20, pady=20)
 
-        # Generate Report Button
-        ttk.Button(container, text="Generate Report", command=self.generate_report).grid(row=1, column=0, pady=20)
+        # Class, and any date in the month to show
+        self.grid_bar = SessionBar(container, classes=self.known_classes)
+        self.grid_bar.grid(row=0, column=0, pady=10)
 
-    # Database operations methods remain the same
+        # Students down, days across; only the visible rows are drawn
+        self.month_grid = MatrixCanvas(container, height=15, name="month")
+        self.month_grid.grid(row=1, column=0, pady=20)
+
+        ttk.Button(container, text="Load Month", command=self.load_month).grid(row=2, column=0, pady=10)
+
+    # Database work is done by attendance_core; these methods only gather input and show results
     def add_student(self):
         name = self.name_entry.get()
         roll_number = self.roll_number_entry.get()
         student_class = self.class_entry.get()
 
         if name and roll_number and student_class:
-            conn = sqlite3.connect('attendance.db')
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO students (name, roll_number, class) VALUES (?, ?, ?)",
-                           (name, roll_number, student_class))
-            conn.commit()
-            conn.close()
+            self.tasks.submit(add_student, self.db, name, roll_number, student_class, write=True,
+                              on_done=lambda _: self.students_changed("Student added successfully!"),
+                              on_error=self.show_error)
 
             # Clear entries
             for entry in self.entries:
                 entry.delete(0, tk.END)
-
-            messagebox.showinfo("Success", "Student added successfully!")
-            self.view_students()
         else:
             messagebox.showerror("Error", "All fields are required!")
 
+    def show_error(self, error):
+        messagebox.showerror("Error", str(error))
+
+    def students_changed(self, message):
+        messagebox.showinfo("Success", message)
+        self.view_students()
+
     def view_students(self):
-        for item in self.student_tree.get_children():
-            self.student_tree.delete(item)
+        # Keep showing search results while a search is active
+        if self.student_search.get():
+            self.search_roster(self.student_search.get())
+            return
 
-        conn = sqlite3.connect('attendance.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM students")
+        # Served from the roster cache; it queries the database only when something was committed since
+        self.tasks.submit(RosterRows(self.roster).prefetch, self.student_tree.height, key="students",
+                          on_done=self.student_tree.set_rows, on_error=self.show_error)
 
-        for row in cursor.fetchall():
-            self.student_tree.insert("", "end", values=row)
+    def search_roster(self, text):
+        if not text:
+            self.view_students()
+            return
 
-        conn.close()
+        # Same key as view_students, so a newer search cancels an older one
+        self.tasks.submit(search_students, self.db, text, SEARCH_LIMIT, key="students",
+                          on_done=lambda rows: self.student_tree.set_rows(StaticRows(rows)),
+                          on_error=self.show_error)
 
     def delete_student(self):
         selected = self.student_tree.selection()
         if selected:
-            student_id = self.student_tree.item(selected)["values"][0]
-
-            conn = sqlite3.connect('attendance.db')
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM students WHERE student_id=?", (student_id,))
-            conn.commit()
-            conn.close()
-
-            messagebox.showinfo("Success", "Student deleted successfully!")
-            self.view_students()
+            student_id = self.student_tree.row(selected[0])[0]
+
+            # Yes moves the attendance history to the archive, No purges it
+            archive = messagebox.askyesnocancel(
+                "Delete Student",
+                "Keep this student's attendance history in the archive?\n\n"
+                "Yes archives it, No deletes it permanently.")
+            if archive is None:
+                return
+            self.tasks.submit(delete_student, self.db, student_id, archive, write=True,
+                              on_done=lambda _: self.students_changed("Student deleted successfully!"),
+                              on_error=self.show_error)
         else:
             messagebox.showerror("Error", "Please select a student to delete!")
 
+    def import_students(self):
+        path = filedialog.askopenfilename(title="Import Roster",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+
+        # Streams the CSV on the writer thread, inserting valid rows in batches
+        self.import_status.configure(text="Importing...")
+        self.tasks.submit(lambda: import_roster_file(self.db, path, progress=current_task().progress),
+                          write=True,
+                          on_progress=lambda done, total: self.import_status.configure(text=f"Read {done} rows..."),
+                          on_done=self.students_imported,
+                          on_error=self.import_failed)
+
+    def students_imported(self, result):
+        self.import_status.configure(text=result.summary())
+        if result.rejected:
+            messagebox.showwarning("Import Finished", result.summary() + "\n\n" + describe_errors(result))
+        else:
+            messagebox.showinfo("Import Finished", result.summary())
+        self.view_students()
+
+    def import_failed(self, error):
+        self.import_status.configure(text="")
+        self.show_error(error)
+
+    def known_classes(self):
+        # Never query from the UI thread: offer the classes last loaded and refresh them for next time
+        self.tasks.submit(self.roster.classes, key="classes")
+        return self.roster.loaded_classes()
+
     def load_students_for_attendance(self):
-        for item in self.attendance_tree.get_children():
-            self.attendance_tree.delete(item)
+        try:
+            student_class, attendance_date = self.session_bar.values()
+        except ValueError as error:
+            messagebox.showerror("Error", str(error))
+            return
+
+        if self.session is not None and self.session.dirty and not messagebox.askyesno(
+                "Unsaved Attendance", "Discard the marks that have not been saved?"):
+            return
 
-        conn = sqlite3.connect('attendance.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT student_id, name FROM students")
+        # Only the chosen class is read, through idx_students_class
+        session = AttendanceSession(student_class, attendance_date, pending="")
+        self.tasks.submit(session.load, self.db, key="roster",
+                          on_done=self.show_session, on_error=self.show_error)
 
-        for row in cursor.fetchall():
-            self.attendance_tree.insert("", "end", values=(row[0], row[1], ""))
+    def show_session(self, session):
+        self.session = session
+        self.attendance_tree.set_rows(StaticRows(session.rows()))
 
-        conn.close()
+    def update_session_rows(self, indexes):
+        for index in indexes:
+            self.attendance_tree.set_row(index, self.session.row(index))
 
     def mark_present(self):
-        selected = self.attendance_tree.selection()
-        for item in selected:
-            student_id = self.attendance_tree.item(item)["values"][0]
-            self.attendance_tree.set(item, column="Status", value="Present")
-            self.record_attendance(student_id, "Present")
+        self.mark_selected("Present")
 
     def mark_absent(self):
-        selected = self.attendance_tree.selection()
-        for item in selected:
-            student_id = self.attendance_tree.item(item)["values"][0]
-            self.attendance_tree.set(item, column="Status", value="Absent")
-            self.record_attendance(student_id, "Absent")
-
-    def record_attendance(self, student_id, status):
-        today = date.today().strftime("%Y-%m-%d")
-
-        conn = sqlite3.connect('attendance.db')
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO attendance (student_id, date, status) VALUES (?, ?, ?)",
-                       (student_id, today, status))
-        conn.commit()
-        conn.close()
+        self.mark_selected("Absent")
 
-    def generate_report(self):
-        for item in self.report_tree.get_children():
-            self.report_tree.delete(item)
+    def mark_selected(self, status):
+        # Marks are staged in the session until Save Session writes them
+        if self.session is not None:
+            self.update_session_rows(self.session.mark(self.attendance_tree.selection(), status))
+
+    def mark_remaining_present(self):
+        self.mark_all_remaining("Present")
+
+    def mark_remaining_absent(self):
+        self.mark_all_remaining("Absent")
+
+    def mark_all_remaining(self, status):
+        if self.session is not None:
+            self.update_session_rows(self.session.mark_remaining(status))
 
-        conn = sqlite3.connect('attendance.db')
-        cursor = conn.cursor()
-        cursor.execute('''SELECT s.name, s.roll_number, a.date, a.status 
-                         FROM attendance a 
-                         JOIN students s ON a.student_id = s.student_id
-                         ORDER BY a.date DESC''')
+    def save_session(self):
+        if self.session is None or not self.session.dirty:
+            return
 
-        for row in cursor.fetchall():
-            self.report_tree.insert("", "end", values=row)
+        session = self.session
+        records = session.pending()
 
-        conn.close()
+        def on_done(count):
+            indexes = session.committed(records)
+            if session is self.session:
+                self.update_session_rows(indexes)
+            # Repaint just the grid cells the marks changed
+            if self.month_grid is not None:
+                self.month_grid.apply_marks(records)
+            messagebox.showinfo("Success", f"Saved attendance for {count} student(s)!")
+
+        # The whole session is written in one transaction
+        self.tasks.submit(mark_many, self.db, records, write=True, on_done=on_done, on_error=self.show_error)
+
+    def load_month(self):
+        try:
+            student_class, month = self.grid_bar.values()
+        except ValueError as error:
+            messagebox.showerror("Error", str(error))
+            return
+
+        self.tasks.submit(load_matrix, self.db, student_class, month, key="month",
+                          on_done=self.month_grid.set_matrix, on_error=self.show_error)
+
+    def generate_report(self):
+        try:
+            filters = self.report_filters.values()
+        except ValueError:
+            messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format!")
+            return
+
+        # Analytics views aggregate in SQL; the records view is paged
+        view = self.report_filters.view()
+        if view in VIEWS:
+            columns, widths = VIEWS[view][0], None
+            job = (lambda: StaticRows(run_view(self.db, view, **filters)),)
+        else:
+            columns, widths = REPORT_COLUMNS, self.report_widths
+            job = (report_pages(self.db, **filters).prefetch, self.report_tree.height)
+
+        # A newer click cancels the report query that is still running
+        self.report_progress.start(10)
+        self.tasks.submit(*job, key="report",
+                          on_done=lambda rows: self.show_report(rows, columns, widths),
+                          on_error=self.report_failed)
+
+    def show_report(self, rows, columns, widths):
+        self.report_progress.stop()
+        self.report_tree.set_columns(columns, widths)
+        self.report_tree.set_rows(rows)
+
+    def export_report(self):
+        try:
+            filters = self.report_filters.values()
+        except ValueError:
+            messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format!")
+            return
+        path = filedialog.asksaveasfilename(title="Export Records", defaultextension=".csv",
+                                            filetypes=[("CSV files", "*.csv"), ("JSON Lines", "*.jsonl"),
+                                                       ("Columnar export", "*.atcol")])
+        if not path:
+            return
+
+        # Streams the filtered records to the file on a worker thread; the format follows the extension
+        self.export_status.configure(text="Exporting...")
+        self.tasks.submit(lambda: export_file(self.db, path, progress=current_task().progress, **filters),
+                          key="export",
+                          on_progress=lambda done, total: self.export_status.configure(text=f"Wrote {done} rows..."),
+                          on_done=lambda count: self.export_status.configure(text=f"Exported {count} row(s)."),
+                          on_error=self.export_failed)
+
+    def export_failed(self, error):
+        self.export_status.configure(text="")
+        self.show_error(error)
+
+    def report_failed(self, error):
+        self.report_progress.stop()
+        self.show_error(error)
 
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = AttendanceApp(root)
+    STARTUP.mark("window built")
     root.mainloop()
@@ -1,27 +1,22 @@
 import tkinter as tk
-from tkinter import messagebox, ttk
-import sqlite3
-from datetime import date
-
-def initialize_db():
-    """Initializes the SQLite database and creates necessary tables."""
-    conn = sqlite3.connect('attendance.db')
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS students (
-                        student_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL,
-                        roll_number TEXT NOT NULL,
-                        class TEXT NOT NULL)''')
-    cursor.execute('''CREATE TABLE IF NOT EXISTS attendance (
-                        attendance_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        student_id INTEGER,
-                        date TEXT NOT NULL,
-                        status TEXT NOT NULL,
-                        FOREIGN KEY (student_id) REFERENCES students(student_id))''')
-    conn.commit()
-    conn.close()
-
-initialize_db()
+from tkinter import filedialog, messagebox, ttk
+
+from attendance_core import TaskExecutor, current_task, get_database, mark_many, migrate
+from attendance_core.analytics import VIEWS, run_view
+from attendance_core.export import export_file
+from attendance_core.importer import describe_errors, import_roster_file
+from attendance_core.matrix import load_matrix
+from attendance_core.paging import StaticRows
+from attendance_core.profiling import STARTUP
+from attendance_core.reports import REPORT_COLUMNS, report_pages
+from attendance_core.roster import RosterCache, RosterRows
+from attendance_core.search import search_students
+from attendance_core.sessions import SESSION_COLUMNS, AttendanceSession
+from attendance_core.students import add_student, delete_student
+from attendance_widgets import (DiagnosticsPanel, MatrixCanvas, ReportFilterBar, SearchBox, SessionBar,
+                                VirtualTreeview)
+
+SEARCH_LIMIT = 100
 
 class AttendanceApp:
     def __init__(self, root):
@@ -29,10 +24,20 @@ class AttendanceApp:
         self.root.title("Student Attendance Management System")
         self.root.geometry("800x600")
         self.root.configure(bg='#C6E7FF')
+        self.db = get_database()
+        self.roster = RosterCache(self.db)
+        self.session = None
+        self.tasks = TaskExecutor()
+        self.tasks.attach(self.root)
+        STARTUP.watch(self.root, "schema checked")
+
+        # The schema check runs on the writer thread while the window comes up;
+        # reads wait for it
+        self.tasks.prepare(migrate, self.db, on_done=lambda version: STARTUP.mark("schema checked"),
+                           on_error=self.show_db_error)
 
         self.setup_style()
         self.setup_gui()
-        self.view_students()
 
     def setup_style(self):
         """Sets the style for the application."""
@@ -56,14 +61,45 @@ class AttendanceApp:
         self.student_tab = ttk.Frame(tab_control)
         self.attendance_tab = ttk.Frame(tab_control)
         self.report_tab = ttk.Frame(tab_control)
+        self.grid_tab = ttk.Frame(tab_control)
 
         tab_control.add(self.student_tab, text="Manage Students")
         tab_control.add(self.attendance_tab, text="Mark Attendance")
         tab_control.add(self.report_tab, text="Generate Report")
-
-        self.setup_student_tab()
-        self.setup_attendance_tab()
-        self.setup_report_tab()
+        tab_control.add(self.grid_tab, text="Monthly Grid")
+        self.tab_control = tab_control
+        self.month_grid = None
+
+        # Hidden profiling tab, built the first time Ctrl+Shift+D is pressed
+        self.diagnostics_tab = None
+        self.root.bind("<Control-Shift-D>", self.show_diagnostics)
+
+        # Each tab is built, and loads its rows, the first time it is selected
+        self.tab_setup = {
+            str(self.student_tab): self.setup_student_tab,
+            str(self.attendance_tab): self.setup_attendance_tab,
+            str(self.report_tab): self.setup_report_tab,
+            str(self.grid_tab): self.setup_grid_tab,
+        }
+        tab_control.bind("<<NotebookTabChanged>>", self.tab_opened)
+        self.tab_opened()
+
+    def tab_opened(self, event=None):
+        """Builds the selected tab if this is the first time it is shown."""        
+        setup = self.tab_setup.pop(str(self.tab_control.select()), None)
+        if setup is not None:
+            setup()
+            STARTUP.mark(f"{self.tab_control.tab('current', 'text')} tab built")
+
+    def show_diagnostics(self, event=None):
+        """Opens the hidden Diagnostics tab with the profiler's latest figures."""        
+        if self.diagnostics_tab is None:
+            self.diagnostics_tab = DiagnosticsPanel(self.tab_control, stats=self.db.stats,
+                                                    results=self.db.results)
+            self.tab_control.add(self.diagnostics_tab, text="Diagnostics")
+        else:
+            self.diagnostics_tab.refresh()
+        self.tab_control.select(self.diagnostics_tab)
 
     def setup_student_tab(self):
         """Sets up the GUI components for the Student Management tab."""        
@@ -92,34 +128,50 @@ class AttendanceApp:
         buttons = [
             ("Add Student", self.add_student),
             ("View Students", self.view_students),
-            ("Delete Student", self.delete_student)
+            ("Delete Student", self.delete_student),
+            ("Import Roster", self.import_students)
         ]
 
         for i, (text, command) in enumerate(buttons):
             ttk.Button(btn_frame, text=text, command=command).grid(row=0, column=i, padx=10)
 
+        self.import_status = ttk.Label(container, text="")
+        self.import_status.pack()
+
+        self.student_search = SearchBox(container, self.search_roster, label="Search name or roll number:")
+        self.student_search.pack()
+
         # Treeview Frame
         self.student_tree = self.create_treeview(container, 
                                                   ["ID", "Name", "Roll Number", "Class"],
-                                                  ["100", "200", "150", "150"])
+                                                  ["100", "200", "150", "150"],
+                                                  name="students")
+        self.view_students()
 
     def setup_attendance_tab(self):
         """Sets up the GUI components for the Attendance tab."""        
         container = ttk.Frame(self.attendance_tab)
         container.pack(expand=True)
 
+        self.session_bar = SessionBar(container, classes=self.known_classes)
+        self.session_bar.pack(pady=10)
+
         # Treeview Frame
         self.attendance_tree = self.create_treeview(container, 
-                                                     ["ID", "Name", "Status"],
-                                                     ["100", "200", "150"])
+                                                     SESSION_COLUMNS,
+                                                     ["80", "200", "120", "100", "80"],
+                                                     name="attendance")
 
         btn_frame = ttk.Frame(container)
         btn_frame.pack(pady=20)
 
         buttons = [
-            ("Load Students", self.load_students_for_attendance),
+            ("Load Session", self.load_students_for_attendance),
             ("Mark Present", self.mark_present),
-            ("Mark Absent", self.mark_absent)
+            ("Mark Absent", self.mark_absent),
+            ("All Remaining Present", self.mark_remaining_present),
+            ("All Remaining Absent", self.mark_remaining_absent),
+            ("Save Session", self.save_session)
         ]
 
         for i, (text, command) in enumerate(buttons):
@@ -130,44 +182,49 @@ class AttendanceApp:
         container = ttk.Frame(self.report_tab)
         container.pack(expand=True)
 
+        self.report_filters = ReportFilterBar(container)
+        self.report_filters.pack(pady=10)
+
+        self.report_widths = ["200", "150", "150", "100"]
         self.report_tree = self.create_treeview(container, 
-                                                 ["Name", "Roll Number", "Date", "Status"],
-                                                 ["200", "150", "150", "100"])
+                                                 REPORT_COLUMNS,
+                                                 self.report_widths,
+                                                 name="report")
+
+        btn_frame = ttk.Frame(container)
+        btn_frame.pack(pady=20)
+        ttk.Button(btn_frame, text="Generate Report", command=self.generate_report).grid(row=0, column=0, padx=10)
+        ttk.Button(btn_frame, text="Export Records", command=self.export_report).grid(row=0, column=1, padx=10)
 
-        ttk.Button(container, text="Generate Report", command=self.generate_report).pack(pady=20)
+        self.report_progress = ttk.Progressbar(container, mode="indeterminate", length=300)
+        self.report_progress.pack()
 
-    def create_treeview(self, parent, columns, widths):
-        """Creates a Treeview with specified columns and widths."""        
-        tree_frame = ttk.Frame(parent)
-        tree_frame.pack(pady=20)
+        self.export_status = ttk.Label(container, text="")
+        self.export_status.pack(pady=5)
 
-        tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=15)
+    def setup_grid_tab(self):
+        """Sets up the GUI components for the Monthly Grid tab."""        
+        container = ttk.Frame(self.grid_tab)
+        container.pack(expand=True)
 
-        for col, width in zip(columns, widths):
-            tree.column(col, width=int(width), anchor="center")
-            tree.heading(col, text=col, anchor="center")
+        # Any date picks its month
+        self.grid_bar = SessionBar(container, classes=self.known_classes)
+        self.grid_bar.pack(pady=10)
 
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
+        self.month_grid = MatrixCanvas(container, height=15, name="month")
+        self.month_grid.pack(pady=10)
 
-        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        ttk.Button(container, text="Load Month", command=self.load_month).pack(pady=10)
 
+    def create_treeview(self, parent, columns, widths, name="table"):
+        """Creates a virtualized Treeview with specified columns and widths."""        
+        tree = VirtualTreeview(parent, columns, [int(width) for width in widths], height=15, name=name)
+        tree.pack(pady=20)
         return tree
 
-    def execute_db_query(self, query, params=(), fetch=False):
-        """Executes a database query and handles errors."""        
-        try:
-            conn = sqlite3.connect('attendance.db')
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            if fetch:
-                return cursor.fetchall()
-            conn.commit()
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", str(e))
-        finally:
-            conn.close()
+    def show_db_error(self, error):
+        """Shows a database error raised by a background task."""        
+        messagebox.showerror("Database Error", str(error))
 
     def add_student(self):
         """Adds a new student to the database."""        
@@ -176,41 +233,114 @@ class AttendanceApp:
         student_class = self.class_entry.get()
 
         if name and roll_number and student_class:
-            self.execute_db_query("INSERT INTO students (name, roll_number, class) VALUES (?, ?, ?)", 
-                                   (name, roll_number, student_class))
-            messagebox.showinfo("Success", "Student added successfully!")
-            self.view_students()
+            self.tasks.submit(add_student, self.db, name, roll_number, student_class, write=True,
+                              on_done=lambda _: self.students_changed("Student added successfully!"),
+                              on_error=self.show_db_error)
         else:
             messagebox.showwarning("Input Error", "Please fill all fields.")
 
-    def view_students(self):
-        """Displays all students in the Treeview."""        
-        for row in self.student_tree.get_children():
-            self.student_tree.delete(row)
+    def students_changed(self, message):
+        """Confirms a completed student change and reloads the list."""        
+        messagebox.showinfo("Success", message)
+        self.view_students()
 
-        students = self.execute_db_query("SELECT * FROM students", fetch=True)
-        for student in students:
-            self.student_tree.insert("", "end", values=student)
+    def view_students(self):
+        """Displays all students in the Treeview from the roster cache, or the current search results."""        
+        if self.student_search.get():
+            self.search_roster(self.student_search.get())
+            return
+        self.tasks.submit(RosterRows(self.roster).prefetch, self.student_tree.height, key="students",
+                          on_done=self.student_tree.set_rows, on_error=self.show_db_error)
+
+    def search_roster(self, text):
+        """Shows the top matches for the search text, or every student when it is empty."""        
+        if not text:
+            self.view_students()
+            return
+        self.tasks.submit(search_students, self.db, text, SEARCH_LIMIT, key="students",
+                          on_done=lambda rows: self.student_tree.set_rows(StaticRows(rows)),
+                          on_error=self.show_db_error)
 
     def delete_student(self):
         """Deletes the selected student from the database."""        
-        selected_item = self.student_tree.selection()
-        if selected_item:
-            student_id = self.student_tree.item(selected_item)["values"][0]
-            self.execute_db_query("DELETE FROM students WHERE student_id=?", (student_id,))
-            messagebox.showinfo("Success", "Student deleted successfully!")
-            self.view_students()
+        selected_rows = self.student_tree.selection()
+        if selected_rows:
+            student_id = self.student_tree.row(selected_rows[0])[0]
+            archive = messagebox.askyesnocancel(
+                "Delete Student",
+                "Keep this student's attendance history in the archive?\n\n"
+                "Yes archives it, No deletes it permanently.")
+            if archive is None:
+                return
+            self.tasks.submit(delete_student, self.db, student_id, archive, write=True,
+                              on_done=lambda _: self.students_changed("Student deleted successfully!"),
+                              on_error=self.show_db_error)
         else:
             messagebox.showwarning("Selection Error", "Please select a student to delete.")
 
-    def load_students_for_attendance(self):
-        """Loads students into the attendance Treeview."""        
-        for row in self.attendance_tree.get_children():
-            self.attendance_tree.delete(row)
+    def import_students(self):
+        """Imports students from a CSV roster on the writer thread."""        
+        path = filedialog.askopenfilename(title="Import Roster",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+
+        self.import_status.configure(text="Importing...")
+        self.tasks.submit(lambda: import_roster_file(self.db, path, progress=current_task().progress),
+                          write=True,
+                          on_progress=lambda done, total: self.import_status.configure(text=f"Read {done} rows..."),
+                          on_done=self.students_imported,
+                          on_error=self.import_failed)
+
+    def students_imported(self, result):
+        """Reports the outcome of a roster import and reloads the list."""        
+        self.import_status.configure(text=result.summary())
+        if result.rejected:
+            messagebox.showwarning("Import Finished", result.summary() + "\n\n" + describe_errors(result))
+        else:
+            messagebox.showinfo("Import Finished", result.summary())
+        self.view_students()
 
-        students = self.execute_db_query("SELECT * FROM students", fetch=True)
-        for student in students:
-            self.attendance_tree.insert("", "end", values=(student[0], student[1], "Pending"))
+    def import_failed(self, error):
+        """Clears the import status and reports the error."""        
+        self.import_status.configure(text="")
+        if isinstance(error, (OSError, ValueError)):
+            messagebox.showerror("Import Error", str(error))
+        else:
+            self.show_db_error(error)
+
+    def known_classes(self):
+        """Returns the classes last loaded into the roster cache and refreshes them in the background."""        
+        self.tasks.submit(self.roster.classes, key="classes")
+        return self.roster.loaded_classes()
+
+    def load_students_for_attendance(self):
+        """Loads the chosen class and its marks for the chosen date into the attendance Treeview."""        
+        try:
+            student_class, attendance_date = self.session_bar.values()
+        except ValueError as error:
+            messagebox.showwarning("Input Error", str(error))
+            return
+
+        if self.session is not None and self.session.dirty and not messagebox.askyesno(
+                "Unsaved Attendance", "Discard the marks that have not been saved?"):
+            return
+
+        session = AttendanceSession(student_class, attendance_date)
+        self.tasks.submit(session.load, self.db, key="roster",
+                          on_done=self.show_session, on_error=self.show_db_error)
+
+    def show_session(self, session):
+        """Displays a loaded attendance session."""        
+        self.session = session
+        self.attendance_tree.set_rows(StaticRows(session.rows()))
+        if not session.students:
+            messagebox.showinfo("Empty Class", f"No students are enrolled in {session.student_class}.")
+
+    def update_session_rows(self, indexes):
+        """Redraws the given rows of the attendance Treeview from the session."""        
+        for index in indexes:
+            self.attendance_tree.set_row(index, self.session.row(index))
 
     def mark_present(self):
         """Marks the selected student as present."""        
@@ -221,35 +351,124 @@ class AttendanceApp:
         self.mark_attendance("Absent")
 
     def mark_attendance(self, status):
-        """Marks the selected student in the attendance Treeview."""        
-        selected_item = self.attendance_tree.selection()
-        if selected_item:
-            student_id = self.attendance_tree.item(selected_item)["values"][0]
-            current_date = date.today().isoformat()
-            self.execute_db_query("INSERT INTO attendance (student_id, date, status) VALUES (?, ?, ?)",
-                                   (student_id, current_date, status))
-
-            # Update the Treeview to show the marked status
-            self.attendance_tree.item(selected_item, values=(student_id, self.attendance_tree.item(selected_item)["values"][1], status))
-            
-            messagebox.showinfo("Success", f"Marked as {status.lower()}!")
+        """Stages a mark for the selected students in the session; Save Session writes it."""        
+        selected_rows = self.attendance_tree.selection()
+        if selected_rows:
+            self.update_session_rows(self.session.mark(selected_rows, status))
         else:
             messagebox.showwarning("Selection Error", "Please select a student to mark.")
 
+    def mark_remaining_present(self):
+        """Marks every pending student in the loaded roster as present."""        
+        self.mark_all_remaining("Present")
+
+    def mark_remaining_absent(self):
+        """Marks every pending student in the loaded roster as absent."""        
+        self.mark_all_remaining("Absent")
+
+    def mark_all_remaining(self, status):
+        """Stages the given status for every unmarked student in the session."""        
+        if self.session is None:
+            messagebox.showwarning("Selection Error", "Please load a session first.")
+            return
+
+        self.update_session_rows(self.session.mark_remaining(status))
+
+    def save_session(self):
+        """Writes every staged mark of the session in a single transaction."""        
+        records = self.session.pending() if self.session is not None else []
+        if not records:
+            messagebox.showinfo("Nothing to Save", "There are no unsaved marks.")
+            return
+
+        session = self.session
+
+        def on_done(count):
+            indexes = session.committed(records)
+            if session is self.session:
+                self.update_session_rows(indexes)
+            if self.month_grid is not None:
+                self.month_grid.apply_marks(records)
+            messagebox.showinfo("Success", f"Saved attendance for {count} student(s)!")
+
+        self.tasks.submit(mark_many, self.db, records, write=True,
+                          on_done=on_done, on_error=self.show_db_error)
+
+    def load_month(self):
+        """Loads the chosen class's month of attendance into the grid on a worker thread."""        
+        try:
+            student_class, month = self.grid_bar.values()
+        except ValueError as error:
+            messagebox.showwarning("Input Error", str(error))
+            return
+
+        self.tasks.submit(load_matrix, self.db, student_class, month, key="month",
+                          on_done=self.month_grid.set_matrix, on_error=self.show_db_error)
+
     def generate_report(self):
-        """Generates a report of attendance."""        
-        for row in self.report_tree.get_children():
-            self.report_tree.delete(row)
+        """Generates the selected report view on a worker thread, showing progress meanwhile."""        
+        try:
+            filters = self.report_filters.values()
+        except ValueError:
+            messagebox.showwarning("Input Error", "Dates must be in YYYY-MM-DD format.")
+            return
+
+        view = self.report_filters.view()
+        if view in VIEWS:
+            columns, widths = VIEWS[view][0], None
+            job = (lambda: StaticRows(run_view(self.db, view, **filters)),)
+        else:
+            columns, widths = REPORT_COLUMNS, self.report_widths
+            job = (report_pages(self.db, **filters).prefetch, self.report_tree.height)
 
-        report_data = self.execute_db_query('''SELECT students.name, students.roll_number, attendance.date, attendance.status
-                                                FROM attendance
-                                                JOIN students ON attendance.student_id = students.student_id''', fetch=True)
+        self.report_progress.start(10)
 
-        for report in report_data:
-            self.report_tree.insert("", "end", values=report)
+        self.tasks.submit(*job, key="report",
+                          on_done=lambda rows: self.show_report(rows, columns, widths),
+                          on_error=self.report_failed)
+
+    def show_report(self, rows, columns, widths):
+        """Displays a finished report in the report Treeview."""        
+        self.report_progress.stop()
+        self.report_tree.set_columns(columns, widths)
+        self.report_tree.set_rows(rows)
+
+    def report_failed(self, error):
+        """Stops the progress indicator and reports the error."""        
+        self.report_progress.stop()
+        self.show_db_error(error)
+
+    def export_report(self):
+        """Streams the filtered attendance records to a CSV, JSONL or columnar file."""        
+        try:
+            filters = self.report_filters.values()
+        except ValueError:
+            messagebox.showwarning("Input Error", "Dates must be in YYYY-MM-DD format.")
+            return
+        path = filedialog.asksaveasfilename(title="Export Records", defaultextension=".csv",
+                                            filetypes=[("CSV files", "*.csv"), ("JSON Lines", "*.jsonl"),
+                                                       ("Columnar export", "*.atcol")])
+        if not path:
+            return
+
+        self.export_status.configure(text="Exporting...")
+        self.tasks.submit(lambda: export_file(self.db, path, progress=current_task().progress, **filters),
+                          key="export",
+                          on_progress=lambda done, total: self.export_status.configure(text=f"Wrote {done} rows..."),
+                          on_done=lambda count: self.export_status.configure(text=f"Exported {count} row(s)."),
+                          on_error=self.export_failed)
+
+    def export_failed(self, error):
+        """Clears the export status and reports the error."""        
+        self.export_status.configure(text="")
+        if isinstance(error, OSError):
+            messagebox.showerror("Export Error", str(error))
+        else:
+            self.show_db_error(error)
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = AttendanceApp(root)
+    STARTUP.mark("window built")
     root.mainloop()
 
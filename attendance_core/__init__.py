@@ -0,0 +1,12 @@
+"""UI-free core of the Student Attendance Management System."""
+from .attendance import STATUSES, mark_many, mark_remaining, mark_student
+from .db import DEFAULT_PATH, Database, QueryStats, get_database
+from .schema import SCHEMA_VERSION, migrate, schema_version
+from .tasks import Task, TaskCancelled, TaskExecutor, current_task
+
+__all__ = [
+    'DEFAULT_PATH', 'Database', 'QueryStats', 'get_database',
+    'STATUSES', 'mark_many', 'mark_remaining', 'mark_student',
+    'SCHEMA_VERSION', 'migrate', 'schema_version',
+    'Task', 'TaskCancelled', 'TaskExecutor', 'current_task',
+]
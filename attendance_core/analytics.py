@@ -0,0 +1,166 @@
+"""Aggregated attendance analytics.
+
+All aggregation happens inside SQLite with GROUP BY and window functions,
+so only one row per student (or class) ever reaches Python.  Filters use
+the same ``a``/``s`` aliases as the report queries.  Per-day and per-class
+figures read the ``daily_summary`` rollup, whose size does not depend on
+how many students were marked.  ``run_view`` results are kept in the
+database's result cache until the next write.
+"""
+from .attendance import ABSENT, PRESENT, date_sql, status_code
+from .partitions import attendance_source
+from .reports import report_filters
+from .summary import daily_summary, summary_filters
+
+STUDENT_RATE_COLUMNS = ("ID", "Name", "Roll Number", "Class", "Present", "Days", "Rate %")
+CLASS_RATE_COLUMNS = ("Class", "Students", "Present", "Days", "Rate %")
+DAILY_COLUMNS = ("Date", "Class", "Present", "Absent", "Rate %")
+ABSENTEE_COLUMNS = ("ID", "Name", "Roll Number", "Class", "Absent", "Days", "Absent %")
+STREAK_COLUMNS = ("ID", "Name", "Roll Number", "Class", "Current Streak", "Longest Streak")
+
+_JOIN = " a JOIN students s ON a.student_id = s.student_id"
+
+
+def _where(start_date, end_date, student_class, roll_number):
+    where, params = report_filters(start_date=start_date, end_date=end_date,
+                                   student_class=student_class, roll_number=roll_number)
+    return (" WHERE " + " AND ".join(where) if where else ""), params
+
+
+def student_rates(db, start_date=None, end_date=None, student_class=None, roll_number=None):
+    """Per-student present count, recorded days and attendance rate, lowest rate first."""
+    where, params = _where(start_date, end_date, student_class, roll_number)
+    with attendance_source(db, start_date, end_date) as attendance:
+        return db.query(f'''SELECT s.student_id, s.name, s.roll_number, s.class,
+                                   SUM(a.status_code = {PRESENT}) AS present,
+                                   COUNT(*) AS days,
+                                   ROUND(100.0 * SUM(a.status_code = {PRESENT}) / COUNT(*), 1) AS rate
+                            FROM {attendance}{_JOIN}{where}
+                            GROUP BY a.student_id
+                            ORDER BY rate, s.student_id''', params)
+
+
+def class_rates(db, start_date=None, end_date=None, student_class=None, roll_number=None):
+    """Per-class enrolled students, present count, recorded days and attendance rate.
+
+    Reads the daily_summary rollup unless a roll number narrows it to one student.
+    """
+    if not roll_number:
+        where, params = summary_filters(start_date, end_date, student_class)
+        return db.query(f'''SELECT d.class,
+                                   COALESCE(e.students, 0),
+                                   SUM(d.present),
+                                   SUM(d.present + d.absent),
+                                   ROUND(100.0 * SUM(d.present) / SUM(d.present + d.absent), 1)
+                            FROM daily_summary d
+                            LEFT JOIN (SELECT class, COUNT(*) AS students
+                                       FROM students GROUP BY class) e ON e.class = d.class{where}
+                            GROUP BY d.class
+                            ORDER BY d.class''', params)
+
+    where, params = _where(start_date, end_date, student_class, roll_number)
+    with attendance_source(db, start_date, end_date) as attendance:
+        return db.query(f'''SELECT s.class,
+                                   COUNT(DISTINCT a.student_id),
+                                   SUM(a.status_code = {PRESENT}),
+                                   COUNT(*),
+                                   ROUND(100.0 * SUM(a.status_code = {PRESENT}) / COUNT(*), 1)
+                            FROM {attendance}{_JOIN}{where}
+                            GROUP BY s.class
+                            ORDER BY s.class''', params)
+
+
+def chronic_absentees(db, start_date=None, end_date=None, student_class=None, roll_number=None,
+                      threshold=0.10, min_days=1):
+    """Students absent on at least ``threshold`` of their recorded days, worst first."""
+    where, params = _where(start_date, end_date, student_class, roll_number)
+    with attendance_source(db, start_date, end_date) as attendance:
+        return db.query(f'''SELECT s.student_id, s.name, s.roll_number, s.class,
+                                   SUM(a.status_code = {ABSENT}) AS absent,
+                                   COUNT(*) AS days,
+                                   ROUND(100.0 * SUM(a.status_code = {ABSENT}) / COUNT(*), 1) AS absent_rate
+                            FROM {attendance}{_JOIN}{where}
+                            GROUP BY a.student_id
+                            HAVING COUNT(*) >= ? AND SUM(a.status_code = {ABSENT}) >= ? * COUNT(*)
+                            ORDER BY absent_rate DESC, s.student_id''', params + [min_days, threshold])
+
+
+def streaks(db, start_date=None, end_date=None, student_class=None, roll_number=None,
+            status='Absent', min_length=2):
+    """Current and longest runs of consecutive school days with ``status`` per student.
+
+    School days are the dates on which any filtered attendance was taken.
+    Runs are found with the gaps-and-islands technique: along a run, the
+    school-day number minus the row number of the student's matching marks
+    is constant, so only the rows with ``status`` need to be windowed.
+    """
+    where, params = _where(start_date, end_date, student_class, roll_number)
+    with attendance_source(db, start_date, end_date) as attendance:
+        return db.query(f'''WITH marks AS (
+                                SELECT a.student_id, a.day, a.status_code
+                                FROM {attendance}{_JOIN}{where}),
+                            days AS (
+                                SELECT day, ROW_NUMBER() OVER (ORDER BY day) AS day_no
+                                FROM (SELECT DISTINCT day FROM marks)),
+                            hits AS (
+                                SELECT m.student_id, m.day,
+                                       d.day_no - ROW_NUMBER() OVER (PARTITION BY m.student_id ORDER BY m.day)
+                                       AS island
+                                FROM marks m JOIN days d ON d.day = m.day
+                                WHERE m.status_code = ?),
+                            runs AS (
+                                SELECT student_id, COUNT(*) AS length, MAX(day) AS last_day
+                                FROM hits
+                                GROUP BY student_id, island),
+                            latest AS (
+                                SELECT student_id, MAX(day) AS last_day
+                                FROM marks
+                                GROUP BY student_id)
+                            SELECT s.student_id, s.name, s.roll_number, s.class,
+                                   MAX(CASE WHEN r.last_day = l.last_day THEN r.length ELSE 0 END)
+                                       AS current_length,
+                                   MAX(r.length) AS longest_length
+                            FROM runs r
+                            JOIN latest l ON l.student_id = r.student_id
+                            JOIN students s ON s.student_id = r.student_id
+                            GROUP BY r.student_id
+                            HAVING longest_length >= ?
+                            ORDER BY current_length DESC, longest_length DESC, s.student_id''',
+                        params + [status_code(status), min_length])
+
+
+def daily_totals(db, start_date=None, end_date=None, student_class=None, roll_number=None):
+    """Present and absent counts per day and class, newest day first."""
+    if not roll_number:
+        return daily_summary(db, start_date, end_date, student_class)
+    where, params = _where(start_date, end_date, student_class, roll_number)
+    with attendance_source(db, start_date, end_date) as attendance:
+        return db.query(f'''SELECT {date_sql('a.day')}, s.class,
+                                   SUM(a.status_code = {PRESENT}), SUM(a.status_code = {ABSENT}),
+                                   ROUND(100.0 * SUM(a.status_code = {PRESENT}) / COUNT(*), 1)
+                            FROM {attendance}{_JOIN}{where}
+                            GROUP BY a.day, s.class
+                            ORDER BY a.day DESC, s.class''', params)
+
+
+# Report-tab views: name -> (columns, function taking db and the report filters).
+VIEWS = {
+    "Daily Summary": (DAILY_COLUMNS, daily_totals),
+    "Student Rates": (STUDENT_RATE_COLUMNS, student_rates),
+    "Class Rates": (CLASS_RATE_COLUMNS, class_rates),
+    "Chronically Absent": (ABSENTEE_COLUMNS, chronic_absentees),
+    "Absence Streaks": (STREAK_COLUMNS, streaks),
+}
+
+
+def run_view(db, view, start_date=None, end_date=None, student_class=None, roll_number=None, status=None):
+    """Runs the named analytics view with the report filters.
+
+    ``status`` is accepted for symmetry with the report filters and ignored,
+    since every view aggregates over both statuses.
+    """
+    function = VIEWS[view][1]
+    filters = {'start_date': start_date, 'end_date': end_date,
+               'student_class': student_class, 'roll_number': roll_number}
+    key = ("view", view) + tuple(filters.values())
+    return list(db.results.get(db, key, lambda: tuple(function(db, **filters))))
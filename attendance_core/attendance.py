@@ -0,0 +1,108 @@
+"""Attendance marking operations.
+
+Since schema version 8 marks are stored compactly in ``attendance_marks``:
+the status as its index in ``STATUSES`` and the date as a day number
+counted from 1970-01-01.  ``day_number``/``status_code`` encode values for
+queries, and the ``*_sql`` helpers convert columns either way inside SQL.  The
+``attendance`` view keeps the old (attendance_id, student_id, date,
+status) shape for anything that still reads or writes it.
+"""
+from datetime import date, timedelta
+
+STATUSES = ('Present', 'Absent')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+PRESENT = STATUS_CODES['Present']
+ABSENT = STATUS_CODES['Absent']
+
+_EPOCH = date(1970, 1, 1)
+# Julian day of 1970-01-01, for SQLite's date() and julianday().
+JULIAN_EPOCH = 2440587.5
+
+# A repeated mark for the same student and day replaces the earlier status.
+UPSERT_ATTENDANCE = '''INSERT INTO attendance_marks (student_id, day, status_code) VALUES (?, ?, ?)
+                       ON CONFLICT (student_id, day) DO UPDATE SET status_code = excluded.status_code'''
+
+
+def day_number(value):
+    """The stored day number of a date or ISO date string."""
+    if not isinstance(value, date):
+        value = date.fromisoformat(value)
+    return (value - _EPOCH).days
+
+
+def day_text(number):
+    """The ISO date string of a stored day number."""
+    return (_EPOCH + timedelta(days=number)).isoformat()
+
+
+def status_code(status):
+    """The stored code of a status; raises ValueError for an unknown status."""
+    try:
+        return STATUS_CODES[status]
+    except (KeyError, TypeError):
+        raise ValueError(f"Unknown attendance status: {status!r}") from None
+
+
+def date_sql(column):
+    """SQL turning the day number in ``column`` back into an ISO date."""
+    return f"date({column} + {JULIAN_EPOCH})"
+
+
+def status_sql(column):
+    """SQL turning the status code in ``column`` back into its name."""
+    cases = " ".join(f"WHEN {code} THEN '{status}'" for status, code in STATUS_CODES.items())
+    return f"CASE {column} {cases} END"
+
+
+def day_number_sql(column):
+    """SQL turning the ISO date in ``column`` into a day number (NULL if it is not a date)."""
+    return f"CAST(julianday({column}) - {JULIAN_EPOCH} AS INTEGER)"
+
+
+def status_code_sql(column):
+    """SQL turning the status name in ``column`` into its code (NULL if unknown)."""
+    cases = " ".join(f"WHEN '{status}' THEN {code}" for status, code in STATUS_CODES.items())
+    return f"CASE {column} {cases} END"
+
+
+def _as_date_text(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def mark_many(db, records):
+    """Records (student_id, date, status) tuples in a single transaction.
+
+    Returns the number of rows written.
+    """
+    rows = [(student_id, day_number(attendance_date), status_code(status))
+            for student_id, attendance_date, status in records]
+    if rows:
+        db.executemany(UPSERT_ATTENDANCE, rows)
+    return len(rows)
+
+
+def mark_student(db, student_id, attendance_date, status):
+    """Records one student's status for a day, replacing any earlier mark."""
+    mark_many(db, [(student_id, attendance_date, status)])
+
+
+def mark_remaining(db, attendance_date, status, student_ids=None):
+    """Marks every student without a record on ``attendance_date`` as ``status``.
+
+    ``student_ids`` restricts the action to a loaded roster; when omitted the
+    whole ``students`` table is used.  Returns the ids that were marked.
+    """
+    code = status_code(status)
+    day = day_number(attendance_date)
+    with db.transaction() as conn:
+        marked = {row[0] for row in conn.execute(
+            "SELECT student_id FROM attendance_marks WHERE day = ?", (day,))}
+        if student_ids is None:
+            student_ids = [row[0] for row in conn.execute("SELECT student_id FROM students")]
+        remaining = [student_id for student_id in student_ids if student_id not in marked]
+        conn.executemany('''INSERT INTO attendance_marks (student_id, day, status_code) VALUES (?, ?, ?)
+                            ON CONFLICT (student_id, day) DO NOTHING''',
+                         [(student_id, day, code) for student_id in remaining])
+    return remaining
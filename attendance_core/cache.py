@@ -0,0 +1,98 @@
+"""In-memory cache of report and summary results, keyed on the data generation.
+
+A result is stored under its query key (the view or query plus every filter
+parameter) together with the database generation it was read at; see
+``Database.generation``.  Any committed write changes the generation, after
+which every cached result is stale and the whole cache is dropped on the
+next lookup, so nothing is ever answered from before a write.
+
+Entries are evicted least recently used first once their estimated size
+passes ``max_bytes``; a single result bigger than a quarter of that is
+returned but not kept.  Cached values are shared between callers, so they
+must be immutable: store tuples, not lists.
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# Sequences longer than this are sized from a sample of their first items.
+_SAMPLE = 64
+
+
+def estimate_size(value):
+    """A rough number of bytes held by ``value`` and the tuples, lists and scalars inside it."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)) and value:
+        sample = value[:_SAMPLE]
+        size += sum(estimate_size(item) for item in sample) * len(value) // len(sample)
+    return size
+
+
+class ResultCache:
+    """A thread-safe LRU of query results, capped at ``max_bytes``; zero turns it off."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            self._generation = None
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def get(self, db, key, compute):
+        """Returns the result cached under ``key``, calling ``compute()`` on a miss."""
+        if not self.max_bytes:
+            return compute()
+        # Read before the query runs: the result is at least this fresh.
+        generation = db.generation()
+        with self._lock:
+            if generation != self._generation:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.bytes = 0
+                self._generation = generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = compute()
+        size = estimate_size(value)
+        with self._lock:
+            # Another thread may have seen a write while this one was reading.
+            if generation != self._generation or size > self.max_bytes // 4:
+                return value
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return value
+
+    def snapshot(self):
+        """Returns a plain-dict copy of the counters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,311 @@
+"""Command-line interface: ``python -m attendance_core <command>``.
+
+Nothing here imports Tk, so nightly jobs and benchmarks can drive the same
+core as the GUIs on a machine without a display.  Each command imports
+what it runs inside its handler; only the database, the migrations and
+what the argument parser needs are imported up front, so a command does
+not pay at startup for the others.
+"""
+import argparse
+import csv
+import sqlite3
+import sys
+from datetime import date
+
+from .analytics import VIEWS
+from .attendance import STATUSES
+from .db import DEFAULT_PATH, get_database
+from .export import FORMATS
+from .profiling import PROFILER
+from .reports import parse_date
+from .schema import migrate
+
+RECORDS_VIEW = "records"
+
+
+def cmd_add(db, args):
+    from .students import add_student
+    student_id = add_student(db, args.name, args.roll_number, args.student_class)
+    print(f"Added student {student_id}")
+    return 0
+
+
+def cmd_delete(db, args):
+    from .students import delete_student
+    if not delete_student(db, args.student_id, archive=args.archive):
+        print(f"delete: no student {args.student_id}", file=sys.stderr)
+        return 1
+    print(f"Deleted student {args.student_id}" + (" (history archived)" if args.archive else ""))
+    return 0
+
+
+def cmd_import(db, args):
+    from .importer import import_roster_file
+    result = import_roster_file(db, args.csv_file, batch_size=args.batch_size)
+    for line_number, message in result.errors:
+        print(f"{args.csv_file}:{line_number}: {message}", file=sys.stderr)
+    if result.rejected > len(result.errors):
+        print(f"... {result.rejected - len(result.errors)} more error(s) not shown", file=sys.stderr)
+    print(result.summary())
+    return 1 if result.rejected else 0
+
+
+def cmd_mark(db, args):
+    from .attendance import mark_many, mark_remaining
+    from .sessions import AttendanceSession
+    if args.remaining and args.student_class:
+        session = AttendanceSession(args.student_class, args.date).load(db)
+        session.mark_remaining(args.status)
+        count = mark_many(db, session.pending())
+    elif args.remaining:
+        count = len(mark_remaining(db, args.date, args.status))
+    elif args.student_ids:
+        count = mark_many(db, [(student_id, args.date, args.status) for student_id in args.student_ids])
+    else:
+        print("mark: give student ids or --remaining", file=sys.stderr)
+        return 2
+    print(f"Marked {count} student(s) {args.status} on {args.date}")
+    return 0
+
+
+def _filters(args):
+    return {
+        'start_date': args.start_date,
+        'end_date': args.end_date,
+        'student_class': args.student_class,
+        'roll_number': args.roll_number,
+        'status': args.status,
+    }
+
+
+def cmd_report(db, args):
+    from .analytics import run_view
+    from .reports import REPORT_COLUMNS, stream_report
+    filters = _filters(args)
+    if args.view == RECORDS_VIEW:
+        columns, rows = REPORT_COLUMNS, stream_report(db, **filters)
+    else:
+        columns, rows = VIEWS[args.view][0], run_view(db, args.view, **filters)
+    writer = csv.writer(sys.stdout, delimiter='\t', lineterminator='\n')
+    writer.writerow(columns)
+    for count, row in enumerate(rows):
+        if args.limit is not None and count >= args.limit:
+            break
+        writer.writerow(row)
+    return 0
+
+
+def cmd_export(db, args):
+    from .export import export_file, format_for
+    filters = _filters(args)
+    if args.output == '-':
+        export_format = args.format or "csv"
+        out = sys.stdout.buffer if export_format == "columnar" else sys.stdout
+        FORMATS[export_format](db, out, **filters)
+    else:
+        export_format = args.format or format_for(args.output)
+        count = export_file(db, args.output, export_format, **filters)
+        print(f"Exported {count} row(s) to {args.output} as {export_format}")
+    return 0
+
+
+def cmd_read_columnar(db, args):
+    from .columnar import ColumnarReader
+    with open(args.input, 'rb') as stream:
+        rows = ColumnarReader(stream)
+        writer = csv.writer(sys.stdout, delimiter='\t', lineterminator='\n')
+        writer.writerow(rows.columns)
+        for count, row in enumerate(rows):
+            if args.limit is not None and count >= args.limit:
+                break
+            writer.writerow(row)
+    return 0
+
+
+def cmd_search(db, args):
+    from .search import search_students
+    from .students import STUDENT_COLUMNS
+    writer = csv.writer(sys.stdout, delimiter='\t', lineterminator='\n')
+    writer.writerow(STUDENT_COLUMNS)
+    writer.writerows(search_students(db, args.text, args.limit, args.student_class))
+    return 0
+
+
+def cmd_serve(db, args):
+    from .server import run
+    run(db, args.host, args.port, readers=args.readers, max_batch=args.max_batch)
+    return 0
+
+
+def cmd_rebuild_summary(db, args):
+    from .summary import rebuild_daily_summary
+    print(f"daily_summary rebuilt: {rebuild_daily_summary(db)} rows")
+    return 0
+
+
+def cmd_cleanup_orphans(db, args):
+    from .history import purge_orphans, reclaim_space
+    purged = purge_orphans(db, chunk_size=args.chunk_size)
+    freed = reclaim_space(db, pages_per_step=args.vacuum_pages)
+    print(f"Purged {purged} orphaned attendance row(s); freed {freed} page(s)")
+    return 0
+
+
+def cmd_rollover(db, args):
+    from .partitions import partitions, rollover
+    for label, rows, path in rollover(db, through=args.through):
+        print(f"Sealed {label}: {rows} row(s)" + (f" -> {path}" if path else ""))
+    writer = csv.writer(sys.stdout, delimiter='\t', lineterminator='\n')
+    writer.writerow(("Year", "From", "To", "File", "Rows", "Sealed At"))
+    writer.writerows(partitions(db))
+    return 0
+
+
+def cmd_sync(db, args):
+    from .journal import apply_segments, ship
+    if args.apply:
+        print(apply_segments(db, args.directory, batch_size=args.batch_size).summary())
+    else:
+        paths = ship(db, args.directory, segment_size=args.segment_size)
+        print(f"Shipped {len(paths)} journal segment(s) to {args.directory}")
+    return 0
+
+
+def cmd_rekey(db, args):
+    from .journal import rekey
+    replica, entries = rekey(db, since=args.since)
+    print(f"This database is now replica {replica}; {entries} journal entries will ship again under it")
+    return 0
+
+
+def _iso_date(text):
+    try:
+        return parse_date(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {text!r}") from None
+
+
+def _add_filter_arguments(parser):
+    parser.add_argument("--from", dest="start_date", type=_iso_date, help="first date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end_date", type=_iso_date, help="last date (YYYY-MM-DD)")
+    parser.add_argument("--class", dest="student_class", help="only this class")
+    parser.add_argument("--roll", dest="roll_number", help="only this roll number")
+    parser.add_argument("--status", choices=STATUSES, help="only this status")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m attendance_core",
+                                     description="Student Attendance Management System")
+    parser.add_argument("--db", default=DEFAULT_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--profile", metavar="JSON",
+                        help="profile statements and write the histograms and slow query plans to this file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add a student")
+    add.add_argument("name")
+    add.add_argument("roll_number")
+    add.add_argument("student_class", metavar="class")
+    add.set_defaults(handler=cmd_add)
+
+    delete = commands.add_parser("delete", help="delete a student and their attendance history")
+    delete.add_argument("student_id", type=int)
+    delete.add_argument("--archive", action="store_true",
+                        help="move the attendance history to attendance_archive instead of purging it")
+    delete.set_defaults(handler=cmd_delete)
+
+    roster = commands.add_parser("import", help="import students from a CSV roster")
+    roster.add_argument("csv_file", help="CSV with name, roll_number and class columns")
+    roster.add_argument("--batch-size", type=int, default=10000, help="rows per transaction")
+    roster.set_defaults(handler=cmd_import)
+
+    mark = commands.add_parser("mark", help="mark attendance for a day")
+    mark.add_argument("status", choices=STATUSES)
+    mark.add_argument("student_ids", nargs="*", type=int, metavar="student_id")
+    mark.add_argument("--date", type=_iso_date, default=date.today().isoformat(),
+                      help="day to mark (default: today)")
+    mark.add_argument("--remaining", action="store_true",
+                      help="mark every student not yet marked on that day")
+    mark.add_argument("--class", dest="student_class", help="with --remaining, only this class")
+    mark.set_defaults(handler=cmd_mark)
+
+    report = commands.add_parser("report", help="print a report as tab-separated rows")
+    report.add_argument("--view", choices=[RECORDS_VIEW, *VIEWS], default=RECORDS_VIEW,
+                        help="attendance records or an analytics view (default: %(default)s)")
+    report.add_argument("--limit", type=int, help="print at most this many rows")
+    _add_filter_arguments(report)
+    report.set_defaults(handler=cmd_report)
+
+    export = commands.add_parser("export", help="export attendance records to CSV, JSONL or columnar")
+    export.add_argument("output", help="output file, or - for standard output")
+    export.add_argument("--format", choices=FORMATS,
+                        help="output format (default: from the file extension, .atcol for columnar; else csv)")
+    _add_filter_arguments(export)
+    export.set_defaults(handler=cmd_export)
+
+    read = commands.add_parser("read-columnar", help="print a columnar export as tab-separated rows")
+    read.add_argument("input", help="a file written by export --format columnar")
+    read.add_argument("--limit", type=int, help="print at most this many rows")
+    read.set_defaults(handler=cmd_read_columnar)
+
+    search = commands.add_parser("search", help="find students by name or roll number prefix")
+    search.add_argument("text", help="words to match as prefixes, e.g. 'ann sh'")
+    search.add_argument("--limit", type=int, default=20, help="most matches to print (default: %(default)s)")
+    search.add_argument("--class", dest="student_class", help="only this class")
+    search.set_defaults(handler=cmd_search)
+
+    serve = commands.add_parser("serve", help="run the HTTP/JSON attendance service")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on (default: %(default)s)")
+    serve.add_argument("--port", type=int, default=8765, help="port to listen on (default: %(default)s)")
+    serve.add_argument("--readers", type=int, default=4, help="threads serving read requests")
+    serve.add_argument("--max-batch", type=int, default=256, help="most writes per group commit")
+    serve.set_defaults(handler=cmd_serve)
+
+    rebuild = commands.add_parser("rebuild-summary", help="recompute the daily_summary rollup")
+    rebuild.set_defaults(handler=cmd_rebuild_summary)
+
+    seal = commands.add_parser("rollover",
+                               help="seal finished academic years into read-only archive files")
+    seal.add_argument("--through", metavar="YEAR",
+                      help="last academic year to seal, e.g. 2023-24 (default: the previous one)")
+    seal.set_defaults(handler=cmd_rollover)
+
+    sync = commands.add_parser("sync",
+                               help="ship the change journal to a directory, or apply one to this database")
+    sync.add_argument("directory", help="directory the journal segments are shipped to and applied from")
+    sync.add_argument("--apply", action="store_true",
+                      help="apply the segments in the directory to this (central) database instead of shipping")
+    sync.add_argument("--segment-size", type=int, default=10000, help="most entries per shipped segment")
+    sync.add_argument("--batch-size", type=int, default=1000, help="entries applied per transaction")
+    sync.set_defaults(handler=cmd_sync)
+
+    replica = commands.add_parser("rekey",
+                                  help="give a copied database file its own replica id before syncing it")
+    replica.add_argument("--since", type=int, metavar="CLOCK",
+                         help="journal again what this database wrote from this clock on, "
+                              "when sync found it writing as the same replica as another copy")
+    replica.set_defaults(handler=cmd_rekey)
+
+    cleanup = commands.add_parser("cleanup-orphans",
+                                  help="purge attendance rows of deleted students and reclaim the space")
+    cleanup.add_argument("--chunk-size", type=int, default=5000, help="rows deleted per transaction")
+    cleanup.add_argument("--vacuum-pages", type=int, default=1000, help="pages freed per vacuum step")
+    cleanup.set_defaults(handler=cmd_cleanup_orphans)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        PROFILER.enable()
+    db = get_database(args.db)
+    migrate(db)
+    try:
+        return args.handler(db, args)
+    except (ValueError, sqlite3.IntegrityError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+        if args.profile:
+            PROFILER.dump(args.profile)
@@ -0,0 +1,180 @@
+"""A compact columnar file format for attendance exports, with its reader.
+
+Rows are written in row groups of ``row_group_size`` rows, so writing and
+reading both hold a single row group in memory however long the file is.
+Inside a row group each column is stored on its own and zlib-compressed:
+
+* ``dict`` columns (names, roll numbers, statuses) as a JSON list of the
+  distinct values followed by one uint16 or uint32 code per row;
+* ``day`` columns (ISO dates) as int32 days since 1970-01-01.
+
+Layout, all integers little-endian::
+
+    b"ATTCOL1\\n"
+    u32 header length, JSON header {"columns": [...], "kinds": [...]}
+    row group*:  u32 rows, then per column u32 length + compressed block
+    u32 0        end marker, then u64 total rows
+"""
+import json
+import struct
+import sys
+import zlib
+from array import array
+from datetime import date, timedelta
+
+MAGIC = b"ATTCOL1\n"
+KINDS = ("dict", "day")
+
+_EPOCH = date(1970, 1, 1)
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _encode_dict(values):
+    words = list(dict.fromkeys(values))
+    codes = {word: code for code, word in enumerate(words)}
+    typecode = "H" if len(words) <= 0x10000 else "I"
+    text = json.dumps(words, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    indexes = array(typecode, map(codes.__getitem__, values))
+    return typecode.encode() + _U32.pack(len(text)) + text + _little_endian(indexes)
+
+
+def _decode_dict(block):
+    typecode = block[:1].decode()
+    size = _U32.unpack_from(block, 1)[0]
+    words = json.loads(block[5:5 + size].decode("utf-8"))
+    return [words[index] for index in _from_little_endian(typecode, block[5 + size:])]
+
+
+def _encode_days(values):
+    numbers = {}
+    for value in values:
+        if value not in numbers:
+            numbers[value] = (date.fromisoformat(value) - _EPOCH).days
+    return _little_endian(array("i", [numbers[value] for value in values]))
+
+
+def _decode_days(block):
+    texts = {}
+    days = []
+    for number in _from_little_endian("i", block):
+        text = texts.get(number)
+        if text is None:
+            text = texts[number] = (_EPOCH + timedelta(days=number)).isoformat()
+        days.append(text)
+    return days
+
+
+_CODECS = {"dict": (_encode_dict, _decode_dict), "day": (_encode_days, _decode_days)}
+
+
+class ColumnarWriter:
+    """Writes rows to a binary stream in the columnar format.
+
+    Use as a context manager, or call ``close`` to write the last row group
+    and the end marker; the stream itself is left open.
+    """
+
+    def __init__(self, out, columns, kinds, row_group_size=65536, level=6):
+        if len(columns) != len(kinds) or any(kind not in KINDS for kind in kinds):
+            raise ValueError(f"Every column needs a kind from {KINDS}")
+        self.out = out
+        self.kinds = tuple(kinds)
+        self.row_group_size = row_group_size
+        self.level = level
+        self.rows = 0
+        self._pending = []
+        header = json.dumps({"columns": list(columns), "kinds": list(kinds)}).encode("utf-8")
+        out.write(MAGIC + _U32.pack(len(header)) + header)
+
+    def write_rows(self, rows):
+        """Appends rows, writing a row group whenever ``row_group_size`` are pending."""
+        pending = self._pending
+        pending.extend(rows)
+        while len(pending) >= self.row_group_size:
+            self._write_group(pending[:self.row_group_size])
+            del pending[:self.row_group_size]
+
+    def _write_group(self, group):
+        parts = [_U32.pack(len(group))]
+        for kind, values in zip(self.kinds, zip(*group)):
+            block = zlib.compress(_CODECS[kind][0](values), self.level)
+            parts.append(_U32.pack(len(block)))
+            parts.append(block)
+        self.out.write(b"".join(parts))
+        self.rows += len(group)
+
+    def close(self):
+        """Writes any pending rows and the end marker."""
+        if self._pending:
+            self._write_group(self._pending)
+            self._pending = []
+        self.out.write(_U32.pack(0) + _U64.pack(self.rows))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+
+
+def _read_exactly(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Columnar file is truncated")
+    return data
+
+
+class ColumnarReader:
+    """Reads a columnar file from a binary stream one row group at a time."""
+
+    def __init__(self, stream):
+        if stream.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a columnar attendance export")
+        self.stream = stream
+        header = json.loads(_read_exactly(stream, _U32.unpack(_read_exactly(stream, 4))[0]))
+        self.columns = tuple(header["columns"])
+        self.kinds = tuple(header["kinds"])
+        self.rows = None
+
+    def row_groups(self):
+        """Yields each row group as a list of column lists."""
+        stream = self.stream
+        while True:
+            count = _U32.unpack(_read_exactly(stream, 4))[0]
+            if count == 0:
+                self.rows = _U64.unpack(_read_exactly(stream, 8))[0]
+                return
+            group = []
+            for kind in self.kinds:
+                block = _read_exactly(stream, _U32.unpack(_read_exactly(stream, 4))[0])
+                values = _CODECS[kind][1](zlib.decompress(block))
+                if len(values) != count:
+                    raise ValueError("Columnar row group is corrupt")
+                group.append(values)
+            yield group
+
+    def __iter__(self):
+        for group in self.row_groups():
+            yield from zip(*group)
+
+
+def read_columnar(path):
+    """Yields the rows of the columnar file at ``path`` as tuples."""
+    with open(path, "rb") as stream:
+        yield from ColumnarReader(stream)
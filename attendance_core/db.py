@@ -0,0 +1,271 @@
+"""Shared SQLite data-access layer used by both front-ends.
+
+Connections are long-lived: each one is opened once, switched to WAL
+journaling and kept in a small pool.  A thread borrows a connection for the
+duration of a ``connection()``/``transaction()`` block and nested blocks on
+the same thread reuse it, so a connection is never used by two threads at
+the same time.  Statements are timed into ``stats`` and, while profiling
+is enabled, into ``profiling.PROFILER`` with their row counts.
+
+``generation()`` changes whenever a write is committed, by this process or
+any other, and keys the report and summary results kept in ``results``.
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from .cache import DEFAULT_MAX_BYTES, ResultCache
+from .profiling import PROFILER
+from .tasks import sqlite_progress_handler
+
+DEFAULT_PATH = 'attendance.db'
+
+
+class QueryStats:
+    """Thread-safe counters for connects and per-statement query timings."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.queries = 0
+            self.total_time = 0.0
+            self.statements = {}
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_query(self, sql, elapsed):
+        key = ' '.join(sql.split())
+        with self._lock:
+            self.queries += 1
+            self.total_time += elapsed
+            entry = self.statements.get(key)
+            if entry is None:
+                self.statements[key] = [1, elapsed, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+                if elapsed > entry[2]:
+                    entry[2] = elapsed
+
+    def snapshot(self):
+        """Returns a plain-dict copy of the counters."""
+        with self._lock:
+            return {
+                'connects': self.connects,
+                'queries': self.queries,
+                'total_time': self.total_time,
+                'statements': {sql: {'count': count, 'total': total, 'max': worst}
+                               for sql, (count, total, worst) in self.statements.items()},
+            }
+
+
+class Database:
+    """A pool of persistent SQLite connections to a single database file."""
+
+    def __init__(self, path=DEFAULT_PATH, pool_size=4, timeout=30.0, cached_statements=256,
+                 result_cache_bytes=DEFAULT_MAX_BYTES):
+        if path == ':memory:':
+            # Every pooled connection would open a separate, empty database.
+            raise ValueError("A pooled Database needs a database file, not ':memory:'")
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.stats = QueryStats()
+        self.results = ResultCache(result_cache_bytes)
+        self._idle = []
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+        self._commits = 0
+        self._watch = None
+        self._watch_lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path,
+                               timeout=self.timeout,
+                               isolation_level=None,
+                               check_same_thread=False,
+                               uri=True,
+                               cached_statements=self.cached_statements)
+        self.stats.record_connect()
+        # Only takes effect on a new, empty file (or at the next VACUUM), and
+        # must come before WAL is switched on.
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        # Lets a cancelled background task abort the statement it is running.
+        conn.set_progress_handler(sqlite_progress_handler, 10000)
+        return conn
+
+    def _acquire(self):
+        with self._pool_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Database has been closed")
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._pool_lock:
+            if not self._closed and len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Borrows a pooled connection for the current thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Runs the block in a single write transaction, committing on success."""
+        with self.connection() as conn:
+            if conn.in_transaction:
+                # Nested block: the outermost transaction owns the commit.
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.execute("COMMIT")
+            self._commits += 1
+
+    def _timed(self, sql, run, params=None, rows=len):
+        # ``params`` is None for statements that cannot be explained; ``rows``
+        # turns the result into a row count for the profiler.
+        start = time.perf_counter()
+        result = None
+        try:
+            result = run()
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stats.record_query(sql, elapsed)
+            if PROFILER.enabled:
+                self._profile(sql, elapsed, params, None if result is None else rows(result))
+
+    def _profile(self, sql, elapsed, params, rows):
+        explain = None if params is None else lambda: self._plan(sql, params)
+        PROFILER.record_query(sql, elapsed, rows, explain)
+
+    def _plan(self, sql, params):
+        try:
+            return self.explain(sql, params)
+        except sqlite3.Error as exc:
+            return [f"(no plan: {exc})"]
+
+    def query(self, sql, params=()):
+        """Runs a read query and returns all rows."""
+        with self.connection() as conn:
+            return self._timed(sql, lambda: conn.execute(sql, params).fetchall(), params)
+
+    def query_one(self, sql, params=()):
+        """Runs a read query and returns the first row, or None."""
+        with self.connection() as conn:
+            return self._timed(sql, lambda: conn.execute(sql, params).fetchone(), params, rows=lambda row: 1)
+
+    def iter_query(self, sql, params=(), chunk_size=1000):
+        """Yields the rows of a read query, fetching ``chunk_size`` rows at a time.
+
+        The connection stays borrowed until the generator is exhausted or closed.
+        """
+        with self.connection() as conn:
+            start = time.perf_counter()
+            count = 0
+            cursor = conn.execute(sql, params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        return
+                    count += len(rows)
+                    yield from rows
+            finally:
+                cursor.close()
+                elapsed = time.perf_counter() - start
+                self.stats.record_query(sql, elapsed)
+                if PROFILER.enabled:
+                    self._profile(sql, elapsed, params, count)
+
+    def execute(self, sql, params=()):
+        """Runs a single write statement in its own transaction and returns the cursor."""
+        with self.transaction() as conn:
+            return self._timed(sql, lambda: conn.execute(sql, params), params, rows=_rowcount)
+
+    def executemany(self, sql, seq_of_params):
+        """Runs a write statement for every parameter tuple in one transaction."""
+        with self.transaction() as conn:
+            return self._timed(sql, lambda: conn.executemany(sql, seq_of_params), rows=_rowcount)
+
+    def generation(self):
+        """Returns a value that is different after any write has been committed.
+
+        ``PRAGMA data_version`` on a connection that never writes counts the
+        commits of every other connection, pooled or in another process;
+        the commits made through ``transaction()`` are counted as well.
+        """
+        with self._watch_lock:
+            if self._watch is None:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Database has been closed")
+                self._watch = self._connect()
+            return self._commits, self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def explain(self, sql, params=()):
+        """Returns the EXPLAIN QUERY PLAN detail lines for ``sql``."""
+        with self.connection() as conn:
+            return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+    def close(self):
+        """Closes every idle pooled connection and refuses new ones."""
+        with self._pool_lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+        with self._watch_lock:
+            if self._watch is not None:
+                self._watch.close()
+                self._watch = None
+
+
+def _rowcount(cursor):
+    return cursor.rowcount
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(path=DEFAULT_PATH):
+    """Returns the shared Database for ``path``, creating it on first use."""
+    with _databases_lock:
+        db = _databases.get(path)
+        if db is None:
+            db = _databases[path] = Database(path)
+        return db
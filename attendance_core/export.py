@@ -0,0 +1,108 @@
+"""Writing the attendance report to files.
+
+Rows are streamed from ``stream_report``, so exports of any size run in
+constant memory.  Three formats are supported: CSV with a header row,
+JSON Lines with one object per record, and the compact columnar format
+of ``columnar``.
+"""
+import csv
+import json
+import os
+from itertools import islice
+
+from .columnar import ColumnarWriter
+from .reports import REPORT_COLUMNS, stream_report
+
+JSON_KEYS = ("name", "roll_number", "date", "status")
+COLUMNAR_KINDS = ("dict", "dict", "day", "dict")
+
+# Output format for each file extension; anything else is written as CSV.
+EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".atcol": "columnar"}
+
+
+def _chunks(db, chunk_size, filters):
+    rows = stream_report(db, chunk_size=chunk_size, **filters)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _export(db, write_chunk, chunk_size, progress, filters):
+    count = 0
+    for chunk in _chunks(db, chunk_size, filters):
+        write_chunk(chunk)
+        count += len(chunk)
+        if progress is not None:
+            progress(count)
+    return count
+
+
+def export_csv(db, out, chunk_size=1000, progress=None, **filters):
+    """Writes the filtered report with a header row to the text stream ``out``.
+
+    ``progress`` is called with the number of rows written after every
+    chunk.  Returns the number of data rows written.
+    """
+    writer = csv.writer(out)
+    writer.writerow(REPORT_COLUMNS)
+    return _export(db, writer.writerows, chunk_size, progress, filters)
+
+
+def export_jsonl(db, out, chunk_size=1000, progress=None, **filters):
+    """Writes the filtered report to the text stream ``out`` as one JSON object per line.
+
+    Keys are ``JSON_KEYS``; see export_csv for the other arguments.
+    """
+    # Every value is a string, so each line is a fixed template of encoded strings.
+    template = "{" + ",".join(f'"{key}":%s' for key in JSON_KEYS) + "}\n"
+    encode = json.encoder.encode_basestring
+
+    def write_chunk(chunk):
+        out.write("".join(template % tuple(map(encode, row)) for row in chunk))
+
+    return _export(db, write_chunk, chunk_size, progress, filters)
+
+
+def export_columnar(db, out, chunk_size=1000, progress=None, row_group_size=65536, **filters):
+    """Writes the filtered report to the binary stream ``out`` in the columnar format.
+
+    See export_csv for the other arguments.
+    """
+    with ColumnarWriter(out, REPORT_COLUMNS, COLUMNAR_KINDS, row_group_size=row_group_size) as writer:
+        return _export(db, writer.write_rows, chunk_size, progress, filters)
+
+
+FORMATS = {"csv": export_csv, "jsonl": export_jsonl, "columnar": export_columnar}
+
+
+def format_for(path):
+    """The export format implied by the extension of ``path``."""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), "csv")
+
+
+def export_file(db, path, export_format=None, progress=None, **filters):
+    """Exports the filtered report to ``path``; returns the number of rows written.
+
+    The format defaults to the one implied by the file extension.  The file
+    is written under a temporary name and renamed when complete, so a
+    nightly job never picks up half an export.
+    """
+    export_format = export_format or format_for(path)
+    if export_format not in FORMATS:
+        raise ValueError(f"Unknown export format: {export_format!r}")
+    partial = path + ".part"
+    try:
+        if export_format == "columnar":
+            out = open(partial, "wb")
+        else:
+            out = open(partial, "w", newline="", encoding="utf-8")
+        with out:
+            count = FORMATS[export_format](db, out, progress=progress, **filters)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return count
@@ -0,0 +1,132 @@
+"""Archiving and purging attendance history in chunked batches.
+
+With ``PRAGMA foreign_keys`` on, a student who still has attendance rows
+cannot be deleted.  So deleting a student first moves their history to
+``attendance_archive`` or purges it.  This is done ``chunk_size`` rows per
+transaction, so other writers get the lock between chunks instead of
+waiting for a student's whole history to go.  The last chunk and the
+student row are removed in the same transaction, so a mark recorded in
+between cannot leave an orphan behind.
+
+``purge_orphans`` is the one-off cleanup for databases written before
+foreign keys were enforced.  It then returns the freed pages to the file
+system with an incremental vacuum.
+"""
+import json
+
+from .attendance import date_sql, status_sql
+from .tasks import current_task
+
+_CHUNK = "SELECT attendance_id FROM attendance_marks WHERE student_id = ? ORDER BY attendance_id LIMIT ?"
+_DELETE = "DELETE FROM attendance_marks WHERE attendance_id IN (SELECT value FROM json_each(?))"
+
+
+def create_attendance_archive(conn):
+    """Creates the table that archived attendance rows are moved to."""
+    # attendance_marks reuses the ids of rows moved out of it, so the same
+    # attendance_id can be archived more than once.
+    conn.execute('''CREATE TABLE IF NOT EXISTS attendance_archive (
+                        archive_id INTEGER PRIMARY KEY,
+                        attendance_id INTEGER,
+                        student_id INTEGER,
+                        name TEXT,
+                        roll_number TEXT,
+                        class TEXT,
+                        date TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_attendance_archive_student
+                    ON attendance_archive (student_id)''')
+
+
+def rekey_attendance_archive(conn):
+    """Rebuilds an archive keyed on attendance_id with its own archive_id key."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(attendance_archive)")]
+    if 'archive_id' in columns:
+        return
+    conn.execute("ALTER TABLE attendance_archive RENAME TO attendance_archive_old")
+    conn.execute("DROP INDEX IF EXISTS idx_attendance_archive_student")
+    create_attendance_archive(conn)
+    conn.execute('''INSERT INTO attendance_archive
+                        (attendance_id, student_id, name, roll_number, class, date, status, archived_at)
+                    SELECT attendance_id, student_id, name, roll_number, class, date, status, archived_at
+                    FROM attendance_archive_old
+                    ORDER BY attendance_id''')
+    conn.execute("DROP TABLE attendance_archive_old")
+
+
+def _report(done):
+    task = current_task()
+    if task is not None:
+        task.progress(done)
+
+
+def remove_student(db, student_id, archive=False, chunk_size=5000):
+    """Deletes a student after archiving or purging their attendance history.
+
+    Returns ``(deleted, rows)``: whether the student row existed and how many
+    attendance rows were moved or purged.
+    """
+    moved = 0
+    while True:
+        with db.transaction() as conn:
+            ids = json.dumps([row[0] for row in conn.execute(_CHUNK, (student_id, chunk_size))])
+            if archive:
+                conn.execute(f'''INSERT INTO attendance_archive
+                                     (attendance_id, student_id, name, roll_number, class, date, status)
+                                 SELECT a.attendance_id, a.student_id, s.name, s.roll_number, s.class,
+                                        {date_sql('a.day')}, {status_sql('a.status_code')}
+                                 FROM attendance_marks a LEFT JOIN students s ON s.student_id = a.student_id
+                                 WHERE a.attendance_id IN (SELECT value FROM json_each(?))''', (ids,))
+            count = conn.execute(_DELETE, (ids,)).rowcount
+            moved += count
+            if count < chunk_size:
+                deleted = conn.execute("DELETE FROM students WHERE student_id = ?", (student_id,)).rowcount > 0
+                return deleted, moved
+        _report(moved)
+
+
+def purge_orphans(db, chunk_size=5000):
+    """Deletes attendance rows whose student no longer exists; returns how many.
+
+    Walks the table in attendance_id order, one chunk per transaction.
+    """
+    purged = 0
+    last_id = 0
+    while True:
+        rows = db.query('''SELECT a.attendance_id FROM attendance_marks a
+                           WHERE a.attendance_id > ?
+                             AND NOT EXISTS (SELECT 1 FROM students s WHERE s.student_id = a.student_id)
+                           ORDER BY a.attendance_id
+                           LIMIT ?''', (last_id, chunk_size))
+        if not rows:
+            return purged
+        last_id = rows[-1][0]
+        purged += db.execute(_DELETE, (json.dumps([row[0] for row in rows]),)).rowcount
+        _report(purged)
+
+
+def reclaim_space(db, pages_per_step=1000):
+    """Returns free pages to the file system; returns how many were freed.
+
+    A database created before incremental auto-vacuum was enabled is
+    converted with one full VACUUM.  After that, ``PRAGMA incremental_vacuum``
+    frees ``pages_per_step`` pages per statement so no step holds the lock
+    for long.
+    """
+    with db.connection() as conn:
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return free
+        freed = 0
+        while free:
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages_per_step)})").fetchall()
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free:
+                break
+            freed += free - remaining
+            free = remaining
+            _report(freed)
+        return freed
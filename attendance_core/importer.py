@@ -0,0 +1,153 @@
+"""Bulk roster import from CSV.
+
+The file is read as a stream and validated line by line; good rows are
+inserted in batches, each batch in its own transaction, so memory use does
+not depend on the size of the file.
+
+A row is a duplicate when its (class, roll number) pair is already
+enrolled or appeared earlier in the file.  Duplicates are reported with
+their line numbers and skipped.
+
+A batch does more than insert its rows: the search index tokenizes every
+name and roll number, and each student gets a uid and a journal entry for
+sync, with their indexes.  That is most of the cost.  Into a freshly
+migrated database, 200,000 rows import at about 60,000-70,000 a second,
+against about 140,000 for the bare insert before search and sync existed.
+Updating the search index once per batch instead of from its trigger did
+not change that, since the time goes into tokenizing.  The "roster import
+(district, fresh)" operation of benchmarks/suite.py measures it.
+"""
+import csv
+import json
+
+from .journal import journal_students_in_bulk, student_uids
+from .students import MAX_FIELD_LENGTH
+
+FIELDS = ("name", "roll_number", "class")
+
+# Header spellings accepted for each field, compared case-insensitively.
+_HEADER_ALIASES = {
+    "name": "name",
+    "student name": "name",
+    "roll_number": "roll_number",
+    "roll number": "roll_number",
+    "roll": "roll_number",
+    "class": "class",
+    "student_class": "class",
+}
+
+
+class ImportResult:
+    """Outcome of a roster import."""
+
+    def __init__(self, max_errors):
+        self.inserted = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def reject(self, line_number, message, duplicate=False):
+        self.rejected += 1
+        if duplicate:
+            self.duplicates += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line_number, message))
+
+    def summary(self):
+        """A one-line human-readable description of the result."""
+        text = f"Imported {self.inserted} student(s); rejected {self.rejected}"
+        if self.duplicates:
+            text += f" ({self.duplicates} duplicate roll number(s))"
+        return text + "."
+
+
+def _header_positions(header):
+    positions = {}
+    for index, title in enumerate(header):
+        field = _HEADER_ALIASES.get(title.strip().lower())
+        if field is not None and field not in positions:
+            positions[field] = index
+    missing = [field for field in FIELDS if field not in positions]
+    if missing:
+        raise ValueError(f"CSV header is missing column(s): {', '.join(missing)}")
+    return [positions[field] for field in FIELDS]
+
+
+def import_roster(db, lines, batch_size=10000, max_errors=1000, progress=None):
+    """Imports students from an iterable of CSV lines (such as an open file).
+
+    The first line must be a header naming the ``name``, ``roll_number``
+    and ``class`` columns; other columns are ignored.  ``progress`` is
+    called with the number of data lines read after every batch.
+    Returns an ImportResult.
+    """
+    reader = csv.reader(lines)
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise ValueError("CSV file is empty") from None
+    name_at, roll_at, class_at = _header_positions(header)
+    width = max(name_at, roll_at, class_at) + 1
+
+    result = ImportResult(max_errors)
+    seen = {(klass, roll) for klass, roll in db.query("SELECT class, roll_number FROM students")}
+    batch = []
+    read = 0
+
+    def flush():
+        if batch:
+            # One statement per batch: the FTS5 index behind the search triggers
+            # flushes its pending terms once per statement, not once per row,
+            # and the batch is journaled with one more.
+            with db.transaction() as conn, journal_students_in_bulk(conn):
+                conn.execute('''INSERT INTO students (name, roll_number, class, uid)
+                                SELECT value ->> 0, value ->> 1, value ->> 2, substr(?2, key * 16 + 1, 16)
+                                FROM json_each(?1)''', (json.dumps(batch), student_uids(len(batch))))
+            result.inserted += len(batch)
+            batch.clear()
+        if progress is not None:
+            progress(read)
+
+    for row in reader:
+        read += 1
+        line = reader.line_num
+        if len(row) < width:
+            if not any(field.strip() for field in row):
+                continue
+            result.reject(line, f"expected at least {width} columns, found {len(row)}")
+            continue
+        name = row[name_at].strip()
+        roll = row[roll_at].strip()
+        klass = row[class_at].strip()
+        if not (name and roll and klass):
+            empty = [field for field, value in zip(FIELDS, (name, roll, klass)) if not value]
+            result.reject(line, f"missing {', '.join(empty)}")
+            continue
+        if max(len(name), len(roll), len(klass)) > MAX_FIELD_LENGTH:
+            result.reject(line, f"field longer than {MAX_FIELD_LENGTH} characters")
+            continue
+        key = (klass, roll)
+        if key in seen:
+            result.reject(line, f"duplicate roll number {roll} in class {klass}", duplicate=True)
+            continue
+        seen.add(key)
+        batch.append((name, roll, klass))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return result
+
+
+def import_roster_file(db, path, batch_size=10000, max_errors=1000, progress=None):
+    """Imports a roster CSV file from ``path``; see import_roster."""
+    with open(path, newline='', encoding='utf-8-sig') as lines:
+        return import_roster(db, lines, batch_size=batch_size, max_errors=max_errors, progress=progress)
+
+
+def describe_errors(result, limit=10):
+    """Formats the first ``limit`` rejected lines for display."""
+    lines = [f"Line {line_number}: {message}" for line_number, message in result.errors[:limit]]
+    if result.rejected > len(lines):
+        lines.append(f"... and {result.rejected - len(lines)} more")
+    return "\n".join(lines)
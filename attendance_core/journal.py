@@ -0,0 +1,468 @@
+"""Append-only change journal and its replication to a central database.
+
+Every classroom machine keeps its own database, whose integer student ids
+clash with every other machine's.  So each student also gets ``uid``, 16
+random bytes, and triggers record every write made through any code path
+in ``journal``: a student added (``student``) or deleted (``delete``), and
+a mark recorded or changed (``mark``).  History leaving the live table
+(deletes in chunks, archiving, sealing a year) is not journaled; it
+follows from the ``delete`` or stays local.
+
+An entry is identified across machines by the replica that wrote it and
+its logical clock, e.g. ``3f2a...e1:1042``.  The clock is a Lamport clock:
+it goes up by one per entry and jumps past the newest clock applied from
+elsewhere, so a later write on the central database outranks what it has
+already seen.
+
+``ship`` writes the entries not yet shipped into segment files (JSON lines,
+written under a temporary name and renamed) in a shared directory.
+``apply_segments`` applies the segments of a directory to another database
+in batches of ``batch_size`` entries, one transaction each.  Applying is
+idempotent: an entry already in the journal is skipped, so a segment can be
+shipped or applied twice, and in any order, with the same result:
+
+* The mark of a student and day with the highest ``(clock, replica)`` wins.
+* A deleted student stays deleted; their history is archived, never purged.
+* A mark for a student not seen yet is kept in the journal and written
+  when the student arrives.
+* A mark inside a sealed academic year of the central database is kept in
+  the journal only.
+
+Marks of years sealed before the journal existed are in the archive files,
+not the journal.
+
+The replica id is created with the journal, so a database file copied to
+another machine writes as the same replica as the original, and the two
+would number different entries with the same clock.  Run ``rekey`` (``python
+-m attendance_core rekey``) on every copy before writing to it, which gives
+it a replica id of its own.  Copies that already wrote under the shared id
+are refused rather than merged: ``ship`` will not replace a segment with
+different contents, and ``apply_segments`` raises ValueError on an entry it
+has seen with different contents, naming the clock they part at.  Rekey
+each of them with ``--since`` that clock, which journals what they wrote
+from then on again under their new ids, then remove the refused segments.
+"""
+import json
+import os
+from contextlib import contextmanager
+
+from .attendance import day_text
+from .history import remove_student
+
+SEGMENT_FORMAT = "attendance-journal"
+SEGMENT_VERSION = 1
+
+# Only a database that segments are applied to looks entries up by student,
+# so the index is created on the first apply and classrooms never keep it.
+_STUDENT_INDEX = "CREATE INDEX IF NOT EXISTS idx_journal_student_day ON journal (student, day)"
+
+_APPLYING = "(SELECT applying FROM journal_state) = 0"
+
+_CLONED = ("{what}: two databases are writing as replica {replica} "
+           "from clock {clock} on.  Run 'python -m attendance_core rekey --since {clock}' on each of them "
+           "and remove the segments that were refused.")
+_STAMP = "UPDATE journal_state SET clock = clock + 1;"
+
+TRIGGERS = {
+    'trg_journal_students_insert': f'''
+        CREATE TRIGGER trg_journal_students_insert AFTER INSERT ON students
+        WHEN {_APPLYING}
+        BEGIN
+            UPDATE students SET uid = randomblob(16) WHERE NEW.uid IS NULL AND student_id = NEW.student_id;
+            {_STAMP}
+            INSERT INTO journal (origin, clock, op, student, value)
+            SELECT j.origin, j.clock, 'student', s.uid, json_array(s.name, s.roll_number, s.class)
+            FROM journal_state j, students s WHERE s.student_id = NEW.student_id;
+        END''',
+    'trg_journal_students_delete': f'''
+        CREATE TRIGGER trg_journal_students_delete AFTER DELETE ON students
+        WHEN {_APPLYING}
+        BEGIN
+            {_STAMP}
+            INSERT INTO journal (origin, clock, op, student)
+            SELECT origin, clock, 'delete', OLD.uid FROM journal_state;
+        END''',
+    'trg_journal_marks_insert': f'''
+        CREATE TRIGGER trg_journal_marks_insert AFTER INSERT ON attendance_marks
+        WHEN {_APPLYING}
+        BEGIN
+            {_STAMP}
+            INSERT INTO journal (origin, clock, op, student, day, value)
+            SELECT j.origin, j.clock, 'mark', s.uid, NEW.day, NEW.status_code
+            FROM journal_state j, students s WHERE s.student_id = NEW.student_id;
+        END''',
+    'trg_journal_marks_update': f'''
+        CREATE TRIGGER trg_journal_marks_update AFTER UPDATE OF status_code ON attendance_marks
+        WHEN NEW.status_code IS NOT OLD.status_code AND {_APPLYING}
+        BEGIN
+            {_STAMP}
+            INSERT INTO journal (origin, clock, op, student, day, value)
+            SELECT j.origin, j.clock, 'mark', s.uid, NEW.day, NEW.status_code
+            FROM journal_state j, students s WHERE s.student_id = NEW.student_id;
+        END''',
+}
+
+
+def create_journal(conn):
+    """Creates the journal, gives every student a uid and journals the existing students and marks."""
+    conn.execute('''CREATE TABLE journal_origins (
+                        origin INTEGER PRIMARY KEY,
+                        replica TEXT NOT NULL UNIQUE)''')
+    conn.execute('''CREATE TABLE journal_state (
+                        id INTEGER PRIMARY KEY CHECK (id = 1),
+                        origin INTEGER NOT NULL REFERENCES journal_origins (origin),
+                        clock INTEGER NOT NULL,
+                        shipped INTEGER NOT NULL DEFAULT 0,
+                        applying INTEGER NOT NULL DEFAULT 0)''')
+    conn.execute('''CREATE TABLE journal (
+                        seq INTEGER PRIMARY KEY,
+                        origin INTEGER NOT NULL REFERENCES journal_origins (origin),
+                        clock INTEGER NOT NULL,
+                        op TEXT NOT NULL,
+                        student BLOB NOT NULL,
+                        day INTEGER,
+                        value,
+                        UNIQUE (origin, clock))''')
+    conn.execute('''CREATE TABLE journal_segments (
+                        name TEXT PRIMARY KEY,
+                        entries INTEGER NOT NULL,
+                        applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)''')
+    for table in ("journal", "journal_origins"):
+        conn.execute(f'''CREATE TRIGGER trg_{table}_append_only BEFORE UPDATE ON {table}
+                         BEGIN
+                             SELECT RAISE(ABORT, '{table} is append-only');
+                         END''')
+        conn.execute(f'''CREATE TRIGGER trg_{table}_no_delete BEFORE DELETE ON {table}
+                         BEGIN
+                             SELECT RAISE(ABORT, '{table} is append-only');
+                         END''')
+
+    conn.execute("INSERT INTO journal_origins (origin, replica) VALUES (1, lower(hex(randomblob(16))))")
+    conn.execute("ALTER TABLE students ADD COLUMN uid BLOB")
+    conn.execute("UPDATE students SET uid = randomblob(16)")
+    conn.execute("CREATE UNIQUE INDEX idx_students_uid ON students (uid)")
+
+    # The existing rows are the first entries, students before their marks.
+    conn.execute('''INSERT INTO journal (origin, clock, op, student, value)
+                    SELECT 1, ROW_NUMBER() OVER (ORDER BY student_id), 'student', uid,
+                           json_array(name, roll_number, class)
+                    FROM students''')
+    conn.execute('''INSERT INTO journal (origin, clock, op, student, day, value)
+                    SELECT 1, (SELECT COUNT(*) FROM students) + ROW_NUMBER() OVER (ORDER BY a.attendance_id),
+                           'mark', s.uid, a.day, a.status_code
+                    FROM attendance_marks a JOIN students s ON s.student_id = a.student_id''')
+    conn.execute('''INSERT INTO journal_state (id, origin, clock)
+                    VALUES (1, 1, (SELECT COALESCE(MAX(clock), 0) FROM journal))''')
+    for ddl in TRIGGERS.values():
+        conn.execute(ddl)
+
+
+def student_uids(count):
+    """``count`` new student uids packed into one blob, 16 bytes each.
+
+    They share a random 8-byte prefix and count up after it, so the unique
+    index on ``uid`` takes them as one run instead of ``count`` random
+    inserts.
+    """
+    prefix = os.urandom(8)
+    return b"".join(prefix + number.to_bytes(8, 'big') for number in range(count))
+
+
+@contextmanager
+def journal_students_in_bulk(conn):
+    """Journals the students inserted on ``conn`` inside the block with one statement.
+
+    The per-row insert trigger is held off meanwhile.  The block must run
+    inside a transaction on ``conn``, give every student its ``uid`` and
+    let ``student_id`` default, so the new ids are all above the largest
+    one before it.  They need not follow it: an AUTOINCREMENT table skips
+    the ids of deleted students, so the clocks count the rows instead.
+    """
+    after = conn.execute("SELECT COALESCE(MAX(student_id), 0) FROM students").fetchone()[0]
+    conn.execute("UPDATE journal_state SET applying = 1")
+    yield
+    conn.execute("UPDATE journal_state SET applying = 0")
+    count = conn.execute('''INSERT INTO journal (origin, clock, op, student, value)
+                            SELECT j.origin, j.clock + ROW_NUMBER() OVER (ORDER BY s.student_id),
+                                   'student', s.uid, json_array(s.name, s.roll_number, s.class)
+                            FROM journal_state j, students s
+                            WHERE s.student_id > ?
+                            ORDER BY s.student_id''', (after,)).rowcount
+    conn.execute("UPDATE journal_state SET clock = clock + ?", (count,))
+
+
+def track_replica_copies(conn):
+    """Adds segment digests and the clocks that ``rekey`` retired from shipping."""
+    conn.execute("ALTER TABLE journal_segments ADD COLUMN digest TEXT")
+    conn.execute('''CREATE TABLE journal_retired (
+                        origin INTEGER PRIMARY KEY REFERENCES journal_origins (origin),
+                        since INTEGER NOT NULL)''')
+
+
+def replica_id(db):
+    """The id of this database in the journal of every database it is synced to."""
+    return db.query_one('''SELECT o.replica FROM journal_state j
+                           JOIN journal_origins o ON o.origin = j.origin''')[0]
+
+
+def rekey(db, since=None):
+    """Gives a copied database a replica id of its own; returns ``(replica, entries)``.
+
+    Entries written from now on carry the new id.  With ``since``, the
+    entries this database wrote under its old id from that clock on are
+    journaled again under the new one with the same clocks, so they keep
+    their place in last-writer-wins, and the old ones are no longer
+    shipped.  ``entries`` is how many were journaled again.
+    """
+    with db.transaction() as conn:
+        origin = conn.execute("SELECT origin FROM journal_state").fetchone()[0]
+        new_origin = conn.execute("INSERT INTO journal_origins (replica) VALUES (lower(hex(randomblob(16))))"
+                                  ).lastrowid
+        entries = 0
+        if since is not None:
+            entries = conn.execute('''INSERT INTO journal (origin, clock, op, student, day, value)
+                                      SELECT ?, clock, op, student, day, value FROM journal
+                                      WHERE origin = ? AND clock >= ?
+                                      ORDER BY seq''', (new_origin, origin, since)).rowcount
+            conn.execute("INSERT INTO journal_retired (origin, since) VALUES (?, ?)", (origin, since))
+        conn.execute("UPDATE journal_state SET origin = ?", (new_origin,))
+        replica = conn.execute("SELECT replica FROM journal_origins WHERE origin = ?", (new_origin,)).fetchone()[0]
+    return replica, entries
+
+
+def _sha256(data):
+    # hashlib and pathlib are imported where segments are written and read:
+    # only syncing needs them, and every command that migrates imports this module.
+    import hashlib
+    return hashlib.sha256(data).hexdigest()
+
+
+def _segment_name(replica, first, last):
+    return f"{replica}-{first:012d}-{last:012d}.jsonl"
+
+
+def ship(db, directory, segment_size=10000):
+    """Writes the entries not shipped yet to segment files in ``directory``; returns their paths.
+
+    A segment is renamed into place only once it is complete, and the
+    entries are marked shipped only after that, so a crash at worst ships
+    them again.  Raises ValueError rather than replace a segment of the same
+    name with different contents, which another copy of this database
+    shipped.
+    """
+    from pathlib import Path
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    replica = replica_id(db)
+    paths = []
+    while True:
+        shipped = db.query_one("SELECT shipped FROM journal_state")[0]
+        rows = db.query('''SELECT j.seq, o.replica, j.clock, j.op, hex(j.student), j.day, j.value
+                           FROM journal j JOIN journal_origins o ON o.origin = j.origin
+                           WHERE j.seq > ?
+                             AND NOT EXISTS (SELECT 1 FROM journal_retired r
+                                             WHERE r.origin = j.origin AND j.clock >= r.since)
+                           ORDER BY j.seq LIMIT ?''', (shipped, segment_size))
+        if not rows:
+            return paths
+        first, last = rows[0][0], rows[-1][0]
+        path = directory / _segment_name(replica, first, last)
+        body = "".join(json.dumps(row[1:]) + "\n" for row in rows).encode('utf-8')
+        digest = _sha256(body)
+        if path.exists() and _segment_digest(path) != digest:
+            shipped_before = _read_segment(path)[1]
+            clock = next((row[2] for row, entry in zip(rows, shipped_before) if list(row[1:]) != entry),
+                         rows[0][2])
+            raise ValueError(_CLONED.format(what=f"Segment {path.name} differs from the one already there",
+                                            replica=replica, clock=clock))
+        partial = path.with_name(path.name + ".partial")
+        with open(partial, 'wb') as out:
+            out.write(json.dumps({'format': SEGMENT_FORMAT, 'version': SEGMENT_VERSION, 'replica': replica,
+                                  'first': first, 'last': last, 'entries': len(rows),
+                                  'digest': digest}).encode('utf-8') + b"\n")
+            out.write(body)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(partial, path)
+        db.execute("UPDATE journal_state SET shipped = ?", (last,))
+        paths.append(path)
+
+
+class ApplyResult:
+    """Counts of what applying segments did with their entries."""
+
+    def __init__(self):
+        self.segments = 0
+        self.entries = 0
+        self.applied = 0
+        self.duplicates = 0
+        self.superseded = 0
+        self.pending = 0
+        self.sealed = 0
+
+    def count(self, outcome):
+        self.entries += 1
+        setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def summary(self):
+        """A one-line human-readable description of the result."""
+        return (f"Applied {self.applied} of {self.entries} journal entries from {self.segments} segment(s); "
+                f"{self.duplicates} already applied, {self.superseded} superseded, "
+                f"{self.pending} waiting for their student, {self.sealed} in sealed years.")
+
+
+def _read_header(stream, path):
+    header = json.loads(stream.readline())
+    if header.get('format') != SEGMENT_FORMAT or header.get('version') != SEGMENT_VERSION:
+        raise ValueError(f"{path.name} is not a version {SEGMENT_VERSION} journal segment")
+    return header
+
+
+def _segment_digest(path):
+    """The SHA-256 of a segment's entries, from its header when it records one."""
+    with open(path, 'rb') as stream:
+        header = _read_header(stream, path)
+        return header.get('digest') or _sha256(stream.read())
+
+
+def _read_segment(path):
+    """Returns the header, entries and digest of a segment file."""
+    with open(path, 'rb') as stream:
+        header = _read_header(stream, path)
+        body = stream.read()
+    entries = [json.loads(line) for line in body.splitlines()]
+    if len(entries) != header['entries']:
+        raise ValueError(f"{path.name} is truncated: {len(entries)} of {header['entries']} entries")
+    digest = _sha256(body)
+    if header.get('digest', digest) != digest:
+        raise ValueError(f"{path.name} is corrupt: its entries do not match the digest in its header")
+    return header, entries, digest
+
+
+def _origin(conn, origins, replica):
+    origin = origins.get(replica)
+    if origin is None:
+        conn.execute("INSERT OR IGNORE INTO journal_origins (replica) VALUES (?)", (replica,))
+        origin = origins[replica] = conn.execute("SELECT origin FROM journal_origins WHERE replica = ?",
+                                                 (replica,)).fetchone()[0]
+    return origin
+
+
+def _sealed(conn, day):
+    sealed_through = conn.execute("SELECT MAX(end_date) FROM attendance_partitions").fetchone()[0]
+    return sealed_through is not None and day_text(day) <= sealed_through
+
+
+def _deleted(conn, student):
+    return conn.execute("SELECT 1 FROM journal WHERE student = ? AND day IS NULL AND op = 'delete' LIMIT 1",
+                        (student,)).fetchone() is not None
+
+
+def _student_id(conn, student):
+    row = conn.execute("SELECT student_id FROM students WHERE uid = ?", (student,)).fetchone()
+    return row[0] if row else None
+
+
+def _write_mark(conn, student_id, day, code):
+    conn.execute('''INSERT INTO attendance_marks (student_id, day, status_code) VALUES (?, ?, ?)
+                    ON CONFLICT (student_id, day) DO UPDATE SET status_code = excluded.status_code''',
+                 (student_id, day, code))
+
+
+def _apply_mark(conn, student, day, code, clock, replica):
+    if _deleted(conn, student):
+        return 'superseded'
+    newer = conn.execute('''SELECT 1 FROM journal j JOIN journal_origins o ON o.origin = j.origin
+                            WHERE j.student = ? AND j.day = ? AND j.op = 'mark'
+                              AND (j.clock > ? OR (j.clock = ? AND o.replica > ?))
+                            LIMIT 1''', (student, day, clock, clock, replica)).fetchone()
+    if newer:
+        return 'superseded'
+    student_id = _student_id(conn, student)
+    if student_id is None:
+        return 'pending'
+    if _sealed(conn, day):
+        return 'sealed'
+    _write_mark(conn, student_id, day, code)
+    return 'applied'
+
+
+def _apply_student(conn, student, fields):
+    if _deleted(conn, student):
+        return 'superseded'
+    name, roll_number, student_class = json.loads(fields)
+    conn.execute('''INSERT INTO students (name, roll_number, class, uid) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (uid) DO NOTHING''', (name, roll_number, student_class, student))
+    student_id = _student_id(conn, student)
+    # Marks that arrived before the student: the winner of each day.
+    for day, code in conn.execute('''SELECT day, value FROM (
+                                         SELECT j.day, j.value,
+                                                ROW_NUMBER() OVER (PARTITION BY j.day
+                                                                   ORDER BY j.clock DESC, o.replica DESC) AS latest
+                                         FROM journal j JOIN journal_origins o ON o.origin = j.origin
+                                         WHERE j.student = ? AND j.day IS NOT NULL AND j.op = 'mark')
+                                     WHERE latest = 1''', (student,)).fetchall():
+        if not _sealed(conn, day):
+            _write_mark(conn, student_id, day, code)
+    return 'applied'
+
+
+def _apply_batch(db, entries, result):
+    with db.transaction() as conn:
+        conn.execute("UPDATE journal_state SET applying = 1")
+        origins = {}
+        newest = 0
+        for replica, clock, op, student, day, value in entries:
+            student = bytes.fromhex(student)
+            newest = max(newest, clock)
+            origin = _origin(conn, origins, replica)
+            added = conn.execute('''INSERT OR IGNORE INTO journal (origin, clock, op, student, day, value)
+                                    VALUES (?, ?, ?, ?, ?, ?)''',
+                                 (origin, clock, op, student, day, value)).rowcount
+            if not added:
+                if conn.execute("SELECT op, student, day, value FROM journal WHERE origin = ? AND clock = ?",
+                                (origin, clock)).fetchone() != (op, student, day, value):
+                    raise ValueError(_CLONED.format(
+                        what=f"Journal entry {replica}:{clock} differs from the one applied before",
+                        replica=replica, clock=clock))
+                outcome = 'duplicates'
+            elif op == 'mark':
+                outcome = _apply_mark(conn, student, day, value, clock, replica)
+            elif op == 'student':
+                outcome = _apply_student(conn, student, value)
+            elif op == 'delete':
+                student_id = _student_id(conn, student)
+                if student_id is not None:
+                    remove_student(db, student_id, archive=True)
+                outcome = 'applied'
+            else:
+                raise ValueError(f"unknown journal operation {op!r}")
+            result.count(outcome)
+        conn.execute("UPDATE journal_state SET applying = 0, clock = MAX(clock, ?)", (newest,))
+
+
+def apply_segments(db, directory, batch_size=1000):
+    """Applies the segments in ``directory`` not applied to ``db`` before; returns an ApplyResult.
+
+    Segments are read in name order, but any order gives the same result.
+    Raises ValueError on a journal entry seen before with different
+    contents, which two databases writing as one replica produce; see
+    ``rekey``.
+    """
+    result = ApplyResult()
+    db.execute(_STUDENT_INDEX)
+    done = dict(db.query("SELECT name, digest FROM journal_segments"))
+    from pathlib import Path
+    for path in sorted(Path(directory).glob("*.jsonl")):
+        # Applied before digests were recorded, or the very same segment again.  A
+        # different one of the same name is applied entry by entry, which finds
+        # where it parts from the entries already applied.
+        if path.name in done and done[path.name] in (None, _segment_digest(path)):
+            continue
+        _, entries, digest = _read_segment(path)
+        for start in range(0, len(entries), batch_size):
+            _apply_batch(db, entries[start:start + batch_size], result)
+        db.execute("INSERT OR REPLACE INTO journal_segments (name, entries, digest) VALUES (?, ?, ?)",
+                   (path.name, len(entries), digest))
+        result.segments += 1
+    return result
@@ -0,0 +1,93 @@
+"""A class's attendance for one month as a student × day matrix.
+
+The month is read with a single grouped query, one row per student, each
+carrying that student's marks packed into a comma-separated list.  They
+are kept in a ``bytearray`` of status codes, row-major with a column per
+calendar day, where ``UNMARKED`` is a day without a mark: a 500-student
+month is 15.5 kB however the grid is drawn.
+"""
+from calendar import monthrange
+from datetime import date
+
+from .attendance import STATUSES, day_number, day_text, status_code
+from .partitions import attendance_source
+
+UNMARKED = 255
+
+
+def month_bounds(value):
+    """The first and last ISO dates of the month holding the date or ISO date ``value``."""
+    if not isinstance(value, date):
+        value = date.fromisoformat(value)
+    first = value.replace(day=1)
+    return first.isoformat(), first.replace(day=monthrange(first.year, first.month)[1]).isoformat()
+
+
+class AttendanceMatrix:
+    """Status codes of ``students`` (student_id, name, roll_number) by calendar day of one month."""
+
+    def __init__(self, student_class, month, students, codes):
+        self.student_class = student_class
+        first, last = month_bounds(month)
+        self.first_day = day_number(first)
+        self.days = day_number(last) - self.first_day + 1
+        self.students = students
+        self.codes = codes
+        self._rows = {student_id: row for row, (student_id, _, _) in enumerate(students)}
+
+    def date(self, column):
+        """The ISO date of ``column``."""
+        return day_text(self.first_day + column)
+
+    def code(self, row, column):
+        return self.codes[row * self.days + column]
+
+    def status(self, row, column):
+        """The status of a cell, or None when the day is unmarked."""
+        code = self.code(row, column)
+        return None if code == UNMARKED else STATUSES[code]
+
+    def cell(self, student_id, attendance_date):
+        """``(row, column)`` of a student and day, or None if they are not in the matrix."""
+        row = self._rows.get(student_id)
+        column = day_number(attendance_date) - self.first_day
+        if row is None or not 0 <= column < self.days:
+            return None
+        return row, column
+
+    def apply(self, records):
+        """Updates the matrix for (student_id, date, status) marks just written; returns the changed cells."""
+        changed = []
+        for student_id, attendance_date, status in records:
+            cell = self.cell(student_id, attendance_date)
+            if cell is None:
+                continue
+            index = cell[0] * self.days + cell[1]
+            code = status_code(status)
+            if self.codes[index] != code:
+                self.codes[index] = code
+                changed.append(cell)
+        return changed
+
+
+def load_matrix(db, student_class, month):
+    """Loads the AttendanceMatrix of ``student_class`` for the month holding the date ``month``."""
+    first, last = month_bounds(month)
+    first_day, last_day = day_number(first), day_number(last)
+    days = last_day - first_day + 1
+    statuses = len(STATUSES)
+    with attendance_source(db, first, last) as attendance:
+        rows = db.query(f'''SELECT s.student_id, s.name, s.roll_number,
+                                   group_concat((a.day - ?) * {statuses} + a.status_code)
+                            FROM students s
+                            LEFT JOIN {attendance} a ON a.student_id = s.student_id AND a.day BETWEEN ? AND ?
+                            WHERE s.class = ?
+                            GROUP BY s.student_id
+                            ORDER BY s.student_id''', (first_day, first_day, last_day, student_class))
+    codes = bytearray([UNMARKED]) * (len(rows) * days)
+    for row, (_, _, _, packed) in enumerate(rows):
+        if packed:
+            for value in map(int, packed.split(',')):
+                column, code = divmod(value, statuses)
+                codes[row * days + column] = code
+    return AttendanceMatrix(student_class, month, [row[:3] for row in rows], codes)
@@ -0,0 +1,183 @@
+"""Keyset pagination and a bounded page cache for windowed tables.
+
+Pages are fetched with ``WHERE (keys) > (last key) ORDER BY keys LIMIT n``
+instead of OFFSET, so reading page 5,000 costs the same as reading page 1.
+"""
+from collections import OrderedDict
+
+from .attendance import day_number, status_sql
+
+
+class KeysetQuery:
+    """A SELECT that is read one page at a time in ``keys`` order.
+
+    ``params`` bind the placeholders in ``columns``, ``source`` and ``where``,
+    in that order.  The key expressions are appended to the selected columns
+    and stripped again from the returned rows.
+    """
+
+    def __init__(self, columns, source, keys, where=(), params=(), descending=False):
+        self.columns = columns
+        self.source = source
+        self.keys = tuple(keys)
+        self.where = tuple(where)
+        self.params = tuple(params)
+        self.descending = descending
+
+    def _sql(self, seek):
+        keys = ", ".join(self.keys)
+        sql = f"SELECT {self.columns}, {keys} FROM {self.source}"
+        conditions = list(self.where)
+        if seek:
+            marks = ", ".join("?" for _ in self.keys)
+            conditions.append(f"({keys}) {'<' if self.descending else '>'} ({marks})")
+        if conditions:
+            sql += " WHERE " + " AND ".join(f"({condition})" for condition in conditions)
+        order = "DESC" if self.descending else "ASC"
+        sql += " ORDER BY " + ", ".join(f"{key} {order}" for key in self.keys)
+        return sql + " LIMIT ?"
+
+    def page(self, db, after=None, limit=200):
+        """Returns ``(rows, last_key)`` for up to ``limit`` rows following ``after``."""
+        params = self.params + (tuple(after) if after is not None else ()) + (limit,)
+        rows = db.query(self._sql(after is not None), params)
+        if not rows:
+            return [], after
+        split = len(rows[0]) - len(self.keys)
+        return [row[:split] for row in rows], rows[-1][split:]
+
+
+class PagedRows:
+    """Random access over a KeysetQuery, keeping at most ``max_pages`` pages in memory.
+
+    Only the key each page starts after is remembered for evicted pages, so
+    scrolling back refetches a page with a single indexed seek.
+    """
+
+    def __init__(self, db, query, page_size=200, max_pages=20):
+        self.db = db
+        self.query = query
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.reset()
+
+    def reset(self):
+        """Forgets every cached page so the next read goes back to the database."""
+        self._pages = OrderedDict()
+        self._starts = [None]
+        self.exhausted = False
+        self.known_rows = 0
+
+    def _fetch(self, page_no):
+        rows, last_key = self.query.page(self.db, self._starts[page_no], self.page_size)
+        self._pages[page_no] = rows
+        self._pages.move_to_end(page_no)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        if page_no == len(self._starts) - 1 and not self.exhausted:
+            self.known_rows = page_no * self.page_size + len(rows)
+            if len(rows) < self.page_size:
+                self.exhausted = True
+            else:
+                self._starts.append(last_key)
+        return rows
+
+    def page(self, page_no):
+        """Returns the rows of page ``page_no``, fetching earlier pages' keys if needed."""
+        rows = self._pages.get(page_no)
+        if rows is not None:
+            self._pages.move_to_end(page_no)
+            return rows
+        while len(self._starts) <= page_no:
+            if self.exhausted:
+                return []
+            self._fetch(len(self._starts) - 1)
+        if page_no in self._pages:
+            return self._pages[page_no]
+        return self._fetch(page_no)
+
+    def ensure(self, count):
+        """Fetches forward until at least ``count`` rows are known or the query is exhausted."""
+        while self.known_rows < count and not self.exhausted:
+            self._fetch(len(self._starts) - 1)
+        return self.known_rows
+
+    def rows(self, start, count):
+        """Returns up to ``count`` rows beginning at row index ``start``."""
+        result = []
+        index = start
+        while len(result) < count:
+            page_no, offset = divmod(index, self.page_size)
+            page = self.page(page_no)
+            if offset >= len(page):
+                break
+            chunk = page[offset:offset + count - len(result)]
+            result.extend(chunk)
+            index += len(chunk)
+        return result
+
+    def prefetch(self, count):
+        """Loads the first ``count`` rows and returns self; meant to run on a worker thread."""
+        self.rows(0, count)
+        return self
+
+    def row(self, index):
+        """Returns the row at ``index``, or None past the end."""
+        rows = self.rows(index, 1)
+        return rows[0] if rows else None
+
+    def set_row(self, index, values):
+        """Patches a cached row after the caller has written the change to the database."""
+        page_no, offset = divmod(index, self.page_size)
+        page = self._pages.get(page_no)
+        if page is not None and offset < len(page):
+            page[offset] = tuple(values)
+
+
+def student_query(student_class=None):
+    """Students in id order, optionally only one class, as a KeysetQuery."""
+    where, params = (["class = ?"], [student_class]) if student_class else ([], [])
+    return KeysetQuery("student_id, name, roll_number, class", "students", ("student_id",),
+                       where=where, params=params)
+
+
+def roster_query(attendance_date, pending="", student_class=None):
+    """Students with their status on ``attendance_date`` (``pending`` if unmarked) as a KeysetQuery."""
+    where, params = (["s.class = ?"], [student_class]) if student_class else ([], [])
+    return KeysetQuery(f"s.student_id, s.name, COALESCE({status_sql('a.status_code')}, ?)",
+                       '''students s
+                          LEFT JOIN attendance_marks a ON a.student_id = s.student_id AND a.day = ?''',
+                       ("s.student_id",),
+                       where=where,
+                       params=[pending, day_number(attendance_date)] + params)
+
+
+class StaticRows:
+    """A PagedRows-compatible view of rows that are already in memory.
+
+    Used for small aggregated results such as the analytics views.
+    """
+
+    def __init__(self, rows, page_size=200):
+        self._data = [tuple(row) for row in rows]
+        self.page_size = page_size
+        self.known_rows = len(self._data)
+        self.exhausted = True
+
+    def reset(self):
+        pass
+
+    def ensure(self, count):
+        return self.known_rows
+
+    def rows(self, start, count):
+        return self._data[start:start + count]
+
+    def prefetch(self, count):
+        return self
+
+    def row(self, index):
+        return self._data[index] if index < self.known_rows else None
+
+    def set_row(self, index, values):
+        self._data[index] = tuple(values)
@@ -0,0 +1,247 @@
+"""Per-academic-year attendance partitions.
+
+The live ``attendance_marks`` table holds the years still open.  ``rollover``
+seals each finished academic year into its own file next to the database,
+e.g. ``attendance.2023-24.db``.  The file is compacted and made read-only,
+and its rows leave the live table.  The year is recorded in
+``attendance_partitions``, and a trigger rejects marks dated inside a
+sealed year from then on.  So backups of the live file and queries about
+the current term no longer carry the old years.
+
+Report and analytics queries get their attendance relation from
+``attendance_source``.  It attaches only the archives their date range
+overlaps, read-only and immutable, and returns a UNION ALL across them and
+the live table, in the compact (attendance_id, student_id, day,
+status_code) shape of ``attendance_marks``.  Years sealed before schema
+version 8 hold text dates and statuses and are converted as they are read.
+A range inside the open years reads the live table directly, with the same
+plan as before partitioning.
+
+The ``daily_summary`` rows of a sealed year are kept as they were at
+rollover.
+"""
+import os
+import re
+import sqlite3
+import stat
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from .attendance import day_number, day_number_sql, day_text, status_code_sql
+from .history import reclaim_space
+from .summary import TRIGGERS, _marks, _on
+
+# Academic years run from the first of this month to the end of the month before.
+YEAR_START_MONTH = 8
+
+_COLUMNS = "attendance_id, student_id, day, status_code"
+# Archives written before schema version 8, read in the compact shape.
+_TEXT_COLUMNS = (f"attendance_id, student_id, {day_number_sql('date')} AS day, "
+                 f"{status_code_sql('status')} AS status_code")
+_SEALED_MESSAGE = "attendance for a sealed academic year cannot be changed"
+
+
+def create_partition_catalog(conn):
+    """Creates the table of sealed years and the triggers that keep them sealed."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS attendance_partitions (
+                        label TEXT PRIMARY KEY,
+                        start_date TEXT NOT NULL,
+                        end_date TEXT NOT NULL,
+                        path TEXT,
+                        rows INTEGER NOT NULL,
+                        sealed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)''')
+    marks = _marks(conn)
+    new = _on(marks, 'NEW')
+    for event in ("INSERT", f"UPDATE OF {marks['day_column']}"):
+        name = f"trg_attendance_sealed_{event.split()[0].lower()}"
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f'''CREATE TRIGGER {name} BEFORE {event} ON {marks['table']}
+                         WHEN {new['date']} <= (SELECT MAX(end_date) FROM attendance_partitions)
+                         BEGIN
+                             SELECT RAISE(ABORT, '{_SEALED_MESSAGE}');
+                         END''')
+
+
+def academic_year(day):
+    """The label, such as ``'2024-25'``, of the academic year an ISO date falls in."""
+    day = date.fromisoformat(day)
+    first = day.year if day.month >= YEAR_START_MONTH else day.year - 1
+    return f"{first}-{(first + 1) % 100:02d}"
+
+
+def _first_year(label):
+    match = re.fullmatch(r"(\d{4})-(\d{2})", label or "")
+    if match is None or int(match.group(2)) != (int(match.group(1)) + 1) % 100:
+        raise ValueError(f"Not an academic year such as 2024-25: {label!r}")
+    return int(match.group(1))
+
+
+def _label(first):
+    return f"{first}-{(first + 1) % 100:02d}"
+
+
+def year_bounds(label):
+    """Returns the first and last ISO dates of an academic year."""
+    first = _first_year(label)
+    start = date(first, YEAR_START_MONTH, 1)
+    end = date(first + 1, YEAR_START_MONTH, 1) - timedelta(days=1)
+    return start.isoformat(), end.isoformat()
+
+
+def _schema(label):
+    return "archive_" + label.replace("-", "_")
+
+
+def _archive_path(db, file_name):
+    return os.path.join(os.path.dirname(os.path.abspath(db.path)), file_name)
+
+
+def _read_only_uri(path, immutable=True):
+    # Imported here: pathlib is slow to import and only reading sealed years needs it.
+    from pathlib import Path
+    return Path(path).resolve().as_uri() + ("?mode=ro&immutable=1" if immutable else "?mode=ro")
+
+
+def partitions(db):
+    """Rows of (label, start_date, end_date, path, rows, sealed_at) for every sealed year."""
+    return db.query('''SELECT label, start_date, end_date, path, rows, sealed_at
+                       FROM attendance_partitions ORDER BY start_date''')
+
+
+def _attach(conn, wanted):
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")} - {"main", "temp"}
+    missing = [(schema, path) for schema, path in wanted if schema not in attached]
+    if not missing:
+        return
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(wanted) > limit:
+        raise ValueError(f"A query can read at most {limit} sealed academic years; narrow the dates")
+    names = {schema for schema, _ in wanted}
+    spare = sorted(attached - names)
+    while spare and len(attached) + len(missing) > limit:
+        schema = spare.pop()
+        conn.execute(f"DETACH DATABASE {schema}")
+        attached.discard(schema)
+    for schema, path in missing:
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (_read_only_uri(path),))
+
+
+@contextmanager
+def attendance_source(db, start_date=None, end_date=None):
+    """Yields the attendance relation to select from for a date range.
+
+    The sealed years the range overlaps are attached to this thread's
+    connection, and stay attached when the block ends, so the next report
+    on that pooled connection does not open and read the archive's schema
+    again.  That is safe because an archive is never rewritten once sealed,
+    is attached read-only, and takes no part in the connection's writes;
+    ``_attach`` detaches unused ones when a range needs more than
+    SQLite's attach limit.
+    """
+    with db.connection() as conn:
+        sealed = conn.execute('''SELECT label, start_date, end_date, path, rows
+                                 FROM attendance_partitions ORDER BY start_date''').fetchall()
+        wanted = [(_schema(label), _archive_path(db, path))
+                  for label, first, last, path, rows in sealed
+                  if rows and (not start_date or last >= start_date) and (not end_date or first <= end_date)]
+        _attach(conn, wanted)
+        arms = [_archive_arm(conn, schema) for schema, _ in wanted]
+        if not arms or not end_date or end_date > sealed[-1][2]:
+            arms.append(("main.attendance_marks" if arms else "attendance_marks", _COLUMNS))
+        if len(arms) == 1 and arms[0][1] == _COLUMNS:
+            yield arms[0][0]
+        else:
+            yield "(" + " UNION ALL ".join(f"SELECT {columns} FROM {table}" for table, columns in arms) + ")"
+
+
+def _archive_arm(conn, schema):
+    compact = conn.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE name = 'attendance_marks'").fetchone()
+    if compact:
+        return f"{schema}.attendance_marks", _COLUMNS
+    return f"{schema}.attendance", _TEXT_COLUMNS
+
+
+def _write_archive(db, path, first_day, last_day):
+    """Copies the live rows of one year's day numbers into a new compacted file; returns how many."""
+    if os.path.exists(path):
+        # Left behind by an interrupted rollover: it was never registered.
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+        os.remove(path)
+    conn = sqlite3.connect(path, isolation_level=None, uri=True)
+    try:
+        # The caller holds the write lock, so this read sees exactly the rows it will delete.
+        conn.execute("ATTACH DATABASE ? AS live", (_read_only_uri(db.path, immutable=False),))
+        conn.execute("BEGIN")
+        conn.execute('''CREATE TABLE attendance_marks (
+                            attendance_id INTEGER PRIMARY KEY,
+                            student_id INTEGER NOT NULL,
+                            day INTEGER NOT NULL,
+                            status_code INTEGER NOT NULL)''')
+        copied = conn.execute(f'''INSERT INTO attendance_marks ({_COLUMNS})
+                                  SELECT {_COLUMNS} FROM live.attendance_marks
+                                  WHERE day BETWEEN ? AND ?
+                                  ORDER BY attendance_id''', (first_day, last_day)).rowcount
+        conn.execute("CREATE UNIQUE INDEX idx_attendance_marks_student_day ON attendance_marks (student_id, day)")
+        conn.execute("CREATE INDEX idx_attendance_marks_day ON attendance_marks (day)")
+        conn.execute("COMMIT")
+        conn.execute("DETACH DATABASE live")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.chmod(path, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+    return copied
+
+
+def seal_year(db, label):
+    """Moves one finished academic year out of the live table; returns ``(rows, path)``.
+
+    The archive is written and synced before the live rows are deleted, so
+    an interruption at any point leaves every mark in at least one place.
+    """
+    start, end = year_bounds(label)
+    days = (day_number(start), day_number(end))
+    with db.transaction() as conn:
+        sealed = conn.execute("SELECT MAX(end_date) FROM attendance_partitions").fetchone()[0]
+        if sealed is not None and sealed >= start:
+            raise ValueError(f"Academic year {label} is already sealed")
+        expected = conn.execute("SELECT COUNT(*) FROM attendance_marks WHERE day BETWEEN ? AND ?",
+                                days).fetchone()[0]
+        file_name = None
+        if expected:
+            stem = os.path.splitext(os.path.basename(db.path))[0]
+            file_name = f"{stem}.{label}.db"
+            copied = _write_archive(db, _archive_path(db, file_name), *days)
+            if copied != expected:
+                raise sqlite3.DatabaseError(f"Copied {copied} of {expected} rows for {label}")
+        conn.execute('''INSERT INTO attendance_partitions (label, start_date, end_date, path, rows)
+                        VALUES (?, ?, ?, ?, ?)''', (label, start, end, file_name, expected))
+        # The rollup keeps counting sealed marks, so they leave without the delete trigger.
+        conn.execute("DROP TRIGGER trg_summary_attendance_delete")
+        conn.execute("DELETE FROM attendance_marks WHERE day BETWEEN ? AND ?", days)
+        conn.execute(TRIGGERS['trg_summary_attendance_delete'])
+    return expected, file_name and _archive_path(db, file_name)
+
+
+def rollover(db, through=None, today=None):
+    """Seals every finished academic year up to ``through`` (default: last year).
+
+    Returns a list of ``(label, rows, path)``, oldest year first, and then
+    returns the freed pages of the live file to the file system.
+    """
+    current = _first_year(academic_year(today or date.today().isoformat()))
+    last = current - 1 if through is None else _first_year(through)
+    if last >= current:
+        raise ValueError(f"Academic year {_label(last)} has not finished yet")
+    sealed = db.query_one("SELECT MAX(end_date) FROM attendance_partitions")[0]
+    if sealed is None:
+        oldest = db.query_one("SELECT MIN(day) FROM attendance_marks")[0]
+    else:
+        oldest = db.query_one("SELECT MIN(day) FROM attendance_marks WHERE day > ?", (day_number(sealed),))[0]
+    if oldest is None:
+        return []
+    results = []
+    for first in range(_first_year(academic_year(day_text(oldest))), last + 1):
+        results.append((_label(first), *seal_year(db, _label(first))))
+    if results:
+        reclaim_space(db)
+    return results
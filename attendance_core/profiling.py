@@ -0,0 +1,243 @@
+"""Opt-in profiling of database statements, background tasks and UI updates.
+
+``PROFILER`` keeps a latency histogram and a row count for every
+operation.  An operation is an SQL statement (whitespace-normalised), a
+background task, or a named UI step such as filling the report table.
+Statements slower than ``slow_threshold`` are also kept with their
+``EXPLAIN QUERY PLAN``.  Everything is readable from the diagnostics tab
+of the front-ends or dumped as JSON with ``dump``.
+
+Profiling is off unless ``ATTENDANCE_PROFILE`` is set in the environment
+or ``enable`` is called.  While it is off every hook is a single attribute
+check, and ``span`` returns a shared do-nothing context manager.
+
+``STARTUP`` times how long a front-end takes to appear; see StartupTimer.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds of the histogram buckets in seconds: 50 µs doubling up to
+# about 26 s, then everything slower.
+BUCKETS = tuple(0.00005 * 2 ** n for n in range(20))
+
+SLOW_THRESHOLD = 0.05
+
+
+class Histogram:
+    """Counts of latencies per bucket, plus their total, maximum and row count."""
+
+    __slots__ = ('counts', 'count', 'total', 'max', 'rows')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+    def add(self, elapsed, rows=None):
+        self.counts[bisect_left(BUCKETS, elapsed)] += 1
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        if rows is not None and rows > 0:
+            self.rows += rows
+
+    def percentile(self, fraction):
+        """The upper bound of the bucket holding the ``fraction`` quantile (the maximum for the last one)."""
+        wanted = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if count and seen >= wanted:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'max': self.max,
+            'rows': self.rows,
+            'buckets': {(f"<={bound:g}" if index < len(BUCKETS) else f">{BUCKETS[-1]:g}"): count
+                        for index, (bound, count) in enumerate(zip(BUCKETS + (None,), self.counts))
+                        if count},
+        }
+
+
+class _Span:
+    __slots__ = ('profiler', 'operation', 'rows', 'start')
+
+    def __init__(self, profiler, operation):
+        self.profiler = profiler
+        self.operation = operation
+        self.rows = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.profiler.record(self.operation, time.perf_counter() - self.start, self.rows)
+
+
+class _NoSpan:
+    __slots__ = ('rows',)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Profiler:
+    """Thread-safe latency histograms per operation and the slowest statements."""
+
+    def __init__(self, enabled=False, slow_threshold=SLOW_THRESHOLD, max_slow=50):
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.max_slow = max_slow
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.operations = {}
+            self.slow = {}
+
+    def span(self, operation):
+        """A context manager timing its block as ``operation``; set ``.rows`` on it to count rows."""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, operation)
+
+    def record(self, operation, elapsed, rows=None):
+        """Adds one timing of ``operation``."""
+        with self._lock:
+            histogram = self.operations.get(operation)
+            if histogram is None:
+                histogram = self.operations[operation] = Histogram()
+            histogram.add(elapsed, rows)
+
+    def record_query(self, sql, elapsed, rows=None, explain=None):
+        """Adds one timing of a statement; a slow one is kept with the plan from ``explain()``.
+
+        The plan of each statement is looked up once, the first time it is slow.
+        """
+        key = ' '.join(sql.split())
+        self.record(key, elapsed, rows)
+        if elapsed < self.slow_threshold:
+            return
+        with self._lock:
+            entry = self.slow.get(key)
+            if entry is not None:
+                entry['count'] += 1
+                entry['max'] = max(entry['max'], elapsed)
+                return
+        plan = explain() if explain is not None else []
+        with self._lock:
+            self.slow.setdefault(key, {'sql': key, 'count': 0, 'max': 0.0, 'plan': plan})
+            entry = self.slow[key]
+            entry['count'] += 1
+            entry['max'] = max(entry['max'], elapsed)
+            if len(self.slow) > self.max_slow:
+                del self.slow[min(self.slow, key=lambda sql: self.slow[sql]['max'])]
+
+    def snapshot(self):
+        """Returns the histograms and slow statements as plain data, slowest total first."""
+        with self._lock:
+            operations = {name: histogram.as_dict() for name, histogram in self.operations.items()}
+            slow = sorted((dict(entry) for entry in self.slow.values()), key=lambda entry: -entry['max'])
+        return {
+            'enabled': self.enabled,
+            'started': self.started,
+            'slow_threshold': self.slow_threshold,
+            'operations': dict(sorted(operations.items(), key=lambda item: -item[1]['total'])),
+            'slow_queries': slow,
+        }
+
+    def dump(self, path):
+        """Writes ``snapshot()`` to ``path`` as JSON."""
+        with open(path, 'w', encoding='utf-8') as out:
+            json.dump(self.snapshot(), out, indent=2)
+
+
+PROFILER = Profiler(enabled=bool(os.environ.get('ATTENDANCE_PROFILE')))
+
+
+def _process_age():
+    """Seconds since this process was started, from /proc; None where that is not available."""
+    try:
+        with open('/proc/self/stat', encoding='ascii') as stat:
+            # The fields after the command name; the start time is field 22 of the whole line.
+            started = int(stat.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', encoding='ascii') as uptime:
+            return float(uptime.read().split()[0]) - started / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTimer:
+    """Logs the milestones of a front-end's start to stderr, timed from process launch.
+
+    On when ``ATTENDANCE_STARTUP`` is set.  Launch is read from /proc where
+    there is one (to 10 ms), otherwise it is the time this module was
+    imported.  ``watch`` adds the first paint of the window; with
+    ``ATTENDANCE_STARTUP=exit`` the window is closed once that and the
+    other awaited milestones are reached, so a script can time cold starts.
+    """
+
+    def __init__(self, mode=None):
+        self.enabled = bool(mode)
+        self.exit_when_ready = mode == 'exit'
+        age = _process_age() if self.enabled else None
+        self.launched = time.perf_counter() - (age or 0.0)
+        self.marks = []
+        self._root = None
+        self._waiting = set()
+
+    def mark(self, label):
+        """Logs that ``label`` has been reached."""
+        if not self.enabled:
+            return
+        elapsed = time.perf_counter() - self.launched
+        self.marks.append((label, elapsed))
+        print(f"startup: {label} after {elapsed * 1000:.0f} ms", file=sys.stderr, flush=True)
+        self._waiting.discard(label)
+        if self.exit_when_ready and self._root is not None and not self._waiting:
+            self._root.after_idle(self._root.destroy)
+
+    def watch(self, root, *awaited):
+        """Marks the first paint of the Tk ``root``; in exit mode, closes it after that and ``awaited``."""
+        if not self.enabled:
+            return
+
+        def painted(event):
+            root.unbind("<Expose>")
+            self.mark("first paint")
+
+        self._root = root
+        self._waiting = {"first paint", *awaited}
+        root.bind("<Expose>", painted)
+
+
+STARTUP = StartupTimer(os.environ.get('ATTENDANCE_STARTUP'))
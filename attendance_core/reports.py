@@ -0,0 +1,106 @@
+"""Attendance report queries.
+
+Every filter is pushed into the SQL WHERE clause as a bound parameter, and
+results are either paged with keyset pagination on (day, attendance_id)
+or streamed with ``fetchmany``, so memory use does not grow with the size
+of the attendance history.  The attendance relation covers only the
+academic years the date range falls in; see partitions.  Report pages are
+kept in the database's result cache until the next write.
+"""
+from datetime import date
+
+from .attendance import date_sql, day_number, status_code, status_sql
+from .paging import KeysetQuery, PagedRows
+from .partitions import attendance_source
+
+REPORT_COLUMNS = ("Name", "Roll Number", "Date", "Status")
+
+_SELECT = f"s.name, s.roll_number, {date_sql('a.day')}, {status_sql('a.status_code')}"
+_JOIN = " a JOIN students s ON a.student_id = s.student_id"
+_KEYS = ("a.day", "a.attendance_id")
+
+
+def parse_date(text):
+    """Returns ``text`` as a normalised ISO date, or None when blank.
+
+    Raises ValueError for anything that is not a YYYY-MM-DD date.
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    return date.fromisoformat(text).isoformat()
+
+
+def report_filters(start_date=None, end_date=None, student_class=None, roll_number=None, status=None):
+    """Returns ``(where, params)`` for the given report filters; blank filters are ignored."""
+    where = []
+    params = []
+    if start_date:
+        where.append("a.day >= ?")
+        params.append(day_number(start_date))
+    if end_date:
+        where.append("a.day <= ?")
+        params.append(day_number(end_date))
+    if student_class:
+        where.append("s.class = ?")
+        params.append(student_class)
+    if roll_number:
+        where.append("s.roll_number = ?")
+        params.append(roll_number)
+    if status:
+        where.append("a.status_code = ?")
+        params.append(status_code(status))
+    return where, params
+
+
+class ReportQuery:
+    """The filtered report, newest day first, read a page at a time like a KeysetQuery.
+
+    Each page resolves the attendance source again, so a report left open
+    across a rollover keeps reading the right files.
+    """
+
+    def __init__(self, start_date=None, end_date=None, **filters):
+        self.where, self.params = report_filters(start_date=start_date, end_date=end_date, **filters)
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def page(self, db, after=None, limit=200):
+        """Returns ``(rows, last_key)`` for up to ``limit`` rows following ``after``."""
+        key = ("report", self.start_date, self.end_date, tuple(self.where), tuple(self.params),
+               None if after is None else tuple(after), limit)
+        rows, last_key = db.results.get(db, key, lambda: self._page(db, after, limit))
+        return list(rows), last_key
+
+    def _page(self, db, after, limit):
+        with attendance_source(db, self.start_date, self.end_date) as attendance:
+            query = KeysetQuery(_SELECT, attendance + _JOIN, _KEYS,
+                                where=self.where, params=self.params, descending=True)
+            rows, last_key = query.page(db, after, limit)
+            return tuple(rows), last_key
+
+
+def report_query(**filters):
+    """The filtered report as a ReportQuery."""
+    return ReportQuery(**filters)
+
+
+def report_pages(db, page_size=200, **filters):
+    """The filtered report as PagedRows for the windowed report table."""
+    return PagedRows(db, report_query(**filters), page_size)
+
+
+def report_page(db, after=None, limit=200, **filters):
+    """Returns one page of the report and the key to pass as ``after`` for the next one."""
+    return report_query(**filters).page(db, after, limit)
+
+
+def stream_report(db, chunk_size=1000, **filters):
+    """Yields the filtered report row by row, fetching ``chunk_size`` rows at a time."""
+    where, params = report_filters(**filters)
+    with attendance_source(db, filters.get('start_date'), filters.get('end_date')) as attendance:
+        sql = f"SELECT {_SELECT} FROM {attendance}{_JOIN}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY a.day DESC, a.attendance_id DESC"
+        yield from db.iter_query(sql, params, chunk_size)
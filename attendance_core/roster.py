@@ -0,0 +1,148 @@
+"""In-memory roster cache shared by the tabs of a front-end.
+
+The roster hardly changes during a school day, so it is read from SQLite
+into ``__slots__`` records indexed by student_id and by class, and read
+again only after a commit.  It backs the Manage Students list and the
+class lists of the attendance and monthly grid tabs.
+
+The student lists handed out are never mutated: a reload builds new
+lists, so a table can keep showing its snapshot while another thread
+reloads the cache.
+"""
+import threading
+
+
+class Student:
+    """One cached student row."""
+
+    __slots__ = ('student_id', 'name', 'roll_number', 'student_class')
+
+    def __init__(self, student_id, name, roll_number, student_class):
+        self.student_id = student_id
+        self.name = name
+        self.roll_number = roll_number
+        self.student_class = student_class
+
+    def as_row(self):
+        return (self.student_id, self.name, self.roll_number, self.student_class)
+
+
+class RosterCache:
+    """All students of one database, loaded on first use.
+
+    Every read checks ``db.generation()`` and reloads the roster when
+    anything was committed since it was loaded, so students added or
+    deleted elsewhere (another tab, the CLI, the HTTP service, an applied
+    sync) show up on the next read.  ``hits`` counts reads served from
+    memory and ``misses`` reads that had to load the roster.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._generation = None
+        self._ordered = None
+        self._by_id = None
+        self._by_class = None
+
+    def _load(self):
+        ordered = [Student(*row) for row in self.db.query(
+            "SELECT student_id, name, roll_number, class FROM students ORDER BY student_id")]
+        by_class = {}
+        for student in ordered:
+            by_class.setdefault(student.student_class, []).append(student)
+        self._ordered = ordered
+        self._by_id = {student.student_id: student for student in ordered}
+        self._by_class = by_class
+
+    def _ensure(self):
+        # Caller holds the lock.  The generation is read before loading, so a
+        # commit that lands during the load is picked up by the next read.
+        generation = self.db.generation()
+        if self._ordered is None or generation != self._generation:
+            self.misses += 1
+            self._generation = generation
+            self._load()
+        else:
+            self.hits += 1
+
+    def students(self, student_class=None):
+        """Students in id order, optionally only one class, as a read-only list."""
+        with self._lock:
+            self._ensure()
+            if student_class:
+                return self._by_class.get(student_class, [])
+            return self._ordered
+
+    def get(self, student_id):
+        """The cached Student with ``student_id``, or None."""
+        with self._lock:
+            self._ensure()
+            return self._by_id.get(student_id)
+
+    def classes(self):
+        """Sorted class names that have at least one student."""
+        with self._lock:
+            self._ensure()
+            return sorted(self._by_class)
+
+    def loaded_classes(self):
+        """The classes of the roster as last loaded, without reading the database; [] before that."""
+        with self._lock:
+            return sorted(self._by_class) if self._by_class is not None else []
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'students': len(self._ordered) if self._ordered is not None else None}
+
+
+class RosterRows:
+    """PagedRows-compatible student records over the cached roster, for the Manage Students tab."""
+
+    def __init__(self, cache, student_class=None, page_size=200):
+        self.cache = cache
+        self.student_class = student_class
+        self.page_size = page_size
+        self.reset()
+
+    def reset(self):
+        """Forgets the snapshot; the next read takes a fresh one."""
+        self._students = None
+        self._patched = {}
+        self.known_rows = 0
+        self.exhausted = False
+
+    def _load(self):
+        if self._students is None:
+            self._students = self.cache.students(self.student_class)
+            self.known_rows = len(self._students)
+            self.exhausted = True
+
+    def _row(self, index):
+        patched = self._patched.get(index)
+        if patched is not None:
+            return patched
+        return self._students[index].as_row()
+
+    def ensure(self, count):
+        self._load()
+        return self.known_rows
+
+    def rows(self, start, count):
+        self._load()
+        return [self._row(index) for index in range(start, min(start + count, self.known_rows))]
+
+    def prefetch(self, count):
+        """Takes the snapshot and returns self; meant to run on a worker thread."""
+        self._load()
+        return self
+
+    def row(self, index):
+        self._load()
+        return self._row(index) if index < self.known_rows else None
+
+    def set_row(self, index, values):
+        self._patched[index] = tuple(values)
@@ -0,0 +1,140 @@
+"""Versioned schema migrations.
+
+The applied version is stored in ``PRAGMA user_version``.  Each migration
+runs in its own transaction together with the version bump, so a database
+is never left half-migrated.
+"""
+from .attendance import STATUS_CODES, date_sql, day_number_sql, status_code_sql, status_sql
+from .history import create_attendance_archive, rekey_attendance_archive
+from .journal import create_journal, track_replica_copies
+from .partitions import create_partition_catalog
+from .search import create_student_search, recreate_student_search
+from .summary import create_daily_summary
+
+
+def _create_base_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS students (
+                        student_id INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL,
+                        roll_number TEXT NOT NULL,
+                        class TEXT NOT NULL)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS attendance (
+                        attendance_id INTEGER PRIMARY KEY,
+                        student_id INTEGER,
+                        date TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        FOREIGN KEY (student_id) REFERENCES students(student_id))''')
+
+
+def _index_attendance(conn):
+    # Keep the most recent mark when a student was recorded twice on one day.
+    conn.execute('''DELETE FROM attendance
+                    WHERE attendance_id NOT IN (SELECT MAX(attendance_id)
+                                                FROM attendance
+                                                GROUP BY student_id, date)''')
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_student_date
+                    ON attendance (student_id, date)''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_attendance_date
+                    ON attendance (date)''')
+
+
+def _index_students_class(conn):
+    # Attendance sessions load one class; student_id order within it comes from the rowid.
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_students_class
+                    ON students (class)''')
+
+
+def _compact_attendance(conn):
+    # Statuses become small integer codes and dates day numbers, which
+    # shrinks every row and index entry; see attendance.  Rows whose date or
+    # status cannot be encoded, or whose student was deleted before foreign
+    # keys were enforced, are moved to attendance_archive as they are.
+    statuses = ", ".join(f"'{status}'" for status in STATUS_CODES)
+    encodable = (f"a.date IS date(a.date) AND a.status IN ({statuses})"
+                 " AND EXISTS (SELECT 1 FROM students s WHERE s.student_id = a.student_id)")
+    conn.execute('''CREATE TABLE attendance_marks (
+                        attendance_id INTEGER PRIMARY KEY,
+                        student_id INTEGER NOT NULL,
+                        day INTEGER NOT NULL,
+                        status_code INTEGER NOT NULL,
+                        FOREIGN KEY (student_id) REFERENCES students(student_id))''')
+    rekey_attendance_archive(conn)
+    conn.execute(f'''INSERT INTO attendance_archive
+                         (attendance_id, student_id, name, roll_number, class, date, status)
+                     SELECT a.attendance_id, a.student_id, s.name, s.roll_number, s.class, a.date, a.status
+                     FROM attendance a LEFT JOIN students s ON s.student_id = a.student_id
+                     WHERE NOT ({encodable})''')
+    conn.execute(f'''INSERT INTO attendance_marks (attendance_id, student_id, day, status_code)
+                     SELECT a.attendance_id, a.student_id, {day_number_sql('a.date')}, {status_code_sql('a.status')}
+                     FROM attendance a
+                     WHERE {encodable}
+                     ORDER BY a.attendance_id''')
+    conn.execute("DROP TABLE attendance")
+    conn.execute('''CREATE UNIQUE INDEX idx_attendance_marks_student_day
+                    ON attendance_marks (student_id, day)''')
+    conn.execute('''CREATE INDEX idx_attendance_marks_day
+                    ON attendance_marks (day)''')
+
+    # The old shape, for queries and tools written against it.
+    day = day_number_sql('NEW.date')
+    code = status_code_sql('NEW.status')
+    conn.execute(f'''CREATE VIEW attendance (attendance_id, student_id, date, status) AS
+                     SELECT attendance_id, student_id, {date_sql('day')}, {status_sql('status_code')}
+                     FROM attendance_marks''')
+    conn.execute(f'''CREATE TRIGGER trg_attendance_view_insert INSTEAD OF INSERT ON attendance
+                     BEGIN
+                         INSERT INTO attendance_marks (attendance_id, student_id, day, status_code)
+                         VALUES (NEW.attendance_id, NEW.student_id, {day}, {code});
+                     END''')
+    conn.execute(f'''CREATE TRIGGER trg_attendance_view_update INSTEAD OF UPDATE ON attendance
+                     BEGIN
+                         UPDATE attendance_marks
+                         SET student_id = NEW.student_id, day = {day}, status_code = {code}
+                         WHERE attendance_id = OLD.attendance_id;
+                     END''')
+    conn.execute('''CREATE TRIGGER trg_attendance_view_delete INSTEAD OF DELETE ON attendance
+                    BEGIN
+                        DELETE FROM attendance_marks WHERE attendance_id = OLD.attendance_id;
+                    END''')
+
+    # Dropping the old table dropped its triggers; recreate them on the new one.
+    create_daily_summary(conn)
+    create_partition_catalog(conn)
+
+
+MIGRATIONS = [
+    (1, _create_base_tables),
+    (2, _index_attendance),
+    (3, create_daily_summary),
+    (4, _index_students_class),
+    (5, create_student_search),
+    (6, create_attendance_archive),
+    (7, create_partition_catalog),
+    (8, _compact_attendance),
+    (9, create_journal),
+    (10, rekey_attendance_archive),
+    (11, recreate_student_search),
+    (12, track_replica_copies),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(db):
+    """Returns the schema version recorded in the database file."""
+    return db.query_one("PRAGMA user_version")[0]
+
+
+def migrate(db, target_version=SCHEMA_VERSION):
+    """Applies pending migrations up to ``target_version`` and returns the resulting version."""
+    version = schema_version(db)
+    for target, step in MIGRATIONS:
+        if target <= version or target > target_version:
+            continue
+        with db.transaction() as conn:
+            # Another process may have migrated while we waited for the lock.
+            if conn.execute("PRAGMA user_version").fetchone()[0] < target:
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {int(target)}")
+        version = target
+    return version
@@ -0,0 +1,81 @@
+"""Type-ahead student search over an FTS5 index of names and roll numbers.
+
+``students_fts`` is an external-content FTS5 table: it stores only the
+index, not a second copy of the rows.  Triggers on ``students`` keep it in
+sync whichever code path changes a student.  Each word the user types is
+matched as a prefix, and every word must match.
+"""
+import re
+
+_WORD = re.compile(r"\w+")
+
+TRIGGERS = {
+    'trg_students_fts_insert': '''
+        CREATE TRIGGER trg_students_fts_insert AFTER INSERT ON students
+        BEGIN
+            INSERT INTO students_fts (rowid, name, roll_number)
+            VALUES (NEW.student_id, NEW.name, NEW.roll_number);
+        END''',
+    'trg_students_fts_delete': '''
+        CREATE TRIGGER trg_students_fts_delete AFTER DELETE ON students
+        BEGIN
+            INSERT INTO students_fts (students_fts, rowid, name, roll_number)
+            VALUES ('delete', OLD.student_id, OLD.name, OLD.roll_number);
+        END''',
+    'trg_students_fts_update': '''
+        CREATE TRIGGER trg_students_fts_update AFTER UPDATE OF student_id, name, roll_number ON students
+        BEGIN
+            INSERT INTO students_fts (students_fts, rowid, name, roll_number)
+            VALUES ('delete', OLD.student_id, OLD.name, OLD.roll_number);
+            INSERT INTO students_fts (rowid, name, roll_number)
+            VALUES (NEW.student_id, NEW.name, NEW.roll_number);
+        END''',
+}
+
+
+def create_student_search(conn):
+    """Creates the FTS5 index and its triggers, then indexes the existing students."""
+    # Prefix indexes make one- and two-character type-ahead queries cheap.
+    # Matches are whole-row token prefixes ordered by rowid, so the index
+    # keeps no positions (detail=none) or column sizes (columnsize=0): it
+    # is smaller, and indexing a student costs less on every insert.
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5 (
+                        name, roll_number,
+                        content='students', content_rowid='student_id',
+                        prefix='1 2', columnsize=0, detail=none)''')
+    for name, ddl in TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(ddl)
+    conn.execute("INSERT INTO students_fts (students_fts) VALUES ('rebuild')")
+
+
+def recreate_student_search(conn):
+    """Rebuilds an index created with positions and column sizes in the current shape."""
+    conn.execute("DROP TABLE students_fts")
+    create_student_search(conn)
+
+
+def match_expression(text):
+    """Turns what the user typed into an FTS5 query, or None if it has no words."""
+    words = _WORD.findall(text or "")
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_students(db, text, limit=50, student_class=None):
+    """Up to ``limit`` students whose name or roll number matches ``text`` as you type.
+
+    Returns (student_id, name, roll_number, class) rows in student_id order.
+    """
+    expression = match_expression(text)
+    if expression is None:
+        return []
+    sql = '''SELECT s.student_id, s.name, s.roll_number, s.class
+             FROM students_fts f JOIN students s ON s.student_id = f.rowid
+             WHERE students_fts MATCH ?'''
+    params = [expression]
+    if student_class:
+        sql += " AND s.class = ?"
+        params.append(student_class)
+    return db.query(sql + " ORDER BY f.rowid LIMIT ?", params + [limit])
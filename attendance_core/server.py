@@ -0,0 +1,394 @@
+"""Local HTTP/JSON attendance service: ``python -m attendance_core serve``.
+
+Many teachers can mark attendance at once from different machines.  Each
+request is parsed on the asyncio event loop.  Reads run in parallel on a
+thread pool that borrows pooled connections.  Every write goes through
+one GroupCommitWriter task instead of opening its own connection.  That
+task takes whatever writes are queued, up to ``max_batch``, and runs them
+in one transaction, each inside its own SAVEPOINT.  So a burst of 200
+teachers pressing "save" costs a handful of commits, nobody waits on the
+SQLite write lock, and one bad request does not roll back the others.
+
+Endpoints (all JSON)::
+
+    GET    /students?class=&after=&limit=      students in id order
+    GET    /students/<id>
+    POST   /students                           {"name", "roll_number", "class"}
+    DELETE /students/<id>?archive=1          archive=1 keeps the attendance history
+    GET    /roster?date=&class=&after=&limit=  students with their status that day
+    POST   /attendance                         {"date", "status", "student_ids": [...]}
+    POST   /attendance/remaining               {"date", "status", "class"}
+    GET    /report?from=&to=&class=&roll=&status=&after=&limit=
+    GET    /views/<name>?from=&to=&class=&roll=
+    GET    /stats                              counters, result cache, and profiles when profiling is on
+
+Paged endpoints return ``{"columns", "rows", "next"}``.  To get the
+following page, pass ``next`` back as ``after``.
+"""
+import asyncio
+import json
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .analytics import VIEWS, run_view
+from .attendance import mark_many, mark_remaining
+from .paging import roster_query, student_query
+from .profiling import PROFILER
+from .reports import REPORT_COLUMNS, parse_date, report_page
+from .students import STUDENT_COLUMNS, add_student, delete_student, get_student
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY = 1 << 20
+MAX_PAGE = 1000
+
+ROSTER_COLUMNS = ("ID", "Name", "Status")
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    """An error response with a status code and a message for the client."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class GroupCommitWriter:
+    """Serialises writes through one thread, committing queued writes together.
+
+    ``submit(fn, *args)`` awaits ``fn(db, *args)``.  Core functions open
+    their own ``db.transaction()``, which nests into the batch transaction
+    because the batch runs on the same thread.
+    """
+
+    def __init__(self, db, max_batch=256):
+        self.db = db
+        self.max_batch = max_batch
+        self.batches = 0
+        self.writes = 0
+        self._queue = asyncio.Queue()
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, fn, *args):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((fn, args, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(self._thread, self._commit, batch)
+            except Exception as exc:
+                # The COMMIT itself failed: nothing in the batch was written.
+                results = [(False, exc)] * len(batch)
+            self.batches += 1
+            self.writes += len(batch)
+            for (_, _, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _commit(self, batch):
+        results = []
+        with self.db.transaction() as conn:
+            for fn, args, _ in batch:
+                conn.execute("SAVEPOINT request")
+                try:
+                    value = fn(self.db, *args)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO request")
+                    results.append((False, exc))
+                else:
+                    results.append((True, value))
+                conn.execute("RELEASE request")
+        return results
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._thread.shutdown(wait=True)
+
+
+def _limit(query):
+    try:
+        limit = int(query.get("limit", 200))
+    except ValueError:
+        raise HTTPError(400, "limit must be an integer") from None
+    return max(1, min(limit, MAX_PAGE))
+
+
+def _int(text, what):
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{what} must be an integer") from None
+
+
+def _id_cursor(query):
+    after = query.get("after")
+    return (_int(after, "after"),) if after else None
+
+
+def _report_cursor(query):
+    after = query.get("after")
+    if not after:
+        return None
+    day, _, attendance_id = after.rpartition(",")
+    return (_int(day, "after"), _int(attendance_id, "after"))
+
+
+def _filters(query):
+    return {
+        'start_date': parse_date(query.get("from")),
+        'end_date': parse_date(query.get("to")),
+        'student_class': query.get("class"),
+        'roll_number': query.get("roll"),
+        'status': query.get("status"),
+    }
+
+
+def _page(columns, rows, last, limit, cursor=lambda key: key[0]):
+    return {"columns": list(columns), "rows": [list(row) for row in rows],
+            "next": cursor(last) if len(rows) == limit else None}
+
+
+def _required(body, *names):
+    missing = [name for name in names if body.get(name) in (None, "")]
+    if missing:
+        raise HTTPError(400, f"missing field(s): {', '.join(missing)}")
+    return [body[name] for name in names]
+
+
+def _class_remaining(db, attendance_date, status, student_class):
+    student_ids = None
+    if student_class:
+        student_ids = [row[0] for row in db.query("SELECT student_id FROM students WHERE class = ?",
+                                                  (student_class,))]
+    return mark_remaining(db, attendance_date, status, student_ids)
+
+
+class AttendanceService:
+    """Routes HTTP requests to the core functions."""
+
+    def __init__(self, db, readers=4, max_batch=256):
+        self.db = db
+        self.writer = GroupCommitWriter(db, max_batch)
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-reader')
+        self.routes = [
+            ("GET", r"/students", self.list_students),
+            ("POST", r"/students", self.create_student),
+            ("GET", r"/students/(\d+)", self.show_student),
+            ("DELETE", r"/students/(\d+)", self.remove_student),
+            ("GET", r"/roster", self.roster),
+            ("POST", r"/attendance", self.mark),
+            ("POST", r"/attendance/remaining", self.mark_rest),
+            ("GET", r"/report", self.report),
+            ("GET", r"/views/([^/]+)", self.view),
+            ("GET", r"/stats", self.stats),
+        ]
+        self.routes = [(method, re.compile(pattern + "$"), handler)
+                       for method, pattern, handler in self.routes]
+
+    async def read(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._readers, lambda: fn(self.db, *args, **kwargs))
+
+    async def list_students(self, query, body):
+        limit = _limit(query)
+        rows, last = await self.read(student_query(query.get("class")).page, _id_cursor(query), limit)
+        return 200, _page(STUDENT_COLUMNS, rows, last, limit)
+
+    async def show_student(self, query, body, student_id):
+        row = await self.read(get_student, int(student_id))
+        if row is None:
+            raise HTTPError(404, f"no student {student_id}")
+        return 200, dict(zip(STUDENT_COLUMNS, row))
+
+    async def create_student(self, query, body):
+        name, roll_number, student_class = _required(body, "name", "roll_number", "class")
+        student_id = await self.writer.submit(add_student, name, roll_number, student_class)
+        return 201, {"student_id": student_id}
+
+    async def remove_student(self, query, body, student_id):
+        archive = query.get("archive", "") not in ("", "0")
+        if not await self.writer.submit(delete_student, int(student_id), archive):
+            raise HTTPError(404, f"no student {student_id}")
+        return 200, {"deleted": int(student_id)}
+
+    async def roster(self, query, body):
+        attendance_date = parse_date(query.get("date"))
+        if attendance_date is None:
+            raise HTTPError(400, "date is required")
+        limit = _limit(query)
+        page = roster_query(attendance_date, None, query.get("class")).page
+        rows, last = await self.read(page, _id_cursor(query), limit)
+        return 200, _page(ROSTER_COLUMNS, rows, last, limit)
+
+    async def mark(self, query, body):
+        attendance_date, status, student_ids = _required(body, "date", "status", "student_ids")
+        attendance_date = parse_date(attendance_date)
+        records = [(_int(student_id, "student_ids"), attendance_date, status) for student_id in student_ids]
+        return 200, {"marked": await self.writer.submit(mark_many, records)}
+
+    async def mark_rest(self, query, body):
+        attendance_date, status = _required(body, "date", "status")
+        marked = await self.writer.submit(_class_remaining, parse_date(attendance_date), status,
+                                          body.get("class"))
+        return 200, {"marked": len(marked)}
+
+    async def report(self, query, body):
+        limit = _limit(query)
+        rows, last = await self.read(report_page, _report_cursor(query), limit, **_filters(query))
+        return 200, _page(REPORT_COLUMNS, rows, last, limit, cursor=lambda key: f"{key[0]},{key[1]}")
+
+    async def view(self, query, body, name):
+        name = unquote(name)
+        if name not in VIEWS:
+            raise HTTPError(404, f"no view {name!r}")
+        rows = await self.read(run_view, name, **_filters(query))
+        return 200, {"columns": list(VIEWS[name][0]), "rows": [list(row) for row in rows], "next": None}
+
+    async def stats(self, query, body):
+        stats = {"write_batches": self.writer.batches, "writes": self.writer.writes,
+                 "queries": self.db.stats.snapshot(), "results": self.db.results.snapshot()}
+        if PROFILER.enabled:
+            stats["profile"] = PROFILER.snapshot()
+        return 200, stats
+
+    async def dispatch(self, method, target, body):
+        parts = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(parts.path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            try:
+                return await handler(query, body, *match.groups())
+            except HTTPError:
+                raise
+            except ValueError as exc:
+                raise HTTPError(400, str(exc)) from None
+            except sqlite3.IntegrityError as exc:
+                # Foreign keys: attendance for a student who does not exist.
+                raise HTTPError(409, str(exc)) from None
+            except sqlite3.OperationalError as exc:
+                raise HTTPError(503, str(exc)) from None
+        if allowed:
+            raise HTTPError(405, f"{method} not allowed on {parts.path}")
+        raise HTTPError(404, f"no route for {parts.path}")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                try:
+                    payload = json.loads(body) if body else {}
+                    if not isinstance(payload, dict):
+                        raise HTTPError(400, "request body must be a JSON object")
+                    status, result = await self.dispatch(method, target, payload)
+                except HTTPError as exc:
+                    status, result = exc.status, {"error": str(exc)}
+                except json.JSONDecodeError as exc:
+                    status, result = 400, {"error": f"invalid JSON: {exc}"}
+                except Exception as exc:
+                    status, result = 500, {"error": str(exc)}
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, result, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as exc:
+            writer.write(_response(exc.status, {"error": str(exc)}, False))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """Serves until cancelled; ``ready(server)`` is called once listening."""
+        self.writer.start()
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.writer.close()
+            self._readers.shutdown(wait=False)
+
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "bad Content-Length") from None
+    if length > MAX_BODY:
+        raise HTTPError(413, f"request body over {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def _response(status, result, keep_alive):
+    body = json.dumps(result).encode()
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+def run(db, host=DEFAULT_HOST, port=DEFAULT_PORT, readers=4, max_batch=256):
+    """Runs the service in the foreground until interrupted."""
+    service = AttendanceService(db, readers=readers, max_batch=max_batch)
+
+    def ready(server):
+        address = server.sockets[0].getsockname()
+        print(f"Serving attendance on http://{address[0]}:{address[1]}/", flush=True)
+
+    try:
+        asyncio.run(service.serve(host, port, ready))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,93 @@
+"""Attendance sessions: marking one class on one day.
+
+A session loads only its class, through ``idx_students_class``, together
+with each student's saved status for the day.  Marks are staged in memory
+and shown as unsaved.  ``pending()`` then hands them to ``mark_many`` so
+the whole session is committed in one transaction.
+"""
+from .attendance import STATUSES, _as_date_text, day_number
+
+SESSION_COLUMNS = ("ID", "Name", "Roll Number", "Status", "Marked")
+
+SAVED = "Yes"
+UNSAVED = "Unsaved"
+UNMARKED = "No"
+
+
+class AttendanceSession:
+    """The students of ``student_class`` and their marks on ``attendance_date``."""
+
+    def __init__(self, student_class, attendance_date, pending="Pending"):
+        self.student_class = student_class
+        self.attendance_date = _as_date_text(attendance_date)
+        self.pending_label = pending
+        self.students = []
+        self.positions = {}
+        self.saved = {}
+        self.changes = {}
+
+    def load(self, db):
+        """Reads the class roster and its saved marks; returns self so it can run on a worker thread."""
+        rows = db.query('''SELECT s.student_id, s.name, s.roll_number, a.status_code
+                           FROM students s
+                           LEFT JOIN attendance_marks a ON a.student_id = s.student_id AND a.day = ?
+                           WHERE s.class = ?
+                           ORDER BY s.student_id''', (day_number(self.attendance_date), self.student_class))
+        self.students = [row[:3] for row in rows]
+        self.positions = {row[0]: index for index, row in enumerate(rows)}
+        self.saved = {row[0]: STATUSES[row[3]] for row in rows if row[3] is not None}
+        self.changes = {}
+        return self
+
+    @property
+    def dirty(self):
+        return bool(self.changes)
+
+    def row(self, index):
+        """The display row for the student at ``index``."""
+        student_id, name, roll_number = self.students[index]
+        if student_id in self.changes:
+            return (student_id, name, roll_number, self.changes[student_id], UNSAVED)
+        if student_id in self.saved:
+            return (student_id, name, roll_number, self.saved[student_id], SAVED)
+        return (student_id, name, roll_number, self.pending_label, UNMARKED)
+
+    def rows(self):
+        return [self.row(index) for index in range(len(self.students))]
+
+    def mark(self, indexes, status):
+        """Stages ``status`` for the students at ``indexes``; returns the indexes changed."""
+        if status not in STATUSES:
+            raise ValueError(f"Unknown attendance status: {status!r}")
+        changed = []
+        for index in indexes:
+            student_id = self.students[index][0]
+            if self.saved.get(student_id) == status:
+                # Marking back to the saved status cancels the change.
+                if self.changes.pop(student_id, None) is not None:
+                    changed.append(index)
+            elif self.changes.get(student_id) != status:
+                self.changes[student_id] = status
+                changed.append(index)
+        return changed
+
+    def mark_remaining(self, status):
+        """Stages ``status`` for every student with no saved or staged mark."""
+        return self.mark([index for index, (student_id, _, _) in enumerate(self.students)
+                          if student_id not in self.saved and student_id not in self.changes], status)
+
+    def pending(self):
+        """The staged marks as (student_id, date, status) records for ``mark_many``."""
+        return [(student_id, self.attendance_date, status) for student_id, status in self.changes.items()]
+
+    def committed(self, records):
+        """Moves ``records`` returned by ``pending()`` from staged to saved after a commit.
+
+        A student marked again while the commit was running stays staged.
+        Returns the indexes of the affected rows.
+        """
+        for student_id, _, status in records:
+            self.saved[student_id] = status
+            if self.changes.get(student_id) == status:
+                del self.changes[student_id]
+        return [self.positions[student_id] for student_id, _, _ in records]
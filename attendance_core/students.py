@@ -0,0 +1,41 @@
+"""The student repository: adding, removing and looking up students."""
+from .history import remove_student
+
+MAX_FIELD_LENGTH = 100
+
+STUDENT_COLUMNS = ("ID", "Name", "Roll Number", "Class")
+
+_SELECT = "SELECT student_id, name, roll_number, class FROM students"
+
+
+def _clean(name, roll_number, student_class):
+    fields = [str(value if value is not None else "").strip() for value in (name, roll_number, student_class)]
+    if not all(fields):
+        raise ValueError("Name, roll number and class are all required")
+    if max(len(value) for value in fields) > MAX_FIELD_LENGTH:
+        raise ValueError(f"Fields must be at most {MAX_FIELD_LENGTH} characters")
+    return fields
+
+
+def add_student(db, name, roll_number, student_class):
+    """Inserts a student and returns the new student_id.
+
+    Raises ValueError when a field is blank or too long.
+    """
+    cursor = db.execute("INSERT INTO students (name, roll_number, class) VALUES (?, ?, ?)",
+                        _clean(name, roll_number, student_class))
+    return cursor.lastrowid
+
+
+def delete_student(db, student_id, archive=False):
+    """Deletes a student and their attendance history; returns True if the student existed.
+
+    With ``archive`` the history is moved to ``attendance_archive`` instead
+    of being purged.  Either way it is removed in chunks; see history.remove_student.
+    """
+    return remove_student(db, student_id, archive=archive)[0]
+
+
+def get_student(db, student_id):
+    """Returns (student_id, name, roll_number, class), or None if there is no such student."""
+    return db.query_one(f"{_SELECT} WHERE student_id = ?", (student_id,))
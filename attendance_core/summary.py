@@ -0,0 +1,184 @@
+"""The ``daily_summary`` rollup: present/absent counts per day and class.
+
+Triggers on ``attendance_marks`` and ``students`` keep the rollup current inside
+the same transaction as every write, whichever code path made it, so
+dashboard queries read a few rows per day instead of the raw history.
+``rebuild_daily_summary`` recomputes it from scratch for backfills
+(``python -m attendance_core rebuild-summary``); the days of sealed
+academic years are left as they are.
+"""
+from .attendance import ABSENT, PRESENT, date_sql
+
+# Where the rollup reads marks from: the text-encoded ``attendance`` table
+# before schema version 8 and ``attendance_marks`` after it.  Expressions are
+# templates over the row alias ``{r}``.
+_TEXT_MARKS = {
+    'table': 'attendance',
+    'columns': 'student_id, date, status',
+    'day_column': 'date',
+    'day': '{r}.date',
+    'date': '{r}.date',
+    'present': "{r}.status = 'Present'",
+    'absent': "{r}.status = 'Absent'",
+}
+_COMPACT_MARKS = {
+    'table': 'attendance_marks',
+    'columns': 'student_id, day, status_code',
+    'day_column': 'day',
+    'day': '{r}.day',
+    'date': date_sql('{r}.day'),
+    'present': f'{{r}}.status_code = {PRESENT}',
+    'absent': f'{{r}}.status_code = {ABSENT}',
+}
+
+_BUMP = '''INSERT INTO daily_summary (date, class, present, absent)
+           SELECT {date}, s.class, {sign} ({present}), {sign} ({absent})
+           FROM students s WHERE s.student_id = {student}
+           ON CONFLICT (date, class) DO UPDATE
+           SET present = present + excluded.present, absent = absent + excluded.absent;'''
+
+_PRUNE = '''DELETE FROM daily_summary WHERE {scope} present = 0 AND absent = 0;'''
+
+# Moves every mark of one student between classes: {sign} is +1 to add, -1 to remove.
+_MOVE = '''INSERT INTO daily_summary (date, class, present, absent)
+           SELECT {date}, {klass}, {sign} SUM({present}), {sign} SUM({absent})
+           FROM {table} a WHERE a.student_id = {student}
+           GROUP BY {day}
+           ON CONFLICT (date, class) DO UPDATE
+           SET present = present + excluded.present, absent = absent + excluded.absent;'''
+
+
+def _on(marks, row):
+    return {name: value.format(r=row) for name, value in marks.items()}
+
+
+def _bump(marks, row, sign):
+    return _BUMP.format(student=f'{row}.student_id', sign=sign, **_on(marks, row))
+
+
+def _move(marks, klass, student, sign):
+    return _MOVE.format(klass=klass, student=student, sign=sign, **_on(marks, 'a'))
+
+
+def _prune(day=None):
+    return _PRUNE.format(scope=f"date = {day} AND" if day else "")
+
+
+def _triggers(marks):
+    table = marks['table']
+    return {
+        'trg_summary_attendance_insert': f'''
+            CREATE TRIGGER trg_summary_attendance_insert AFTER INSERT ON {table}
+            BEGIN
+                {_bump(marks, 'NEW', '+')}
+            END''',
+        'trg_summary_attendance_delete': f'''
+            CREATE TRIGGER trg_summary_attendance_delete AFTER DELETE ON {table}
+            BEGIN
+                {_bump(marks, 'OLD', '-')}
+                {_prune(_on(marks, 'OLD')['date'])}
+            END''',
+        'trg_summary_attendance_update': f'''
+            CREATE TRIGGER trg_summary_attendance_update
+            AFTER UPDATE OF {marks['columns']} ON {table}
+            BEGIN
+                {_bump(marks, 'OLD', '-')}
+                {_bump(marks, 'NEW', '+')}
+                {_prune(_on(marks, 'OLD')['date'])}
+            END''',
+        'trg_summary_student_class': f'''
+            CREATE TRIGGER trg_summary_student_class AFTER UPDATE OF class ON students
+            WHEN OLD.class IS NOT NEW.class
+            BEGIN
+                {_move(marks, 'OLD.class', 'OLD.student_id', '-')}
+                {_move(marks, 'NEW.class', 'NEW.student_id', '+')}
+                {_prune()}
+            END''',
+        # The report JOIN drops marks of deleted students, so the rollup does too,
+        # and picks them up again if a student row with the same id comes back.
+        'trg_summary_student_insert': f'''
+            CREATE TRIGGER trg_summary_student_insert AFTER INSERT ON students
+            BEGIN
+                {_move(marks, 'NEW.class', 'NEW.student_id', '+')}
+            END''',
+        'trg_summary_student_delete': f'''
+            CREATE TRIGGER trg_summary_student_delete BEFORE DELETE ON students
+            BEGIN
+                {_move(marks, 'OLD.class', 'OLD.student_id', '-')}
+                {_prune()}
+            END''',
+    }
+
+
+TRIGGERS = _triggers(_COMPACT_MARKS)
+
+
+def _marks(conn):
+    compact = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'attendance_marks'").fetchone()
+    return _COMPACT_MARKS if compact else _TEXT_MARKS
+
+
+def create_daily_summary(conn):
+    """Creates the rollup table and its triggers, then backfills it."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS daily_summary (
+                        date TEXT NOT NULL,
+                        class TEXT NOT NULL,
+                        present INTEGER NOT NULL DEFAULT 0,
+                        absent INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (date, class)) WITHOUT ROWID''')
+    for name, ddl in _triggers(_marks(conn)).items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(ddl)
+    _backfill(conn)
+
+
+def _sealed_through(conn):
+    # Days of academic years sealed into archive files keep the counts they
+    # had at rollover; see partitions.
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'attendance_partitions'").fetchone() is None:
+        return ""
+    return conn.execute("SELECT COALESCE(MAX(end_date), '') FROM attendance_partitions").fetchone()[0]
+
+
+def _backfill(conn):
+    sealed = _sealed_through(conn)
+    marks = _on(_marks(conn), 'a')
+    conn.execute("DELETE FROM daily_summary WHERE date > ?", (sealed,))
+    conn.execute(f'''INSERT INTO daily_summary (date, class, present, absent)
+                     SELECT {marks['date']}, s.class, SUM({marks['present']}), SUM({marks['absent']})
+                     FROM {marks['table']} a JOIN students s ON a.student_id = s.student_id
+                     WHERE {marks['date']} > ?
+                     GROUP BY {marks['day']}, s.class''', (sealed,))
+
+
+def rebuild_daily_summary(db):
+    """Recomputes the rollup from the raw attendance table; returns its row count."""
+    with db.transaction() as conn:
+        _backfill(conn)
+        return conn.execute("SELECT COUNT(*) FROM daily_summary").fetchone()[0]
+
+
+def summary_filters(start_date=None, end_date=None, student_class=None, alias="d"):
+    """Returns ``(where_sql, params)`` over the rollup table aliased as ``alias``."""
+    where = []
+    params = []
+    if start_date:
+        where.append(f"{alias}.date >= ?")
+        params.append(start_date)
+    if end_date:
+        where.append(f"{alias}.date <= ?")
+        params.append(end_date)
+    if student_class:
+        where.append(f"{alias}.class = ?")
+        params.append(student_class)
+    return (" WHERE " + " AND ".join(where) if where else ""), params
+
+
+def daily_summary(db, start_date=None, end_date=None, student_class=None):
+    """Rows of (date, class, present, absent, rate %) from the rollup, newest day first."""
+    where, params = summary_filters(start_date, end_date, student_class)
+    return db.query(f'''SELECT d.date, d.class, d.present, d.absent,
+                               ROUND(100.0 * d.present / (d.present + d.absent), 1)
+                        FROM daily_summary d{where}
+                        ORDER BY d.date DESC, d.class''', params)
+
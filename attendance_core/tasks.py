@@ -0,0 +1,211 @@
+"""Background execution of database work for the Tk front-ends.
+
+Reads run on a small thread pool and writes on a single dedicated writer
+thread, so writes never contend with each other for the SQLite lock.
+Results and progress updates are put on a queue that the UI thread drains
+with ``root.after`` polling; nothing here imports Tk.
+
+Submitting a task with the same ``key`` as a running one cancels the older
+task: its callbacks are dropped and any SQLite statement it is executing is
+interrupted at the next progress-handler check.
+
+While profiling is enabled each task's run time is recorded as
+``task <key>`` and the time its callback spends on the UI thread as
+``ui <key>``.
+"""
+import functools
+import queue
+import threading
+import time
+
+from .profiling import PROFILER
+
+_local = threading.local()
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task that was superseded or cancelled."""
+
+
+class Task:
+    """Handle for a submitted unit of work."""
+
+    def __init__(self, key=None):
+        self.key = key
+        self._cancelled = threading.Event()
+        self._outbox = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check(self):
+        """Raises TaskCancelled if the task has been cancelled."""
+        if self._cancelled.is_set():
+            raise TaskCancelled()
+
+    def progress(self, done, total=None):
+        """Reports progress to the task's ``on_progress`` callback on the UI thread."""
+        self.check()
+        if self._outbox is not None:
+            self._outbox(('progress', done, total))
+
+
+def current_task():
+    """Returns the Task running on this thread, or None outside the executor."""
+    return getattr(_local, 'task', None)
+
+
+def sqlite_progress_handler():
+    """Progress handler that aborts the running statement once its task is cancelled."""
+    task = current_task()
+    return 1 if task is not None and task.cancelled else 0
+
+
+def _name(task, fn):
+    return task.key or getattr(fn, '__qualname__', None) or repr(fn)
+
+
+class TaskExecutor:
+    """Runs callables off the UI thread and hands their results back to it."""
+
+    def __init__(self, workers=2):
+        # Imported here: concurrent.futures pulls in logging, which would more
+        # than double the import time of the core for the command line.
+        from concurrent.futures import ThreadPoolExecutor
+        self._readers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db-reader')
+        self._writes = queue.Queue()
+        self._results = queue.Queue()
+        self._active = {}
+        self._lock = threading.Lock()
+        # Cleared while a prepare() job runs; reads wait for it.
+        self._ready = threading.Event()
+        self._ready.set()
+        self._root = None
+        self._interval = 50
+        self._writer = threading.Thread(target=self._write_loop, name='db-writer', daemon=True)
+        self._writer.start()
+
+    def submit(self, fn, *args, key=None, write=False,
+               on_done=None, on_error=None, on_progress=None):
+        """Schedules ``fn(*args)`` and returns its Task.
+
+        ``on_done(result)``, ``on_error(exc)`` and ``on_progress(done, total)``
+        are called on the thread that drains the executor.
+        """
+        task = Task(key)
+        callbacks = (on_done, on_error, on_progress)
+        task._outbox = lambda message: self._results.put((task, callbacks, message))
+        if key is not None:
+            with self._lock:
+                previous = self._active.get(key)
+                self._active[key] = task
+            if previous is not None:
+                previous.cancel()
+        job = (task, fn, args)
+        if write:
+            self._writes.put(job)
+        else:
+            self._readers.submit(self._read, *job)
+        return task
+
+    def prepare(self, fn, *args, on_done=None, on_error=None):
+        """Runs ``fn(*args)`` on the writer thread ahead of everything submitted after it.
+
+        Reads wait until it has finished, so a front-end can show its window
+        while, say, the schema check runs, without any query seeing the old
+        schema.
+        """
+        self._ready.clear()
+
+        @functools.wraps(fn)
+        def run(*args):
+            try:
+                return fn(*args)
+            finally:
+                self._ready.set()
+
+        return self.submit(run, *args, write=True, on_done=on_done, on_error=on_error)
+
+    def cancel(self, key):
+        """Cancels the running task registered under ``key``, if any."""
+        with self._lock:
+            task = self._active.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def _run(self, task, fn, args):
+        if task.cancelled:
+            return
+        _local.task = task
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except BaseException as exc:
+            task._outbox(('error', exc))
+        else:
+            task._outbox(('done', result))
+        finally:
+            _local.task = None
+            if PROFILER.enabled:
+                PROFILER.record(f"task {_name(task, fn)}", time.perf_counter() - start)
+
+    def _read(self, task, fn, args):
+        self._ready.wait()
+        self._run(task, fn, args)
+
+    def _write_loop(self):
+        while True:
+            job = self._writes.get()
+            if job is None:
+                return
+            self._run(*job)
+
+    def drain(self):
+        """Delivers every pending result to its callbacks on the calling thread."""
+        while True:
+            try:
+                task, (on_done, on_error, on_progress), message = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if task.cancelled:
+                continue
+            kind = message[0]
+            if kind == 'progress':
+                if on_progress is not None:
+                    on_progress(message[1], message[2])
+                continue
+            if task.key is not None:
+                with self._lock:
+                    if self._active.get(task.key) is task:
+                        del self._active[task.key]
+            callback = on_done if kind == 'done' else on_error
+            if callback is None:
+                continue
+            if PROFILER.enabled:
+                with PROFILER.span(f"ui {_name(task, callback)}"):
+                    callback(message[1])
+            else:
+                callback(message[1])
+
+    def attach(self, root, interval=50):
+        """Starts draining results from ``root``'s event loop every ``interval`` ms."""
+        self._root = root
+        self._interval = interval
+        root.after(interval, self._poll)
+
+    def _poll(self):
+        self.drain()
+        if self._root is not None:
+            self._root.after(self._interval, self._poll)
+
+    def shutdown(self, wait=True):
+        """Stops the worker threads after queued work has finished."""
+        self._root = None
+        self._writes.put(None)
+        self._readers.shutdown(wait=wait)
+        if wait:
+            self._writer.join()
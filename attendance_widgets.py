@@ -0,0 +1,533 @@
+"""Tk widgets shared by both front-ends."""
+import tkinter as tk
+from datetime import date
+from tkinter import filedialog, messagebox, ttk
+
+from attendance_core.analytics import VIEWS
+from attendance_core.attendance import ABSENT, PRESENT, STATUSES
+from attendance_core.matrix import UNMARKED
+from attendance_core.profiling import PROFILER
+from attendance_core.reports import parse_date
+
+RECORDS_VIEW = "Attendance Records"
+
+
+class VirtualTreeview(ttk.Frame):
+    """A Treeview that only keeps the visible rows as Tk items.
+
+    Rows come from an ``attendance_core.paging.PagedRows`` source and are
+    fetched a page at a time as the user scrolls.  Row positions (not Tk item
+    ids) are used for selection, so a selection survives scrolling.  While
+    profiling is on, reading the visible rows and drawing them are timed
+    separately under ``name``.
+    """
+
+    def __init__(self, parent, columns, widths, height=15, name="table"):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self.height = height
+        self._fetch_operation = f"table {name}: fetch rows"
+        self._draw_operation = f"table {name}: draw"
+        self._rows = None
+        self._top = 0
+        self._items = []
+        self._selected = set()
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", height=height)
+        for col, width in zip(self.columns, widths):
+            self.tree.column(col, width=int(width), anchor="center")
+            self.tree.heading(col, text=col, anchor="center")
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<Up>", lambda event: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda event: self._on_arrow(1))
+        self.tree.bind("<Prior>", lambda event: self.scroll(-self.height) or "break")
+        self.tree.bind("<Next>", lambda event: self.scroll(self.height) or "break")
+        self.tree.bind("<Home>", lambda event: self.scroll_to(0) or "break")
+        self.tree.bind("<End>", lambda event: self._scroll_to_end() or "break")
+
+    # Data source
+
+    def set_rows(self, rows):
+        """Shows a new PagedRows source from the first row."""
+        self._rows = rows
+        self._top = 0
+        self._selected.clear()
+        self._render()
+
+    def clear(self):
+        """Removes every row."""
+        self.set_rows(None)
+
+    def refresh(self):
+        """Refetches the visible window from the database, keeping the scroll position."""
+        if self._rows is not None:
+            self._rows.reset()
+        self._render()
+
+    def set_columns(self, columns, widths=None):
+        """Switches to a different set of columns, clearing the rows.
+
+        Without ``widths`` the current total width is split evenly.
+        """
+        columns = list(columns)
+        if columns == self.columns:
+            return
+        if widths is None:
+            total = sum(int(self.tree.column(col, "width")) for col in self.columns)
+            widths = [total // len(columns)] * len(columns)
+        self.clear()
+        self.columns = columns
+        self.tree.configure(columns=columns)
+        for col, width in zip(columns, widths):
+            self.tree.column(col, width=int(width), anchor="center")
+            self.tree.heading(col, text=col, anchor="center")
+
+    @property
+    def known_rows(self):
+        return self._rows.known_rows if self._rows is not None else 0
+
+    # Row access by position
+
+    def selection(self):
+        """Returns the selected row positions in ascending order."""
+        return sorted(self._selected)
+
+    def row(self, index):
+        """Returns the values of the row at ``index``."""
+        return self._rows.row(index)
+
+    def set_row(self, index, values):
+        """Replaces a row's values on screen and in the page cache."""
+        self._rows.set_row(index, values)
+        offset = index - self._top
+        if 0 <= offset < len(self._items):
+            self.tree.item(self._items[offset], values=values)
+
+    # Scrolling
+
+    def scroll(self, delta):
+        self.scroll_to(self._top + delta)
+
+    def scroll_to(self, index):
+        if self._rows is None:
+            return
+        # Fetch ahead so that scrolling past the loaded rows pulls in the next page.
+        known = self._rows.ensure(index + self.height)
+        self._top = max(0, min(index, known - self.height))
+        self._render()
+
+    def _scroll_to_end(self):
+        if self._rows is not None:
+            self.scroll_to(self._rows.ensure(self.known_rows + self._rows.page_size))
+
+    def _on_scrollbar(self, *args):
+        if self._rows is None:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * self._scroll_extent()))
+        elif args[0] == "scroll":
+            step = self.height if args[2] == "pages" else 1
+            self.scroll(int(args[1]) * step)
+
+    def _on_mousewheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_arrow(self, direction):
+        focus = self.tree.focus()
+        if focus not in self._items:
+            return None
+        offset = self._items.index(focus)
+        if 0 <= offset + direction < len(self._items):
+            return None
+        # Moving past the edge of the window: scroll and keep the cursor on the edge row.
+        self.scroll(direction)
+        index = min(self._top + offset, self._top + len(self._items) - 1)
+        self._selected = {index}
+        self._render()
+        if self._items:
+            self.tree.focus(self._items[index - self._top])
+        return "break"
+
+    def _scroll_extent(self):
+        if self._rows is None:
+            return 0
+        if self._rows.exhausted:
+            return self._rows.known_rows
+        # Leave room below the loaded rows so the thumb never claims to be at the end.
+        return self._rows.known_rows + self._rows.page_size
+
+    # Rendering
+
+    def _render(self):
+        with PROFILER.span(self._fetch_operation) as span:
+            rows = self._rows.rows(self._top, self.height) if self._rows is not None else []
+            span.rows = len(rows)
+
+        with PROFILER.span(self._draw_operation) as span:
+            while len(self._items) > len(rows):
+                self.tree.delete(self._items.pop())
+            while len(self._items) < len(rows):
+                self._items.append(self.tree.insert("", "end"))
+
+            for item, values in zip(self._items, rows):
+                self.tree.item(item, values=values)
+
+            visible = [item for offset, item in enumerate(self._items)
+                       if self._top + offset in self._selected]
+            self.tree.selection_set(visible)
+            span.rows = len(rows)
+
+        extent = self._scroll_extent()
+        if extent:
+            self.scrollbar.set(self._top / extent, min(1.0, (self._top + len(rows)) / extent))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_select(self, event):
+        selected = set(self.tree.selection())
+        for offset, item in enumerate(self._items):
+            if item in selected:
+                self._selected.add(self._top + offset)
+            else:
+                self._selected.discard(self._top + offset)
+
+
+class MatrixCanvas(ttk.Frame):
+    """An ``attendance_core.matrix.AttendanceMatrix`` drawn as a student × day grid on a Canvas.
+
+    Only the rows in view have canvas items: a fixed pool of one rectangle
+    per visible cell and one name per visible row, which scrolling
+    recolours and relabels instead of recreating.  ``apply_marks`` repaints
+    just the cells that a write changed.  While profiling is on, drawing is
+    timed under ``name``.
+    """
+
+    CELL = 22
+    NAME_WIDTH = 200
+    COLORS = {PRESENT: "#81C784", ABSENT: "#E57373", UNMARKED: "#FFFFFF"}
+
+    def __init__(self, parent, height=15, name="grid"):
+        super().__init__(parent)
+        self.height = height
+        self.matrix = None
+        self._draw_operation = f"grid {name}: draw"
+        self._top = 0
+        self._columns = 0
+        self._names = []
+        self._cells = []
+
+        self.canvas = tk.Canvas(self, width=self.NAME_WIDTH + 31 * self.CELL, height=(height + 1) * self.CELL,
+                                background="white", highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.canvas.bind("<MouseWheel>", lambda event: self.scroll(-3 if event.delta > 0 else 3))
+        self.canvas.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.canvas.bind("<Button-5>", lambda event: self.scroll(3))
+
+    def set_matrix(self, matrix):
+        """Shows a new matrix from its first student."""
+        self.matrix = matrix
+        self._top = 0
+        with PROFILER.span(self._draw_operation) as span:
+            self._build()
+            self._paint()
+            span.rows = len(self._names)
+
+    def apply_marks(self, records):
+        """Records (student_id, date, status) marks that were just saved and repaints the cells they changed."""
+        if self.matrix is None:
+            return
+        for row, column in self.matrix.apply(records):
+            offset = row - self._top
+            if 0 <= offset < len(self._cells):
+                self.canvas.itemconfigure(self._cells[offset][column],
+                                          fill=self.COLORS[self.matrix.code(row, column)])
+
+    def scroll(self, delta):
+        if self.matrix is None:
+            return
+        top = max(0, min(self._top + delta, len(self.matrix.students) - len(self._names)))
+        if top != self._top:
+            self._top = top
+            with PROFILER.span(self._draw_operation) as span:
+                self._paint()
+                span.rows = len(self._names)
+
+    def _on_scrollbar(self, *args):
+        if self.matrix is None:
+            return
+        if args[0] == "moveto":
+            self.scroll(int(float(args[1]) * len(self.matrix.students)) - self._top)
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]) * (self.height if args[2] == "pages" else 1))
+
+    def _build(self):
+        # The header and the item pool depend only on the month and the number of visible rows.
+        self.canvas.delete("all")
+        matrix = self.matrix
+        rows = min(self.height, len(matrix.students)) if matrix is not None else 0
+        self._columns = matrix.days if matrix is not None else 0
+        size = self.CELL
+        for column in range(self._columns):
+            x = self.NAME_WIDTH + column * size
+            weekend = date.fromisoformat(matrix.date(column)).weekday() >= 5
+            self.canvas.create_rectangle(x, 0, x + size, size, fill="#EEEEEE" if weekend else "#D4F6FF",
+                                         outline="#CCCCCC")
+            self.canvas.create_text(x + size // 2, size // 2, text=str(column + 1), font=('Arial', 8))
+        self._names = []
+        self._cells = []
+        for offset in range(rows):
+            y = (offset + 1) * size
+            self._names.append(self.canvas.create_text(4, y + size // 2, anchor="w", font=('Arial', 9)))
+            self._cells.append([self.canvas.create_rectangle(self.NAME_WIDTH + column * size, y,
+                                                             self.NAME_WIDTH + (column + 1) * size, y + size,
+                                                             outline="#DDDDDD")
+                                for column in range(self._columns)])
+
+    def _paint(self):
+        matrix = self.matrix
+        for offset, (name_item, cells) in enumerate(zip(self._names, self._cells)):
+            row = self._top + offset
+            _, name, roll_number = matrix.students[row]
+            self.canvas.itemconfigure(name_item, text=f"{roll_number}  {name}")
+            for column, item in enumerate(cells):
+                self.canvas.itemconfigure(item, fill=self.COLORS[matrix.code(row, column)])
+        total = len(matrix.students) if matrix is not None else 0
+        if total:
+            self.scrollbar.set(self._top / total, (self._top + len(self._names)) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+
+class ReportFilterBar(ttk.Frame):
+    """Date range, class, roll number and status filters plus the view picker for the report tab."""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        labels = ['From (YYYY-MM-DD):', 'To (YYYY-MM-DD):', 'Class:', 'Roll Number:']
+        self.entries = []
+
+        for i, label in enumerate(labels):
+            row, column = divmod(i, 2)
+            ttk.Label(self, text=label).grid(row=row, column=column * 2, padx=5, pady=5, sticky="e")
+            entry = ttk.Entry(self, width=15)
+            entry.grid(row=row, column=column * 2 + 1, padx=5, pady=5)
+            self.entries.append(entry)
+
+        self.from_entry, self.to_entry, self.class_entry, self.roll_number_entry = self.entries
+
+        ttk.Label(self, text="Status:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+        self.status_box = ttk.Combobox(self, values=("All",) + STATUSES, state="readonly", width=13)
+        self.status_box.current(0)
+        self.status_box.grid(row=2, column=1, padx=5, pady=5)
+
+        ttk.Label(self, text="View:").grid(row=2, column=2, padx=5, pady=5, sticky="e")
+        self.view_box = ttk.Combobox(self, values=(RECORDS_VIEW,) + tuple(VIEWS), state="readonly", width=18)
+        self.view_box.current(0)
+        self.view_box.grid(row=2, column=3, padx=5, pady=5)
+
+    def view(self):
+        """Returns the selected view: RECORDS_VIEW or a key of ``analytics.VIEWS``."""
+        return self.view_box.get()
+
+    def values(self):
+        """Returns the filters as keyword arguments for the report queries.
+
+        Raises ValueError when a date is not in YYYY-MM-DD format.
+        """
+        status = self.status_box.get()
+        return {
+            "start_date": parse_date(self.from_entry.get()),
+            "end_date": parse_date(self.to_entry.get()),
+            "student_class": self.class_entry.get().strip() or None,
+            "roll_number": self.roll_number_entry.get().strip() or None,
+            "status": None if status == "All" else status,
+        }
+
+
+class SessionBar(ttk.Frame):
+    """Class and date pickers for an attendance session.
+
+    ``classes`` is called whenever the class list is opened and returns the
+    class names to offer; a class can also be typed in.
+    """
+
+    def __init__(self, parent, classes=lambda: []):
+        super().__init__(parent)
+        self.classes = classes
+
+        ttk.Label(self, text="Class:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+        self.class_box = ttk.Combobox(self, width=18, postcommand=self._fill_classes)
+        self.class_box.grid(row=0, column=1, padx=5, pady=5)
+
+        ttk.Label(self, text="Date (YYYY-MM-DD):").grid(row=0, column=2, padx=5, pady=5, sticky="e")
+        self.date_entry = ttk.Entry(self, width=15)
+        self.date_entry.insert(0, date.today().isoformat())
+        self.date_entry.grid(row=0, column=3, padx=5, pady=5)
+
+    def _fill_classes(self):
+        self.class_box.configure(values=tuple(self.classes()))
+
+    def values(self):
+        """Returns ``(student_class, attendance_date)``.
+
+        Raises ValueError when the class is blank or the date is not in YYYY-MM-DD format.
+        """
+        student_class = self.class_box.get().strip()
+        if not student_class:
+            raise ValueError("Please choose a class.")
+        try:
+            attendance_date = parse_date(self.date_entry.get())
+        except ValueError:
+            raise ValueError("Dates must be in YYYY-MM-DD format.") from None
+        if attendance_date is None:
+            raise ValueError("Please enter a date.")
+        return student_class, attendance_date
+
+
+class SearchBox(ttk.Frame):
+    """A search entry that calls ``on_search(text)`` once typing pauses for ``delay`` ms.
+
+    Each keystroke restarts the timer, so a query is only sent for what the
+    user settled on rather than for every intermediate prefix.
+    """
+
+    def __init__(self, parent, on_search, label="Search:", delay=200, width=30):
+        super().__init__(parent)
+        self.on_search = on_search
+        self.delay = delay
+        self._pending = None
+        self._last = None
+
+        ttk.Label(self, text=label).grid(row=0, column=0, padx=5, pady=5, sticky="e")
+        self.entry = ttk.Entry(self, width=width)
+        self.entry.grid(row=0, column=1, padx=5, pady=5)
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<Return>", lambda event: self._fire())
+        self.entry.bind("<Escape>", lambda event: self.clear())
+
+    def get(self):
+        return self.entry.get().strip()
+
+    def clear(self):
+        """Empties the entry and reports the empty search straight away."""
+        self.entry.delete(0, tk.END)
+        self._fire()
+
+    def _on_key(self, event):
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(self.delay, self._fire)
+
+    def _fire(self):
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+            self._pending = None
+        text = self.get()
+        if text != self._last:
+            self._last = text
+            self.on_search(text)
+
+
+class DiagnosticsPanel(ttk.Frame):
+    """Profiling controls, per-operation latency table and slow statements with their plans.
+
+    Shows ``attendance_core.profiling.PROFILER``; ``stats`` is a
+    ``QueryStats`` whose connection and statement totals head the panel,
+    followed by the hit rate of ``results``, a ``ResultCache``.
+    """
+
+    COLUMNS = {"Operation": 380, "Count": 60, "Total ms": 80, "Mean ms": 70, "p50 ms": 70,
+               "p95 ms": 70, "Max ms": 70, "Rows": 70}
+
+    def __init__(self, parent, stats=None, results=None):
+        super().__init__(parent)
+        self.stats = stats
+        self.results = results
+        self.enabled = tk.BooleanVar(value=PROFILER.enabled)
+
+        bar = ttk.Frame(self)
+        bar.pack(fill=tk.X, pady=5)
+        ttk.Checkbutton(bar, text="Profiling enabled", variable=self.enabled,
+                        command=self._toggle).pack(side=tk.LEFT, padx=5)
+        ttk.Button(bar, text="Refresh", command=self.refresh).pack(side=tk.LEFT, padx=5)
+        ttk.Button(bar, text="Reset", command=self.reset).pack(side=tk.LEFT, padx=5)
+        ttk.Button(bar, text="Save JSON", command=self.save).pack(side=tk.LEFT, padx=5)
+        self.summary = ttk.Label(bar, text="")
+        self.summary.pack(side=tk.LEFT, padx=10)
+
+        self.tree = ttk.Treeview(self, columns=list(self.COLUMNS), show="headings", height=12)
+        for col, width in self.COLUMNS.items():
+            self.tree.column(col, width=width, anchor="w" if col == "Operation" else "e")
+            self.tree.heading(col, text=col)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=5)
+
+        ttk.Label(self, text="Slow statements and their query plans:").pack(anchor="w", padx=5, pady=(10, 0))
+        self.slow_text = tk.Text(self, height=12, wrap="word", font=('Courier', 9))
+        self.slow_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.refresh()
+
+    def _toggle(self):
+        if self.enabled.get():
+            PROFILER.enable()
+        else:
+            PROFILER.disable()
+        self.refresh()
+
+    def reset(self):
+        PROFILER.reset()
+        if self.stats is not None:
+            self.stats.reset()
+        if self.results is not None:
+            self.results.clear()
+        self.refresh()
+
+    def refresh(self):
+        """Redraws the panel from a fresh snapshot."""
+        snapshot = PROFILER.snapshot()
+        self.enabled.set(snapshot['enabled'])
+        self.tree.delete(*self.tree.get_children())
+        for name, op in snapshot['operations'].items():
+            self.tree.insert("", "end", values=(
+                name, op['count'], f"{op['total'] * 1000:.1f}", f"{op['mean'] * 1000:.2f}",
+                f"{op['p50'] * 1000:.2f}", f"{op['p95'] * 1000:.2f}", f"{op['max'] * 1000:.2f}", op['rows']))
+
+        self.slow_text.delete("1.0", tk.END)
+        for entry in snapshot['slow_queries']:
+            self.slow_text.insert(tk.END, f"{entry['max'] * 1000:.1f} ms max, {entry['count']}x\n{entry['sql']}\n")
+            for line in entry['plan']:
+                self.slow_text.insert(tk.END, f"    {line}\n")
+            self.slow_text.insert(tk.END, "\n")
+
+        summary = []
+        if self.stats is not None:
+            totals = self.stats.snapshot()
+            summary.append(f"{totals['connects']} connections, {totals['queries']} statements, "
+                           f"{totals['total_time'] * 1000:.0f} ms in statements")
+        if self.results is not None:
+            cache = self.results.snapshot()
+            summary.append(f"result cache {cache['hits']} hits / {cache['misses']} misses, "
+                           f"{cache['entries']} entries, {cache['bytes'] / 1e6:.1f} MB")
+        self.summary.configure(text="; ".join(summary))
+
+    def save(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")],
+                                            initialfile="attendance-profile.json")
+        if not path:
+            return
+        try:
+            PROFILER.dump(path)
+        except OSError as exc:
+            messagebox.showerror("Save Failed", str(exc))
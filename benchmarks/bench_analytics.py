@@ -0,0 +1,68 @@
+"""Timings for the analytics views on 5,000 students over 200 school days.
+
+For reference, per-student rates are also computed the old way: fetch
+every report row into Python and count in a loop.
+
+    python benchmarks/bench_analytics.py --students 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database, migrate  # noqa: E402
+from attendance_core import analytics  # noqa: E402
+from bench_indexes import DAYS, build  # noqa: E402
+
+
+def python_rates(db):
+    counts = {}
+    for student_id, status in db.query("SELECT student_id, status FROM attendance"):
+        present, days = counts.get(student_id, (0, 0))
+        counts[student_id] = (present + (status == 'Present'), days + 1)
+    return {student_id: 100.0 * present / days for student_id, (present, days) in counts.items()}
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, len(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'bench.db'))
+        try:
+            rows = build(db, args.students * DAYS, duplicate_every=args.students * DAYS + 1)
+            migrate(db)
+            print(f"{args.students} students x {DAYS} days = {rows} attendance rows\n")
+
+            cases = [
+                ("student rates", analytics.student_rates, {}),
+                ("class rates (rollup)", analytics.class_rates, {}),
+                ("daily summary (rollup)", analytics.daily_totals, {}),
+                ("daily summary, one month", analytics.daily_totals,
+                 {'start_date': '2024-03-01', 'end_date': '2024-03-31'}),
+                ("chronic absentees", analytics.chronic_absentees, {}),
+                ("absence streaks", analytics.streaks, {}),
+                ("student rates, one month", analytics.student_rates,
+                 {'start_date': '2024-03-01', 'end_date': '2024-03-31'}),
+                ("student rates, one class", analytics.student_rates, {'student_class': 'Class 7'}),
+                ("python loop rates (old way)", python_rates, {}),
+            ]
+            for label, fn, filters in cases:
+                elapsed, count = timed(fn, db, **filters)
+                print(f"{label:<30} {elapsed * 1000:9.1f} ms  {count:>6} rows")
+        finally:
+            db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Compares per-row attendance marking with the batched mark_many path.
+
+The per-row path reproduces what the front-ends used to do: open a
+connection, insert one row, commit and close, once per student.
+
+    python benchmarks/bench_bulk_mark.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database, mark_many, migrate  # noqa: E402
+
+
+def make_records(count):
+    return [(i + 1, '2024-11-04', 'Present' if i % 7 else 'Absent') for i in range(count)]
+
+
+def run_per_row(path, records):
+    start = time.perf_counter()
+    for student_id, day, status in records:
+        conn = sqlite3.connect(path)
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO attendance (student_id, date, status) VALUES (?, ?, ?)",
+                       (student_id, day, status))
+        conn.commit()
+        conn.close()
+    return time.perf_counter() - start
+
+
+def run_bulk(path, records):
+    db = Database(path)
+    try:
+        start = time.perf_counter()
+        mark_many(db, records)
+        return time.perf_counter() - start
+    finally:
+        db.close()
+
+
+def fresh_db(directory, name, students):
+    # Attendance rows reference students, so enrol them first.
+    path = os.path.join(directory, name)
+    db = Database(path)
+    migrate(db)
+    db.executemany("INSERT INTO students (student_id, name, roll_number, class) VALUES (?, ?, ?, ?)",
+                   ((i + 1, f"Student {i + 1}", str(i + 1), "Class 1") for i in range(students)))
+    db.close()
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--per-row-limit', type=int, default=None,
+                        help="skip the per-row path above this many rows")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>8} {'per-row s':>11} {'bulk s':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            records = make_records(size)
+            bulk = run_bulk(fresh_db(directory, f'bulk_{size}.db', size), records)
+            if args.per_row_limit is not None and size > args.per_row_limit:
+                print(f"{size:>8} {'skipped':>11} {bulk:>9.3f} {'-':>8}")
+                continue
+            per_row = run_per_row(fresh_db(directory, f'per_row_{size}.db', size), records)
+            print(f"{size:>8} {per_row:>11.3f} {bulk:>9.3f} {per_row / bulk:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Attendance storage and scan times before and after the compact encoding.
+
+Generates a seeded database at schema version 7 (ISO date and status
+strings), measures the size of the attendance table and its indexes and
+times a few queries, then applies migration 8, vacuums and measures the
+same again.  After the migration each query is timed both in its compact
+form and in its old text form through the ``attendance`` view.  Exits
+non-zero if any of them answers differently.
+
+    python benchmarks/bench_compact.py --students 50000 --days 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database, migrate  # noqa: E402
+from attendance_core.attendance import ABSENT, PRESENT, date_sql, day_number, status_sql  # noqa: E402
+
+from generate import generate, school_days  # noqa: E402
+
+TEXT_VERSION = 7
+
+
+def storage(db):
+    """Bytes used by each attendance table and index, from the dbstat virtual table."""
+    return dict(db.query('''SELECT name, SUM(pgsize) FROM dbstat
+                            WHERE name LIKE '%attendance%' AND name NOT LIKE '%archive%'
+                              AND name NOT LIKE '%partitions%'
+                            GROUP BY name ORDER BY name'''))
+
+
+def vacuum(db):
+    with db.connection() as conn:
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def queries(days):
+    """(label, (text sql, params), (compact sql, params)) for each timed query."""
+    month = (days[-21], days[-1])
+    return [
+        ("absences on one day",
+         ("SELECT COUNT(*) FROM attendance WHERE date = ? AND status = 'Absent'", (days[-1],)),
+         (f"SELECT COUNT(*) FROM attendance_marks WHERE day = ? AND status_code = {ABSENT}",
+          (day_number(days[-1]),))),
+        ("absences, full scan",
+         ("SELECT COUNT(*) FROM attendance WHERE status = 'Absent'", ()),
+         (f"SELECT COUNT(*) FROM attendance_marks WHERE status_code = {ABSENT}", ())),
+        ("student rates, all history",
+         ("SELECT student_id, SUM(status = 'Present'), COUNT(*) FROM attendance GROUP BY student_id", ()),
+         (f'''SELECT student_id, SUM(status_code = {PRESENT}), COUNT(*)
+              FROM attendance_marks GROUP BY student_id''', ())),
+        ("class report for a month",
+         ('''SELECT s.name, s.roll_number, a.date, a.status
+             FROM attendance a JOIN students s ON a.student_id = s.student_id
+             WHERE a.date BETWEEN ? AND ? AND s.class = 'Class 1'
+             ORDER BY a.date DESC, a.attendance_id DESC''', month),
+         (f'''SELECT s.name, s.roll_number, {date_sql('a.day')}, {status_sql('a.status_code')}
+              FROM attendance_marks a JOIN students s ON a.student_id = s.student_id
+              WHERE a.day BETWEEN ? AND ? AND s.class = 'Class 1'
+              ORDER BY a.day DESC, a.attendance_id DESC''', tuple(map(day_number, month)))),
+    ]
+
+
+def time_queries(db, timed, form, repeat):
+    results = []
+    for _, text, compact in timed:
+        sql, params = text if form == 'text' else compact
+        answer = db.query(sql, params)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            db.query(sql, params)
+        results.append(((time.perf_counter() - start) / repeat, answer))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=50000)
+    parser.add_argument('--days', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    timed = queries(school_days('2024-01-01', args.days))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'attendance.db')
+        db = Database(path)
+        try:
+            start = time.perf_counter()
+            rows = generate(db, args.students, days=args.days, seed=args.seed, schema_version=TEXT_VERSION)
+            print(f"generated {rows} rows at schema version {TEXT_VERSION} in {time.perf_counter() - start:.0f}s")
+            vacuum(db)
+            sizes = [(os.path.getsize(path), storage(db))]
+            before = time_queries(db, timed, 'text', args.repeat)
+
+            start = time.perf_counter()
+            migrate(db)
+            migrated = time.perf_counter() - start
+            vacuum(db)
+            print(f"migration 8 took {migrated:.0f}s\n")
+            sizes.append((os.path.getsize(path), storage(db)))
+            after = time_queries(db, timed, 'compact', args.repeat)
+            view = time_queries(db, timed, 'text', args.repeat)
+        finally:
+            db.close()
+
+    for (file_size, tables), label in zip(sizes, ("text", "compact")):
+        print(f"{label}: file {file_size / 1e6:.0f} MB, {rows and file_size / rows:.1f} bytes per mark")
+        for name, size in tables.items():
+            print(f"    {name:<36} {size / 1e6:>8.1f} MB")
+    print(f"\n{'query':<30} {'text':>10} {'compact':>10} {'via view':>10}")
+    failed = False
+    for (label, _, _), (old, answer), (new, compact), (viewed, through_view) in zip(timed, before, after, view):
+        same = answer == compact == through_view
+        failed = failed or not same
+        print(f"{label:<30} {old * 1000:>7.1f} ms {new * 1000:>7.1f} ms {viewed * 1000:>7.1f} ms"
+              f"{'' if same else '  DIFFERENT'}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Export throughput, file size and peak memory for each export format.
+
+Peak memory is the largest amount Python had allocated during a second,
+traced run of the export; it should not grow with the number of rows.  The
+columnar file is read back and compared with the report.
+
+    python benchmarks/bench_export.py --students 5000 --days 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database, migrate  # noqa: E402
+from attendance_core.attendance import ABSENT, PRESENT, day_number  # noqa: E402
+from attendance_core.columnar import read_columnar  # noqa: E402
+from attendance_core.export import FORMATS, export_file  # noqa: E402
+from attendance_core.reports import stream_report  # noqa: E402
+
+EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "columnar": ".atcol"}
+
+
+def build(db, students, days):
+    with db.transaction() as conn:
+        conn.execute('''WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+                        INSERT INTO students (student_id, name, roll_number, class)
+                        SELECT i, 'Student ' || i, 'R' || i, 'Class ' || (i % 40) FROM n''', (students,))
+        conn.execute(f'''WITH RECURSIVE d(k) AS (SELECT 0 UNION ALL SELECT k + 1 FROM d WHERE k < ?)
+                         INSERT INTO attendance_marks (student_id, day, status_code)
+                         SELECT s.student_id, ? + d.k,
+                                CASE WHEN (s.student_id * 7 + d.k) % 10 = 0 THEN {ABSENT} ELSE {PRESENT} END
+                         FROM d CROSS JOIN students s''', (days - 1, day_number('2024-01-01')))
+    return db.query_one("SELECT COUNT(*) FROM attendance_marks")[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'bench.db'))
+        try:
+            migrate(db)
+            print(f"{build(db, args.students, args.days)} attendance rows\n")
+            print(f"{'format':<10} {'seconds':>8} {'rows/s':>10} {'MB':>8} {'peak MB':>8}")
+            for name in FORMATS:
+                path = os.path.join(directory, 'export' + EXTENSIONS[name])
+                start = time.perf_counter()
+                count = export_file(db, path)
+                elapsed = time.perf_counter() - start
+                # Tracing slows Python down, so memory is measured on a second run.
+                tracemalloc.start()
+                export_file(db, path)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{name:<10} {elapsed:>8.2f} {count / elapsed:>10.0f} "
+                      f"{os.path.getsize(path) / 1e6:>8.1f} {peak / 1e6:>8.1f}")
+
+            start = time.perf_counter()
+            rows = sum(1 for _ in read_columnar(os.path.join(directory, 'export.atcol')))
+            print(f"\nread {rows} columnar rows in {time.perf_counter() - start:.2f}s")
+            same = all(a == b for a, b in zip(read_columnar(os.path.join(directory, 'export.atcol')),
+                                              stream_report(db)))
+            print("columnar round trip matches the report" if same and rows == count
+                  else "FAIL: columnar round trip differs from the report")
+        finally:
+            db.close()
+    return 0 if same and rows == count else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
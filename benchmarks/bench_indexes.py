@@ -0,0 +1,104 @@
+"""Query plans and timings before and after the attendance index migration.
+
+Builds a synthetic database at schema version 1 (no indexes, with some
+duplicate marks), times the hot lookups, applies the remaining migrations
+and times them again.  Exits non-zero if a lookup still scans the table.
+
+    python benchmarks/bench_indexes.py --rows 10000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database, migrate  # noqa: E402
+
+DAYS = 200
+# The lookups read the text-encoded attendance table, which version 8 replaces.
+INDEXED_VERSION = 7
+
+LOOKUPS = [
+    ("per-date roster", "SELECT student_id, status FROM attendance WHERE date = ?", ('2024-03-01',)),
+    ("student on a day", "SELECT status FROM attendance WHERE student_id = ? AND date = ?", (1234, '2024-03-01')),
+    ("student history", "SELECT date, status FROM attendance WHERE student_id = ?", (1234,)),
+    ("report for a day", '''SELECT s.name, s.roll_number, a.date, a.status
+                            FROM attendance a
+                            JOIN students s ON a.student_id = s.student_id
+                            WHERE a.date = ?''', ('2024-03-01',)),
+]
+
+
+def build(db, rows, duplicate_every):
+    students = max(1, rows // DAYS)
+    migrate(db, target_version=1)
+    with db.transaction() as conn:
+        conn.execute('''WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+                        INSERT INTO students (student_id, name, roll_number, class)
+                        SELECT i, 'Student ' || i, 'R' || i, 'Class ' || (i % 40) FROM n''', (students,))
+        conn.execute('''WITH RECURSIVE d(k) AS (SELECT 0 UNION ALL SELECT k + 1 FROM d WHERE k < ?)
+                        INSERT INTO attendance (student_id, date, status)
+                        SELECT s.student_id, date('2024-01-01', '+' || d.k || ' days'),
+                               CASE WHEN (s.student_id * 7 + d.k) % 10 = 0 THEN 'Absent' ELSE 'Present' END
+                        FROM d CROSS JOIN students s''', (DAYS - 1,))
+        conn.execute('''INSERT INTO attendance (student_id, date, status)
+                        SELECT student_id, date, 'Absent' FROM attendance
+                        WHERE attendance_id % ? = 0''', (duplicate_every,))
+    return db.query_one("SELECT COUNT(*) FROM attendance")[0]
+
+
+def time_lookups(db, repeat):
+    results = {}
+    for label, sql, params in LOOKUPS:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            db.query(sql, params)
+        results[label] = ((time.perf_counter() - start) / repeat, db.explain(sql, params))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--duplicate-every', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'bench.db'))
+        try:
+            start = time.perf_counter()
+            total = build(db, args.rows, args.duplicate_every)
+            print(f"built {total} attendance rows in {time.perf_counter() - start:.1f}s")
+
+            before = time_lookups(db, args.repeat)
+
+            start = time.perf_counter()
+            migrate(db, target_version=INDEXED_VERSION)
+            remaining = db.query_one("SELECT COUNT(*) FROM attendance")[0]
+            print(f"migrated in {time.perf_counter() - start:.1f}s, "
+                  f"removed {total - remaining} duplicate marks")
+
+            after = time_lookups(db, args.repeat)
+        finally:
+            db.close()
+
+    failed = False
+    for label, _, _ in LOOKUPS:
+        old_time, _ = before[label]
+        new_time, plan = after[label]
+        print(f"\n{label}: {old_time * 1000:.2f} ms -> {new_time * 1000:.2f} ms")
+        for line in plan:
+            print(f"    {line}")
+        if any(line.startswith('SCAN a') or line == 'SCAN attendance' for line in plan):
+            failed = True
+    if failed:
+        print("\nFAIL: a lookup still scans the attendance table")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Loading and drawing a class's month as the monthly attendance grid.
+
+Generates one large class over a few months of school days and times
+``load_matrix`` for a 31-day month, then checks every cell against a plain
+per-mark query.  With a display available it also times ``MatrixCanvas``
+drawing the month, scrolling a screen and repainting after a few saved
+marks; without one the drawing is skipped.  Exits non-zero if any cell
+differs.
+
+    python benchmarks/bench_matrix.py --students 500 --month 2024-01
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database  # noqa: E402
+from attendance_core.attendance import STATUSES, day_number, day_text  # noqa: E402
+from attendance_core.matrix import UNMARKED, load_matrix, month_bounds  # noqa: E402
+
+from generate import generate  # noqa: E402
+
+
+def timed(run, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = run()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def expected_cells(db, student_class, month):
+    """{(student_id, date): status} read mark by mark."""
+    first, last = month_bounds(month)
+    rows = db.query('''SELECT a.student_id, a.day, a.status_code
+                       FROM attendance_marks a JOIN students s ON s.student_id = a.student_id
+                       WHERE s.class = ? AND a.day BETWEEN ? AND ?''',
+                    (student_class, day_number(first), day_number(last)))
+    return {(student_id, day_text(day)): STATUSES[code] for student_id, day, code in rows}
+
+
+def matrix_cells(matrix):
+    return {(student_id, matrix.date(column)): matrix.status(row, column)
+            for row, (student_id, _, _) in enumerate(matrix.students)
+            for column in range(matrix.days)
+            if matrix.code(row, column) != UNMARKED}
+
+
+def draw(matrix, repeat):
+    """Times drawing, scrolling and repainting marks on a real canvas; None without a display."""
+    try:
+        root = tk.Tk()
+    except tk.TclError as error:
+        print(f"\ndrawing skipped: {error}")
+        return None
+    from attendance_widgets import MatrixCanvas
+
+    try:
+        grid = MatrixCanvas(root, height=15)
+        grid.pack()
+
+        def shown(run):
+            run()
+            root.update_idletasks()
+
+        results = {'draw month': timed(lambda: shown(lambda: grid.set_matrix(matrix)), repeat)[0]}
+        results['scroll a screen'] = timed(lambda: shown(lambda: grid.scroll(grid.height)), repeat)[0]
+        marks = [(student_id, matrix.date(0), 'Absent') for student_id, _, _ in matrix.students[:5]]
+        results['repaint 5 marks'] = timed(lambda: shown(lambda: grid.apply_marks(marks)), repeat)[0]
+        results['canvas items'] = len(grid.canvas.find_all())
+        return results
+    finally:
+        root.destroy()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--days', type=int, default=70, help="school days generated from --start")
+    parser.add_argument('--start', default='2024-01-01')
+    parser.add_argument('--month', default='2024-01')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+    month = args.month + '-01'
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'bench.db'), result_cache_bytes=0)
+        try:
+            rows = generate(db, args.students, classes=1, days=args.days, start=args.start)
+            print(f"{args.students} students in one class, {rows} marks")
+
+            elapsed, matrix = timed(lambda: load_matrix(db, 'Class 1', month), args.repeat)
+            print(f"\nload_matrix {len(matrix.students)} x {matrix.days}: {elapsed * 1000:.1f} ms, "
+                  f"{len(matrix.codes)} bytes of codes")
+            expected = expected_cells(db, 'Class 1', month)
+        finally:
+            db.close()
+
+    same = matrix_cells(matrix) == expected
+    print(f"{len(expected)} marked cells{'' if same else '  DIFFERENT'}")
+
+    results = draw(matrix, args.repeat)
+    if results is not None:
+        items = results.pop('canvas items')
+        for label, seconds in results.items():
+            print(f"{label:<18} {seconds * 1000:>7.1f} ms")
+        print(f"{items} canvas items for {len(matrix.students) * matrix.days} cells")
+    return 0 if same else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Current-term reports and file sizes before and after an academic-year rollover.
+
+Builds several academic years of school-day attendance, times report and
+analytics queries over the current term, seals the finished years with
+``rollover`` and times the same queries again, plus one range that spans
+the sealed years.  The result cache is switched off, so every repeat runs
+its query.
+
+    python benchmarks/bench_partitions.py --students 2000 --years 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database, migrate  # noqa: E402
+from attendance_core.analytics import run_view  # noqa: E402
+from attendance_core.attendance import ABSENT, PRESENT, day_number  # noqa: E402
+from attendance_core.partitions import rollover, year_bounds  # noqa: E402
+from attendance_core.reports import report_page  # noqa: E402
+
+
+def build(db, students, years, last_year):
+    first = last_year - years + 1
+    with db.transaction() as conn:
+        conn.execute('''WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+                        INSERT INTO students (student_id, name, roll_number, class)
+                        SELECT i, 'Student ' || i, 'R' || i, 'Class ' || (i % 40) FROM n''', (students,))
+        start = year_bounds(f"{first}-{(first + 1) % 100:02d}")[0]
+        conn.execute(f'''WITH RECURSIVE d(day) AS (SELECT ? UNION ALL SELECT day + 1 FROM d WHERE day < ?)
+                         INSERT INTO attendance_marks (student_id, day, status_code)
+                         SELECT s.student_id, d.day,
+                                CASE WHEN (s.student_id * 7 + d.day) % 10 = 0 THEN {ABSENT} ELSE {PRESENT} END
+                         FROM d CROSS JOIN students s
+                         WHERE (d.day + 4) % 7 NOT IN (0, 6)  -- weekdays only; day 0 was a Thursday''',
+                     (day_number(start), day_number(f"{last_year + 1}-06-30")))
+    return db.query_one("SELECT COUNT(*) FROM attendance_marks")[0]
+
+
+def time_queries(db, queries, repeat):
+    results = []
+    for label, run in queries:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            run()
+        results.append((label, (time.perf_counter() - start) / repeat))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--years', type=int, default=4, help="academic years of history, the last one open")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    current = 2024
+    term_start = year_bounds(f"{current}-{(current + 1) % 100:02d}")[0]
+    term_end = f"{current}-12-20"
+    span = (f"{current - 2}-09-01", f"{current - 1}-06-30")
+    queries = [
+        ("report, first page of term", lambda: report_page(db, None, 200, start_date=term_start)),
+        ("report, one class this term", lambda: report_page(db, None, 200, start_date=term_start,
+                                                            end_date=term_end, student_class='Class 7')),
+        ("student rates, this term", lambda: run_view(db, "Student Rates", start_date=term_start)),
+        ("absence streaks, this term", lambda: run_view(db, "Absence Streaks", start_date=term_start)),
+        ("student rates, across years", lambda: run_view(db, "Student Rates", *span)),
+        ("report page, across years", lambda: report_page(db, None, 200, start_date=span[0],
+                                                          end_date=span[1])),
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'attendance.db')
+        db = Database(path, result_cache_bytes=0)
+        try:
+            migrate(db)
+            start = time.perf_counter()
+            total = build(db, args.students, args.years, current)
+            print(f"built {total} attendance rows in {time.perf_counter() - start:.1f}s, "
+                  f"file {os.path.getsize(path) / 1e6:.1f} MB\n")
+            before = time_queries(db, queries, args.repeat)
+
+            start = time.perf_counter()
+            sealed = rollover(db, today=term_end)
+            with db.connection() as conn:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            print(f"rollover of {len(sealed)} year(s) took {time.perf_counter() - start:.1f}s")
+            for label, rows, archive in sealed:
+                print(f"  {label}: {rows} rows, {os.path.getsize(archive) / 1e6:.1f} MB read-only")
+            print(f"  live file now {os.path.getsize(path) / 1e6:.1f} MB\n")
+            after = time_queries(db, queries, args.repeat)
+        finally:
+            db.close()
+
+    print(f"{'query':<30} {'single table':>13} {'partitioned':>12}")
+    for (label, old), (_, new) in zip(before, after):
+        print(f"{label:<30} {old * 1000:>10.1f} ms {new * 1000:>9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
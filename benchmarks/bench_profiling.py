@@ -0,0 +1,75 @@
+"""Cost of the profiling hooks, switched off and on.
+
+Times a cheap primary-key lookup through ``Database.query_one`` and an
+empty ``PROFILER.span`` block many times with profiling disabled and
+enabled, and prints the cost per call.  It then runs one deliberately slow
+statement to show that it is captured with its query plan.
+
+    python benchmarks/bench_profiling.py --calls 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database, migrate  # noqa: E402
+from attendance_core.profiling import PROFILER  # noqa: E402
+
+
+def per_call(run, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        run()
+    return (time.perf_counter() - start) / calls
+
+
+def empty_block():
+    pass
+
+
+def empty_span():
+    with PROFILER.span("empty"):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'bench.db'))
+        try:
+            migrate(db)
+            db.execute("INSERT INTO students (student_id, name, roll_number, class) VALUES (1, 'A', '1', 'C')")
+            lookup = lambda: db.query_one("SELECT name FROM students WHERE student_id = ?", (1,))  # noqa: E731
+            results = []
+            for enabled in (False, True):
+                PROFILER.enabled = enabled
+                PROFILER.reset()
+                results.append((per_call(lookup, args.calls), per_call(empty_span, args.calls)))
+
+            PROFILER.reset()
+            db.query('''WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 2000000)
+                        SELECT COUNT(*) FROM n''')
+            slow = PROFILER.snapshot()['slow_queries']
+            PROFILER.disable()
+        finally:
+            db.close()
+
+    (query_off, span_off), (query_on, span_on) = results
+    print(f"{'':<22} {'disabled':>10} {'enabled':>10}")
+    print(f"{'query_one by id':<22} {query_off * 1e6:>7.2f} us {query_on * 1e6:>7.2f} us")
+    print(f"{'empty span':<22} {span_off * 1e9:>7.0f} ns {span_on * 1e9:>7.0f} ns"
+          f"   (calling an empty function: {per_call(empty_block, args.calls) * 1e9:.0f} ns)")
+    for entry in slow:
+        print(f"\nslow statement, {entry['max'] * 1000:.0f} ms:")
+        for line in entry['plan']:
+            print(f"    {line}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Time to the first screen of the report table on a large database.
+
+Compares the old fetchall() of the whole report with fetching just the
+first window through keyset pagination, as the virtualized Treeview does.
+
+    python benchmarks/bench_report_window.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database, migrate  # noqa: E402
+from attendance_core.reports import report_pages  # noqa: E402
+from bench_indexes import build  # noqa: E402
+
+FULL_REPORT = '''SELECT s.name, s.roll_number, a.date, a.status
+                 FROM attendance a
+                 JOIN students s ON a.student_id = s.student_id
+                 ORDER BY a.date DESC'''
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--window', type=int, default=15)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'bench.db'))
+        try:
+            build(db, args.rows, duplicate_every=args.rows + 1)
+            migrate(db)
+
+            start = time.perf_counter()
+            rows = report_pages(db)
+            first = rows.rows(0, args.window)
+            window = time.perf_counter() - start
+
+            start = time.perf_counter()
+            scrolled = rows.rows(args.rows // 2, args.window)
+            deep = time.perf_counter() - start
+
+            start = time.perf_counter()
+            everything = db.query(FULL_REPORT)
+            full = time.perf_counter() - start
+        finally:
+            db.close()
+
+    print(f"first screen ({len(first)} rows):          {window * 1000:8.1f} ms")
+    print(f"scroll to row {args.rows // 2} ({len(scrolled)} rows): {deep * 1000:8.1f} ms")
+    print(f"fetchall of {len(everything)} rows:           {full * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
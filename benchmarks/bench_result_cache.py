@@ -0,0 +1,86 @@
+"""Repeated reports and summaries with and without the result cache.
+
+Generates a seeded database and runs what a teacher clicking "Generate
+Report" several times runs: the first screen of a filtered report and a few
+analytics views.  Each is timed cold (the first run after a write) and warm
+(a repeat on the unchanged database), then once more after marking a single
+student to show the write invalidating the cache.  Exits non-zero if any
+cached answer differs from the uncached one.
+
+    python benchmarks/bench_result_cache.py --students 5000 --days 180
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database, mark_student  # noqa: E402
+from attendance_core.analytics import run_view  # noqa: E402
+from attendance_core.reports import report_pages  # noqa: E402
+
+from generate import generate, school_days  # noqa: E402
+
+
+def first_screen(db, rows=40, **filters):
+    return report_pages(db, **filters).prefetch(rows).rows(0, rows)
+
+
+def timed(run, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = run()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+    days = school_days('2024-01-01', args.days + 1)
+    month = {'start_date': days[-22], 'end_date': days[-2]}
+    operations = [
+        ("report, first screen", lambda db: first_screen(db)),
+        ("report, class and month", lambda db: first_screen(db, student_class='Class 1', **month)),
+        ("daily summary", lambda db: run_view(db, "Daily Summary")),
+        ("student rates", lambda db: run_view(db, "Student Rates")),
+        ("absence streaks, month", lambda db: run_view(db, "Absence Streaks", **month)),
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        db = Database(path)
+        uncached = Database(path, result_cache_bytes=0)
+        try:
+            rows = generate(db, args.students, days=args.days)
+            print(f"{rows} attendance rows\n")
+            results = []
+            for label, run in operations:
+                cold, answer = timed(lambda: run(db), 1)
+                warm, cached = timed(lambda: run(db), args.repeat)
+                mark_student(db, 1, days[-1], 'Absent')
+                written, fresh = timed(lambda: run(db), 1)
+                _, expected = timed(lambda: run(uncached), 1)
+                results.append((label, cold, warm, written, answer == cached and fresh == expected))
+            cache = db.results.snapshot()
+        finally:
+            uncached.close()
+            db.close()
+
+    print(f"{'operation':<26} {'cold':>10} {'warm':>10} {'after write':>12}")
+    failed = False
+    for label, cold, warm, written, same in results:
+        failed = failed or not same
+        print(f"{label:<26} {cold * 1000:>7.1f} ms {warm * 1000:>7.3f} ms {written * 1000:>9.1f} ms"
+              f"{'' if same else '  DIFFERENT'}")
+    print(f"\n{cache['hits']} hits, {cache['misses']} misses, {cache['invalidations']} invalidations, "
+          f"{cache['entries']} entries in {cache['bytes'] / 1e6:.2f} MB")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
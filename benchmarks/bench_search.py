@@ -0,0 +1,68 @@
+"""Type-ahead student search latency on a large roster.
+
+Every prefix of a few typed queries is searched, as it would be without
+debouncing, and the latency distribution is printed.
+
+    python benchmarks/bench_search.py --students 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database, migrate  # noqa: E402
+from attendance_core.importer import import_roster  # noqa: E402
+from attendance_core.search import search_students  # noqa: E402
+
+FIRST = ["Aarav", "Vivaan", "Aditya", "Arjun", "Reyansh", "Ishaan", "Ananya", "Diya", "Priya", "Saanvi",
+         "Myra", "Anika", "Kiara", "Riya", "John", "Maria", "Liam", "Olivia", "Noah", "Emma",
+         "Mohammed", "Fatima", "Wei", "Yuki", "Lucas", "Sofia", "Mateo", "Amara", "Kofi", "Elena"]
+LAST = ["Sharma", "Verma", "Gupta", "Singh", "Kumar", "Patel", "Reddy", "Nair", "Iyer", "Das",
+        "Smith", "Jones", "Brown", "Garcia", "Khan", "Chen", "Sato", "Rossi", "Silva", "Okafor"]
+TYPED = ["arjun sharma", "priya", "sm", "olivia ch", "42", "kofi okafor 7", "zz"]
+
+
+def roster_lines(count, seed):
+    rng = random.Random(seed)
+    yield "name,roll_number,class\n"
+    for index in range(count):
+        yield f"{rng.choice(FIRST)} {rng.choice(LAST)},{index // 1000 + 1},Class {index % 1000 + 1}\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=1000000)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'bench.db'))
+        try:
+            migrate(db)
+            start = time.perf_counter()
+            import_roster(db, roster_lines(args.students, args.seed))
+            print(f"indexed {args.students} students in {time.perf_counter() - start:.1f}s\n")
+
+            timings = []
+            for typed in TYPED:
+                for end in range(1, len(typed) + 1):
+                    start = time.perf_counter()
+                    rows = search_students(db, typed[:end], args.limit)
+                    elapsed = time.perf_counter() - start
+                    timings.append(elapsed)
+                print(f"{typed!r:<16} last prefix: {len(rows):>4} rows  {elapsed * 1000:6.2f} ms")
+        finally:
+            db.close()
+
+    timings.sort()
+    print(f"\n{len(timings)} prefix queries: p50 {timings[len(timings) // 2] * 1000:.2f} ms  "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1000:.2f} ms  max {timings[-1] * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
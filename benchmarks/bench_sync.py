@@ -0,0 +1,145 @@
+"""Merges simulated classroom databases into a central one through the journal.
+
+Each classroom gets its own database, enrols students, marks them on a run
+of school days (changing some marks afterwards and marking the rest with
+``mark_remaining``), deletes a few, and ships its journal to a shared
+directory several times along the way.  The segments are then applied to
+two central databases, one in name order and one a segment at a time in a
+shuffled order, and applied again under new names to check they are
+skipped.  Exits non-zero unless both central databases hold exactly the
+students and marks of all the classrooms together.
+
+    python benchmarks/bench_sync.py --classrooms 50
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database, mark_many, mark_remaining, migrate  # noqa: E402
+from attendance_core.journal import apply_segments, ship  # noqa: E402
+from attendance_core.students import add_student, delete_student  # noqa: E402
+
+from generate import school_days  # noqa: E402
+
+
+def classroom(path, outbox, number, students, days, seed, segment_size):
+    """Fills one classroom database, shipping after every few days; returns the entries shipped."""
+    rng = random.Random(seed * 1000 + number)
+    db = Database(path)
+    try:
+        migrate(db)
+        ids = [add_student(db, f"Student {number}-{n}", f"R{n}", f"Class {number}") for n in range(students)]
+        for index, day in enumerate(days):
+            present = [student_id for student_id in ids if rng.random() > 0.1]
+            mark_many(db, [(student_id, day, 'Present') for student_id in present])
+            mark_remaining(db, day, 'Absent', student_ids=ids)
+            mark_many(db, [(rng.choice(ids), day, rng.choice(('Present', 'Absent'))) for _ in range(3)])
+            if index == len(days) // 2:
+                for student_id in rng.sample(ids, 2):
+                    delete_student(db, student_id, archive=rng.random() < 0.5)
+                    ids.remove(student_id)
+                ids.append(add_student(db, f"Transfer {number}", "T1", f"Class {number}"))
+            if index % 5 == 4:
+                ship(db, outbox, segment_size)
+        ship(db, outbox, segment_size)
+        return db.query_one("SELECT shipped FROM journal_state")[0]
+    finally:
+        db.close()
+
+
+def contents(path):
+    """The students and marks of a database, by uid rather than local id."""
+    db = Database(path)
+    try:
+        students = set(db.query("SELECT hex(uid), name, roll_number, class FROM students"))
+        marks = set(db.query('''SELECT hex(s.uid), a.day, a.status_code
+                                FROM attendance_marks a JOIN students s ON s.student_id = a.student_id'''))
+        return students, marks
+    finally:
+        db.close()
+
+
+def central(path, apply):
+    db = Database(path)
+    try:
+        migrate(db)
+        start = time.perf_counter()
+        result = apply(db)
+        return result, time.perf_counter() - start
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--classrooms', type=int, default=50)
+    parser.add_argument('--students', type=int, default=30)
+    parser.add_argument('--days', type=int, default=20)
+    parser.add_argument('--segment-size', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    days = school_days('2024-09-02', args.days)
+
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = os.path.join(directory, 'outbox')
+        start = time.perf_counter()
+        paths = [os.path.join(directory, f'classroom{number}.db') for number in range(args.classrooms)]
+        entries = sum(classroom(path, outbox, number, args.students, days, args.seed, args.segment_size)
+                      for number, path in enumerate(paths))
+        segments = sorted(os.listdir(outbox))
+        print(f"{args.classrooms} classrooms wrote and shipped {entries} entries in {len(segments)} segments "
+              f"({time.perf_counter() - start:.1f}s)")
+
+        expected_students, expected_marks = set(), set()
+        for path in paths:
+            students, marks = contents(path)
+            expected_students |= students
+            expected_marks |= marks
+
+        in_order, elapsed = central(os.path.join(directory, 'central.db'),
+                                    lambda db: apply_segments(db, outbox, args.batch_size))
+        print(f"\nin name order: {in_order.summary()}\n    {elapsed:.2f}s, "
+              f"{in_order.entries / elapsed:.0f} entries/s")
+
+        renamed = os.path.join(directory, 'renamed')
+        os.mkdir(renamed)
+        for name in segments:
+            shutil.copy(os.path.join(outbox, name), os.path.join(renamed, 'again-' + name))
+        again, _ = central(os.path.join(directory, 'central.db'),
+                           lambda db: apply_segments(db, renamed, args.batch_size))
+        print(f"again, renamed: {again.summary()}")
+
+        inbox = os.path.join(directory, 'inbox')
+        os.mkdir(inbox)
+        shuffled = list(segments)
+        random.Random(args.seed).shuffle(shuffled)
+
+        def one_at_a_time(db):
+            for name in shuffled:
+                shutil.copy(os.path.join(outbox, name), inbox)
+                apply_segments(db, inbox, args.batch_size)
+
+        _, elapsed = central(os.path.join(directory, 'shuffled.db'), one_at_a_time)
+        print(f"shuffled, one segment at a time: {elapsed:.2f}s")
+
+        results = [contents(os.path.join(directory, name)) for name in ('central.db', 'shuffled.db')]
+
+    print(f"\nexpected {len(expected_students)} students and {len(expected_marks)} marks")
+    failed = again.applied != 0
+    for label, (students, marks) in zip(("name order", "shuffled"), results):
+        same = students == expected_students and marks == expected_marks
+        failed = failed or not same
+        print(f"{label:<12} {len(students)} students, {len(marks)} marks"
+              f"{'' if same else '  DIFFERENT'}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Seeded synthetic attendance databases for benchmarks.
+
+Students are spread over ``classes`` classes and marked on ``days``
+school days (weekdays from ``start``).  Each student gets their own
+absence rate, drawn from an exponential distribution around
+``absence_rate``.  Whether a student is absent on a day comes from a hash
+of the student, the day and the seed, so the same arguments always give
+the same database, row for row.
+
+The rows are inserted in day order, like a school marking each morning,
+into whichever attendance table the schema version has.  The summary
+triggers are left out during the bulk insert and the rollup is built once
+at the end.
+
+    python benchmarks/generate.py attendance.db --students 50000 --days 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_core import Database, migrate  # noqa: E402
+from attendance_core.attendance import ABSENT, PRESENT, date_sql, day_number, status_sql  # noqa: E402
+from attendance_core.schema import SCHEMA_VERSION  # noqa: E402
+from attendance_core.summary import TRIGGERS, create_daily_summary  # noqa: E402
+
+# The hash works modulo this prime; squaring keeps it inside 64-bit integers.
+_PRIME = 2147483647
+
+
+def school_days(start, days):
+    """The first ``days`` weekdays from ``start`` as ISO dates."""
+    day = date.fromisoformat(start)
+    found = []
+    while len(found) < days:
+        if day.weekday() < 5:
+            found.append(day.isoformat())
+        day += timedelta(days=1)
+    return found
+
+
+def _absent_sql(seed):
+    mixed = f"(s.student_id * 7919 + d.k * 104729 + {int(seed) * 15485863}) % {_PRIME}"
+    return f"({mixed}) * ({mixed}) % {_PRIME} < r.threshold"
+
+
+def generate(db, students=2000, classes=40, days=180, absence_rate=0.08, seed=1,
+             start='2024-01-01', schema_version=SCHEMA_VERSION):
+    """Fills an empty database; returns the number of attendance rows written."""
+    migrate(db, target_version=schema_version)
+    rng = random.Random(seed)
+    thresholds = [(student_id, int(min(1.0, rng.expovariate(1 / absence_rate)) * _PRIME) if absence_rate else 0)
+                  for student_id in range(1, students + 1)]
+    with db.transaction() as conn:
+        conn.execute('''WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+                        INSERT INTO students (student_id, name, roll_number, class)
+                        SELECT i, 'Student ' || i, 'R' || i, 'Class ' || ((i - 1) % ? + 1) FROM n''',
+                     (students, classes))
+        conn.execute("CREATE TEMP TABLE gen_rates (student_id INTEGER PRIMARY KEY, threshold INTEGER)")
+        conn.executemany("INSERT INTO gen_rates VALUES (?, ?)", thresholds)
+        conn.execute("CREATE TEMP TABLE gen_days (k INTEGER PRIMARY KEY, day INTEGER)")
+        conn.executemany("INSERT INTO gen_days VALUES (?, ?)",
+                         enumerate(day_number(day) for day in school_days(start, days)))
+        for name in TRIGGERS:
+            if name.startswith('trg_summary_attendance'):
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+        code = f"CASE WHEN {_absent_sql(seed)} THEN {ABSENT} ELSE {PRESENT} END"
+        if schema_version >= 8:
+            target, values = "attendance_marks (student_id, day, status_code)", f"d.day, {code}"
+        else:
+            target, values = "attendance (student_id, date, status)", f"{date_sql('d.day')}, {status_sql(code)}"
+        rows = conn.execute(f'''INSERT INTO {target}
+                                SELECT s.student_id, {values}
+                                FROM gen_days d CROSS JOIN students s
+                                JOIN gen_rates r ON r.student_id = s.student_id
+                                ORDER BY d.k, s.student_id''').rowcount
+        conn.execute("DROP TABLE gen_rates")
+        conn.execute("DROP TABLE gen_days")
+        create_daily_summary(conn)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help="database file to create")
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--classes', type=int, default=40)
+    parser.add_argument('--days', type=int, default=180, help="school days, weekdays only")
+    parser.add_argument('--absence-rate', type=float, default=0.08)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--start', default='2024-01-01')
+    parser.add_argument('--schema-version', type=int, default=SCHEMA_VERSION)
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} already exists")
+    db = Database(args.path)
+    try:
+        start = time.perf_counter()
+        rows = generate(db, args.students, args.classes, args.days, args.absence_rate, args.seed,
+                        args.start, args.schema_version)
+        absent = db.query_one("SELECT SUM(absent) FROM daily_summary")[0] or 0
+    finally:
+        db.close()
+    print(f"{rows} attendance rows ({100 * absent / max(rows, 1):.1f}% absent) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""Load test for the HTTP attendance service: many teachers marking at once.
+
+Each simulated teacher owns one class and, for every school day, loads the
+class roster, saves the marks with one POST per status and reads back a
+page of the class report.  All teachers run concurrently over keep-alive
+connections; latency percentiles are reported per request type.
+
+    python benchmarks/load_test.py --teachers 200 --days 5
+
+By default a server is started on a fresh database in a subprocess; pass
+``--url`` to drive one that is already running (it must hold students in
+classes named "Class 1" .. "Class N").
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from attendance_core import Database, migrate  # noqa: E402
+
+
+class Client:
+    """A minimal HTTP/1.1 keep-alive JSON client."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                          f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n"
+                          .encode() + payload)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        result = json.loads(await self.reader.readexactly(length))
+        if status >= 400:
+            raise RuntimeError(f"{method} {path}: {status} {result.get('error')}")
+        return result
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def seed(path, classes, class_size):
+    db = Database(path)
+    migrate(db)
+    db.executemany("INSERT INTO students (name, roll_number, class) VALUES (?, ?, ?)",
+                   [(f"Student {klass}-{roll}", str(roll), f"Class {klass}")
+                    for klass in range(1, classes + 1) for roll in range(1, class_size + 1)])
+    db.close()
+
+
+async def teacher(client, number, days, latencies, rng):
+    klass = f"Class {number}"
+
+    async def timed(kind, method, path, body=None):
+        start = time.perf_counter()
+        result = await client.request(method, path, body)
+        latencies.setdefault(kind, []).append(time.perf_counter() - start)
+        return result
+
+    for day in days:
+        roster = await timed("roster", "GET", "/roster?" + urlencode({"date": day, "class": klass}))
+        absent = [row[0] for row in roster["rows"] if rng.random() < 0.1]
+        present = [row[0] for row in roster["rows"] if row[0] not in absent]
+        for status, ids in (("Present", present), ("Absent", absent)):
+            if ids:
+                await timed("mark", "POST", "/attendance", {"date": day, "status": status, "student_ids": ids})
+        await timed("report", "GET", "/report?" + urlencode({"class": klass, "limit": 50}))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def drive(host, port, teachers, days, seed_value):
+    latencies = {}
+    clients = [Client(host, port) for _ in range(teachers)]
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(teacher(client, number, days, latencies, random.Random(seed_value + number))
+                               for number, client in enumerate(clients, 1)))
+        elapsed = time.perf_counter() - start
+        stats = await clients[0].request("GET", "/stats")
+    finally:
+        for client in clients:
+            client.close()
+    return elapsed, latencies, stats
+
+
+async def wait_for_server(host, port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--teachers', type=int, default=200)
+    parser.add_argument('--class-size', type=int, default=30)
+    parser.add_argument('--days', type=int, default=5)
+    parser.add_argument('--url', help="drive an already running server instead of starting one")
+    parser.add_argument('--port', type=int, default=8799)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    days = [(date(2024, 9, 2) + timedelta(days=offset)).isoformat() for offset in range(args.days)]
+    with tempfile.TemporaryDirectory() as directory:
+        server = None
+        if args.url:
+            parts = urlsplit(args.url)
+            host, port = parts.hostname, parts.port
+        else:
+            host, port = "127.0.0.1", args.port
+            path = os.path.join(directory, 'load.db')
+            seed(path, args.teachers, args.class_size)
+            server = subprocess.Popen([sys.executable, "-m", "attendance_core", "--db", path, "serve",
+                                       "--host", host, "--port", str(port)],
+                                      cwd=ROOT, stdout=subprocess.DEVNULL)
+        try:
+            asyncio.run(wait_for_server(host, port))
+            elapsed, latencies, stats = asyncio.run(drive(host, port, args.teachers, days, args.seed))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    requests = sum(len(values) for values in latencies.values())
+    print(f"{args.teachers} teachers x {args.days} days: {requests} requests in {elapsed:.2f}s "
+          f"({requests / elapsed:.0f} req/s)")
+    for kind, values in sorted(latencies.items()):
+        print(f"{kind:<8} n={len(values):<6} p50 {percentile(values, 0.50) * 1000:7.1f} ms   "
+              f"p99 {percentile(values, 0.99) * 1000:7.1f} ms   max {max(values) * 1000:7.1f} ms")
+    print(f"group commit: {stats['writes']} writes in {stats['write_batches']} transactions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""Headless benchmark suite over a seeded synthetic database.
+
+Generates a database with ``generate``, then times the everyday
+operations: the bulk insert itself, marking a whole school day, loading
+rosters, report queries, an export, importing a roster CSV and enrolling a
+student.  A whole district's roster (``--district-rows``) is also
+imported into a freshly migrated database, and the exit status is 1 when
+that runs below ``--min-import-rate`` rows a second.  Results and the
+parameters that produced them are written as JSON, so runs on different
+commits or machines can be compared:
+
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --output after.json --compare before.json
+
+Every operation gets one untimed warm-up run first.  With ``--compare``
+the exit status is 1 when an operation's best time got slower than the
+baseline by more than ``--tolerance``; the best of several runs is less
+disturbed by the rest of the machine than the median.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from attendance_core import Database, mark_many, migrate  # noqa: E402
+from attendance_core.export import export_file  # noqa: E402
+from attendance_core.importer import import_roster  # noqa: E402
+from attendance_core.reports import report_page, stream_report  # noqa: E402
+from attendance_core.roster import RosterCache, RosterRows  # noqa: E402
+from attendance_core.schema import schema_version  # noqa: E402
+from attendance_core.sessions import AttendanceSession  # noqa: E402
+from attendance_core.students import add_student  # noqa: E402
+
+from generate import generate, school_days  # noqa: E402
+
+# Differences smaller than this are timer noise, whatever the ratio.
+MIN_REGRESSION = 0.005
+
+DISTRICT_IMPORT = "roster import (district, fresh)"
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def operations(db, args, directory):
+    """Name -> callable returning the number of rows it handled, in run order."""
+    days = school_days(args.start, args.days + args.repeat + 1)
+    marked_days = iter(days[args.days:])
+    month = (days[args.days - 21], days[args.days - 1])
+    student_ids = [row[0] for row in db.query("SELECT student_id FROM students ORDER BY student_id")]
+    last_day = days[args.days - 1]
+
+    def bulk_mark():
+        day = next(marked_days)
+        return mark_many(db, [(student_id, day, 'Absent' if student_id % 13 == 0 else 'Present')
+                              for student_id in student_ids])
+
+    def session_load():
+        return len(AttendanceSession('Class 1', last_day).load(db).students)
+
+    def school_roster():
+        return RosterRows(RosterCache(db)).ensure(0)
+
+    def first_report_page():
+        return len(report_page(db, None, 200)[0])
+
+    def class_month_report():
+        return sum(1 for _ in stream_report(db, start_date=month[0], end_date=month[1],
+                                            student_class='Class 1'))
+
+    def absentees_report():
+        return sum(1 for _ in stream_report(db, start_date=month[0], end_date=month[1], status='Absent'))
+
+    def export_csv():
+        return export_file(db, os.path.join(directory, 'export.csv'))
+
+    # A fresh set of classes per run, so no row is a duplicate of an earlier one.
+    rosters = iter([["name,roll_number,class\n"]
+                    + [f"Imported Student {number}-{index},{index},Import {number}-{index % args.classes}\n"
+                       for index in range(args.import_rows)]
+                    for number in range(args.repeat + 1)])
+
+    def roster_import():
+        return import_roster(db, next(rosters)).inserted
+
+    # The first import of a new install: every run gets an empty database, migrated untimed.
+    district = (["name,roll_number,class\n"]
+                + [f"District Student {index},{index},Grade {index % 12}-{index % args.classes}\n"
+                   for index in range(args.district_rows)])
+    fresh = []
+    for number in range(args.repeat + 1):
+        fresh.append(Database(os.path.join(directory, f'district-{number}.db'), result_cache_bytes=0))
+        migrate(fresh[-1])
+    fresh = iter(fresh)
+
+    def district_import():
+        district_db = next(fresh)
+        try:
+            return import_roster(district_db, district).inserted
+        finally:
+            district_db.close()
+
+    added = iter(range(1, args.repeat + 2))
+
+    def enroll_student():
+        number = next(added)
+        add_student(db, f"New Student {number}", f"N{number}", "Transfers")
+        return 1
+
+    return {
+        "bulk mark (school day)": bulk_mark,
+        "roster load (class session)": session_load,
+        "roster load (whole school)": school_roster,
+        "report query (first page)": first_report_page,
+        "report query (class, month)": class_month_report,
+        "report query (absentees, month)": absentees_report,
+        "export (csv)": export_csv,
+        "roster import (csv)": roster_import,
+        DISTRICT_IMPORT: district_import,
+        "add student": enroll_student,
+    }
+
+
+def run(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # Without the result cache, so repeated reports time the queries themselves.
+        db = Database(os.path.join(directory, 'suite.db'), result_cache_bytes=0)
+        try:
+            start = time.perf_counter()
+            rows = generate(db, args.students, args.classes, args.days, args.absence_rate, args.seed, args.start)
+            elapsed = time.perf_counter() - start
+            results["insert (generate)"] = {"rows": rows, "runs": [elapsed]}
+            version = schema_version(db)
+            for name, operation in operations(db, args, directory).items():
+                operation()
+                runs = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    rows = operation()
+                    runs.append(time.perf_counter() - start)
+                results[name] = {"rows": rows, "runs": runs}
+        finally:
+            db.close()
+    for result in results.values():
+        result["median"] = statistics.median(result["runs"])
+        result["min"] = min(result["runs"])
+    meta = {
+        "parameters": {name: getattr(args, name) for name in
+                       ("students", "classes", "days", "absence_rate", "seed", "start", "repeat",
+                        "import_rows", "district_rows")},
+        "schema_version": version,
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(report, baseline, tolerance):
+    """Prints the change per operation; returns the names that regressed."""
+    if report["meta"]["parameters"] != baseline["meta"]["parameters"]:
+        print("warning: the baseline was run with different parameters\n")
+    regressed = []
+    print(f"{'operation':<32} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, result in report["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:<32} {'-':>10} {result['min'] * 1000:>7.1f} ms")
+            continue
+        change = result["min"] / old["min"] - 1 if old["min"] else 0.0
+        slower = change > tolerance and result["min"] - old["min"] > MIN_REGRESSION
+        if slower:
+            regressed.append(name)
+        print(f"{name:<32} {old['min'] * 1000:>7.1f} ms {result['min'] * 1000:>7.1f} ms "
+              f"{change * 100:>+7.0f}%{'  REGRESSION' if slower else ''}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--classes', type=int, default=40)
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--absence-rate', type=float, default=0.08)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--start', default='2024-01-01')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--import-rows', type=int, default=50000, help="lines per roster CSV imported")
+    parser.add_argument('--district-rows', type=int, default=200000,
+                        help="lines of the roster CSV imported into a fresh database")
+    parser.add_argument('--min-import-rate', type=float, default=100000,
+                        help="rows a second the fresh-database import must reach")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--compare', metavar='BASELINE', help="JSON results of an earlier run")
+    parser.add_argument('--tolerance', type=float, default=0.20,
+                        help="allowed slowdown of the best time before it counts as a regression")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            json.dump(report, out, indent=2)
+    status = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline:
+            regressed = compare(report, json.load(baseline), args.tolerance)
+        if regressed:
+            print(f"\n{len(regressed)} operation(s) slower than the baseline")
+            status = 1
+    else:
+        print(f"{'operation':<32} {'rows':>9} {'median':>10} {'rows/s':>11}")
+        for name, result in report["results"].items():
+            rate = result["rows"] / result["median"] if result["median"] else 0
+            print(f"{name:<32} {result['rows']:>9} {result['median'] * 1000:>7.1f} ms {rate:>11.0f}")
+    district = report["results"][DISTRICT_IMPORT]
+    rate = district["rows"] / district["median"] if district["median"] else 0
+    if rate < args.min_import_rate:
+        print(f"\n{DISTRICT_IMPORT}: {rate:.0f} rows/s, below the {args.min_import_rate:.0f} rows/s target")
+        status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
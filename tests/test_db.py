@@ -0,0 +1,41 @@
+"""The connection pool and its commit generation."""
+import os
+import tempfile
+import unittest
+
+from attendance_core import Database, migrate
+from attendance_core.students import add_student
+
+
+class DatabaseTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "attendance.db")
+        self.db = Database(self.path)
+        self.addCleanup(self.db.close)
+        migrate(self.db)
+
+    def test_rejects_a_private_in_memory_database(self):
+        with self.assertRaises(ValueError):
+            Database(':memory:')
+
+    def test_generation_changes_only_after_a_commit(self):
+        before = self.db.generation()
+        with self.assertRaises(ZeroDivisionError):
+            with self.db.transaction() as conn:
+                conn.execute("INSERT INTO students (name, roll_number, class) VALUES ('Asha', '1', 'Class 1')")
+                1 / 0
+        self.assertEqual(self.db.generation(), before)
+
+        other = Database(self.path)
+        try:
+            add_student(other, "Ravi", "2", "Class 2")
+        finally:
+            other.close()
+        self.assertNotEqual(self.db.generation(), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
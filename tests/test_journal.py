@@ -0,0 +1,56 @@
+"""Journal clocks of students written outside the per-row triggers."""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from attendance_core import Database, migrate
+from attendance_core.importer import import_roster
+from attendance_core.students import add_student, delete_student
+
+
+class BulkImportClockTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "attendance.db")
+        # The students table as attendance_app's initialize_db created it.
+        conn = sqlite3.connect(path)
+        conn.execute('''CREATE TABLE students (
+                            student_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            name TEXT NOT NULL,
+                            roll_number TEXT NOT NULL,
+                            class TEXT NOT NULL)''')
+        conn.execute('''CREATE TABLE attendance (
+                            attendance_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            student_id INTEGER,
+                            date TEXT NOT NULL,
+                            status TEXT NOT NULL,
+                            FOREIGN KEY (student_id) REFERENCES students(student_id))''')
+        conn.close()
+        self.db = Database(path)
+        self.addCleanup(self.db.close)
+        migrate(self.db)
+
+    def clocks(self):
+        return [row[0] for row in self.db.query("SELECT clock FROM journal ORDER BY seq")]
+
+    def test_import_after_deleting_the_last_student(self):
+        for number in range(1, 6):
+            add_student(self.db, f"Student {number}", str(number), "Class 1")
+        delete_student(self.db, 5)
+        result = import_roster(self.db, ["name,roll_number,class\n", "Asha,6,Class 1\n", "Ravi,7,Class 1\n"])
+        self.assertEqual(result.inserted, 2)
+
+        # The gap AUTOINCREMENT leaves at id 5 does not leave a gap in the clocks.
+        clocks = self.clocks()
+        self.assertEqual(clocks, list(range(1, 9)))
+        self.assertEqual(self.db.query_one("SELECT clock FROM journal_state")[0], 8)
+
+        add_student(self.db, "Meera", "8", "Class 1")
+        self.assertEqual(self.clocks()[-1], 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+"""Sealed academic years read through attendance_source."""
+import os
+import tempfile
+import unittest
+
+from attendance_core import Database, migrate
+from attendance_core.attendance import mark_student
+from attendance_core.partitions import rollover
+from attendance_core.reports import stream_report
+from attendance_core.students import add_student
+
+
+class AttendanceSourceTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db = Database(os.path.join(directory.name, "attendance.db"))
+        self.addCleanup(self.db.close)
+        migrate(self.db)
+        self.student_id = add_student(self.db, "Asha", "1", "Class 1")
+        mark_student(self.db, self.student_id, "2023-09-04", "Present")
+        mark_student(self.db, self.student_id, "2024-09-02", "Absent")
+        self.assertEqual([label for label, _, _ in rollover(self.db, today="2024-09-10")], ["2023-24"])
+
+    def dates(self):
+        return [row[2] for row in stream_report(self.db)]
+
+    def test_connection_still_writes_with_an_archive_attached(self):
+        with self.db.connection() as conn:
+            self.assertEqual(self.dates(), ["2024-09-02", "2023-09-04"])
+            # The archive stays attached to this connection after the report.
+            self.assertIn("archive_2023_24", {row[1] for row in conn.execute("PRAGMA database_list")})
+            mark_student(self.db, self.student_id, "2024-09-03", "Present")
+            self.assertEqual(self.dates(), ["2024-09-03", "2024-09-02", "2023-09-04"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""The roster cache follows writes made outside it."""
+import os
+import tempfile
+import unittest
+
+from attendance_core import Database, migrate
+from attendance_core.roster import RosterCache
+from attendance_core.students import add_student, delete_student
+
+
+class RosterCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "attendance.db")
+        self.db = Database(self.path)
+        self.addCleanup(self.db.close)
+        migrate(self.db)
+
+    def test_reads_are_served_from_memory_until_a_commit(self):
+        add_student(self.db, "Asha", "1", "Class 1")
+        roster = RosterCache(self.db)
+        self.assertEqual([student.name for student in roster.students()], ["Asha"])
+        roster.students()
+        self.assertEqual((roster.hits, roster.misses), (1, 1))
+
+    def test_sees_students_written_by_another_connection(self):
+        roster = RosterCache(self.db)
+        self.assertEqual(roster.students(), [])
+
+        # As the CLI or the HTTP service would, through a Database of their own.
+        other = Database(self.path)
+        try:
+            student_id = add_student(other, "Ravi", "2", "Class 2")
+            self.assertEqual(roster.classes(), ["Class 2"])
+            delete_student(other, student_id)
+        finally:
+            other.close()
+        self.assertEqual(roster.students(), [])
+        self.assertEqual(roster.loaded_classes(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
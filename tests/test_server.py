@@ -0,0 +1,58 @@
+"""The HTTP service, served on a real socket."""
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from attendance_core import Database, migrate
+from attendance_core.server import AttendanceService
+from attendance_core.students import add_student
+
+
+async def _get(service, target):
+    """Serves on a free port, sends one GET for ``target`` and returns (status, JSON body)."""
+    listening = asyncio.get_running_loop().create_future()
+    serving = asyncio.create_task(service.serve("127.0.0.1", 0, listening.set_result))
+    server = await listening
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        head, _, body = (await reader.read()).partition(b"\r\n\r\n")
+    finally:
+        writer.close()
+        serving.cancel()
+        try:
+            await serving
+        except asyncio.CancelledError:
+            pass
+    return int(head.split()[1]), json.loads(body)
+
+
+class ServerTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db = Database(os.path.join(directory.name, "attendance.db"))
+        self.addCleanup(self.db.close)
+        migrate(self.db)
+
+    def test_lists_students(self):
+        add_student(self.db, "Asha", "1", "Class 1")
+        add_student(self.db, "Ravi", "2", "Class 2")
+        status, result = asyncio.run(_get(AttendanceService(self.db, readers=1), "/students?class=Class+2"))
+        self.assertEqual(status, 200)
+        self.assertEqual(result["rows"], [[2, "Ravi", "2", "Class 2"]])
+
+    def test_roster_shows_pending_students(self):
+        add_student(self.db, "Asha", "1", "Class 1")
+        status, result = asyncio.run(_get(AttendanceService(self.db, readers=1), "/roster?date=2024-06-03"))
+        self.assertEqual(status, 200)
+        self.assertEqual(result["rows"], [[1, "Asha", None]])
+
+
+if __name__ == '__main__':
+    unittest.main()